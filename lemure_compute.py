@@ -0,0 +1,891 @@
+# lemure_compute.py
+# Вычислительный бэкенд для колонок ColumnarDataset: декодирование блоков DBF,
+# срезы, прореживание (шаг, пирамида min/max, LTTB), статистика и ресемплинг по времени.
+#
+# PythonBackend -- эталонная реализация без зависимостей (Windows 7 + Python 3.8).
+# NumpyBackend  -- то же на numpy; выбирается автоматически, если numpy установлен.
+# Результаты обоих бэкендов совпадают (средние -- с точностью до округления).
+
+from __future__ import annotations
+import os
+from array import array
+from bisect import bisect_left
+from itertools import accumulate, compress, count, islice, repeat
+from math import fsum, sqrt
+from operator import add, eq, gt, mul, sub
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# "auto" | "python" | "numpy"; inherited by the decode worker processes
+BACKEND_ENV = "LEMURE_BACKEND"
+
+# decode_field(raws, field) -> column part; the reader's reference field decoder
+DecodeField = Callable[[Sequence[bytes], Any], Any]
+
+
+INF = float("inf")
+
+# samples per level-0 pyramid block; level k blocks hold MINMAX_BLOCK ** (k + 1) samples
+MINMAX_BLOCK = 32
+
+# range_stats scans ranges up to this many samples instead of using the prefix
+# sums (short windows: differences of large running totals lose the std)
+STATS_SCAN_MAX = 4096
+
+
+def _empty_stats() -> Dict[str, Any]:
+    return {"count": 0, "min": None, "max": None, "mean": None, "std": None, "first": None, "last": None}
+
+
+class StatsIndex:
+    """Prefix aggregates of one column: count/sum/sum of squares of any range
+    in O(1) (min/max come from the MinMaxPyramid).
+
+    counts[i], sums[i], sumsq[i] cover samples 0..i-1 with NaN skipped;
+    counts is None when the column has no NaN (counts[i] == i). Values are
+    summed relative to `shift` (the first value), so the std of a short
+    window far from sample 0 does not drown in the running totals.
+    """
+
+    __slots__ = ("counts", "sums", "sumsq", "shift")
+
+    def __init__(self, counts: Optional[array], sums: array, sumsq: array, shift: float):
+        self.counts = counts
+        self.sums = sums
+        self.sumsq = sumsq
+        self.shift = shift
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.counts, self.sums, self.sumsq) if a is not None)
+
+    def count(self, i0: int, i1: int) -> int:
+        return i1 - i0 if self.counts is None else self.counts[i1] - self.counts[i0]
+
+    def first_last(self, i0: int, i1: int) -> Tuple[int, int]:
+        """Indexes of the first and last value in [i0, i1), -1 when there is none."""
+        if self.counts is None:
+            return (i0, i1 - 1) if i1 > i0 else (-1, -1)
+        c0, c1 = self.counts[i0], self.counts[i1]
+        if c1 <= c0:
+            return -1, -1
+        # counts steps up right after each value
+        return bisect_left(self.counts, c0 + 1) - 1, bisect_left(self.counts, c1) - 1
+
+
+class MinMaxPyramid:
+    """Multi-resolution min/max index of one column.
+
+    levels[k] = (mins, maxs, imins, imaxs): per block of MINMAX_BLOCK ** (k + 1)
+    samples the extreme values and the index of their first occurrence.
+    Blocks without values hold +inf/-inf and index -1.
+    """
+
+    __slots__ = ("levels",)
+
+    def __init__(self, levels: List[Tuple[array, array, array, array]]):
+        self.levels = levels
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for lvl in self.levels for a in lvl)
+
+
+def grow(a: array, tail: Sequence) -> array:
+    """a with tail appended: in place, or a copy while a buffer view of a
+    is alive (numpy reading it in another thread)."""
+    try:
+        a.extend(tail)
+        return a
+    except BufferError:
+        return a + array(a.typecode, tail)
+
+
+def pyramid_depth(n: int) -> int:
+    """Number of pyramid levels for n samples (the top level has <= MINMAX_BLOCK blocks)."""
+    depth = 0
+    blocks = -(-n // MINMAX_BLOCK)
+    while blocks > 0:
+        depth += 1
+        if blocks <= MINMAX_BLOCK:
+            break
+        blocks = -(-blocks // MINMAX_BLOCK)
+    return depth
+
+
+class MinMaxPlan:
+    """Buckets of a min/max (M4-style) query, shared by all channels of a request.
+
+    Buckets are `width` samples (a power of two, so zoom levels repeat) on a
+    grid aligned to sample 0; only the first and the last one may be cut by
+    the range, the last one also by the end of data. Each bucket yields its min and
+    max in order of occurrence, plotted at the bucket's first and last sample
+    times, so every channel keeps the same time axis and no extreme is lost.
+    Buckets of one sample yield one point.
+    """
+
+    __slots__ = ("edges", "level", "size", "width")
+
+    def __init__(self, n: int, i0: int, i1: int, max_points: int):
+        i0 = max(0, i0)
+        i1 = min(n, i1)
+        want = -(-max(0, i1 - i0) // max(1, max_points // 2))  # samples per bucket
+        # highest level whose blocks fit in a bucket; -1 = raw samples
+        self.level = -1
+        self.size = 1
+        depth = pyramid_depth(n)
+        while self.level + 1 < depth and self.size * MINMAX_BLOCK <= want:
+            self.level += 1
+            self.size *= MINMAX_BLOCK
+        self.width = w = 1 << max(0, want - 1).bit_length()  # a multiple of size
+        self.edges: List[int] = [i0] + list(range((i0 // w + 1) * w, i1, w)) + [i1] if i1 > i0 else [i0]
+
+    def sub(self, edges: List[int]) -> "MinMaxPlan":
+        """Plan with the same buckets for other edges (part of the grid)."""
+        plan = MinMaxPlan.__new__(MinMaxPlan)
+        plan.level, plan.size, plan.width = self.level, self.size, self.width
+        plan.edges = edges
+        return plan
+
+    def times(self, t_ms: Sequence[int]) -> List[int]:
+        out: List[int] = []
+        for a, b in zip(self.edges, self.edges[1:]):
+            out.append(t_ms[a])
+            if b - a > 1:
+                out.append(t_ms[b - 1])
+        return out
+
+
+RESAMPLE_METHODS = ("nearest", "linear", "mean", "min", "max")
+
+
+def time_grid(start_ms: int, end_ms: int, step_ms: int) -> List[int]:
+    """start_ms, start_ms + step_ms, ... up to end_ms inclusive."""
+    return list(range(start_ms, end_ms + 1, max(1, step_ms)))
+
+
+class ResamplePlan:
+    """Where the points of a time grid fall in the time column, shared by all
+    channels of a request.
+
+    nearest      -- the sample nearest to the grid time (ties -> earlier sample),
+                    none when it is more than max_gap_ms away;
+    linear       -- interpolated between the samples around the grid time, none
+                    outside the data or when they are more than max_gap_ms apart;
+    mean/min/max -- of the values with g - window_ms / 2 <= t < g + window_ms / 2.
+
+    `index` (nearest: the sample per grid time, -1 = none), `pos` (linear: the
+    first sample with t >= g) and `starts`/`ends` (windows: the sample ranges)
+    each come from one forward sweep of the sorted grid over the time column.
+    """
+
+    __slots__ = ("method", "grid", "max_gap_ms", "window_ms", "index", "pos", "starts", "ends")
+
+    def __init__(self, t_ms: Sequence[int], grid: Sequence[int], method: str = "nearest",
+                 max_gap_ms: int = 0, window_ms: int = 0):
+        if method not in RESAMPLE_METHODS:
+            raise ValueError(f"unknown resample method: {method}")
+        self.method = method
+        self.grid = grid
+        self.max_gap_ms = max_gap_ms
+        self.window_ms = window_ms
+        self.index: List[int] = []
+        self.pos: List[int] = []
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        backend = get_backend()
+        if method == "nearest":
+            self.index = backend.nearest(t_ms, grid, max_gap_ms)
+        elif method == "linear":
+            self.pos = backend.edge_positions(t_ms, grid)
+        else:
+            half = window_ms // 2
+            self.starts = backend.edge_positions(t_ms, [g - half for g in grid])
+            self.ends = backend.edge_positions(t_ms, [g - half + window_ms for g in grid])
+
+
+class PythonBackend:
+    """Reference implementation on array/list primitives."""
+
+    name = "python"
+
+    def decode_block(self, layout, block, n: int, out: Dict[str, Any], decode_field: DecodeField) -> None:
+        """Decode n whole records from a bytes/memoryview block into out columns."""
+        rec_len = layout.record_len
+        recs = list(layout.struct.iter_unpack(block))
+        if b"*" in bytes(block[0:n * rec_len:rec_len]):  # deletion flags of the block
+            recs = [r for r in recs if r[0] != b"*"]
+        if recs:
+            cols = list(zip(*recs))
+            for j, fd in layout.picks:
+                out[fd.name].extend(decode_field(cols[j], fd))
+
+    def take(self, col: array, i0: int, i1: int, step: int = 1) -> List[Optional[float]]:
+        """col[i0:i1:step] with NaN converted to None (JSON/Excel friendly)."""
+        # NaN is the only value not equal to itself
+        return [v if v == v else None for v in col[i0:i1:step]]
+
+    def stats(self, col: array, i0: int, i1: int) -> Dict[str, Any]:
+        """count/min/max/mean/std/first/last of the non-NaN values in col[i0:i1]
+        by a full scan (see range_stats for the indexed version)."""
+        vals = [v for v in col[i0:i1] if v == v]
+        if not vals:
+            return _empty_stats()
+        mean = fsum(vals) / len(vals)
+        std = sqrt(fsum((v - mean) ** 2 for v in vals) / len(vals))
+        return {"count": len(vals), "min": min(vals), "max": max(vals), "mean": mean, "std": std,
+                "first": vals[0], "last": vals[-1]}
+
+    def build_stats_index(self, col: array) -> StatsIndex:
+        shift = next((v for v in col if v == v), 0.0)
+        counts = None
+        if col == col:
+            d = [v - shift for v in col]
+        else:
+            counts = array("q", accumulate((v == v for v in col), initial=0))
+            d = [v - shift if v == v else 0.0 for v in col]
+        sums = array("d", accumulate(d, initial=0.0))
+        sumsq = array("d", accumulate(map(mul, d, d), initial=0.0))
+        return StatsIndex(counts, sums, sumsq, shift)
+
+    def extend_stats_index(self, idx: StatsIndex, col: array, n_old: int) -> StatsIndex:
+        """Index of col after samples were appended to its first n_old: the
+        running totals go on from the last ones (same sums as a full build)."""
+        if idx.count(0, n_old) == 0:
+            return self.build_stats_index(col)  # no value yet: nothing to keep, shift unknown
+        tail = col[n_old:]
+        shift = idx.shift
+        counts = idx.counts
+        if tail == tail:
+            d = [v - shift for v in tail]
+            if counts is not None:
+                counts = grow(counts, range(counts[-1] + 1, counts[-1] + 1 + len(tail)))
+        else:
+            if counts is None:
+                counts = array("q", range(n_old + 1))
+            counts = grow(counts, list(accumulate((v == v for v in tail), initial=counts[-1]))[1:])
+            d = [v - shift if v == v else 0.0 for v in tail]
+        sums = grow(idx.sums, list(accumulate(d, initial=idx.sums[-1]))[1:])
+        sumsq = grow(idx.sumsq, list(accumulate(map(mul, d, d), initial=idx.sumsq[-1]))[1:])
+        return StatsIndex(counts, sums, sumsq, shift)
+
+    def range_stats(self, col: array, pyr: MinMaxPyramid, idx: StatsIndex, i0: int, i1: int) -> Dict[str, Any]:
+        """Same as stats(), from the prefix index and the pyramid: the cost
+        does not depend on the range length (std is the population one)."""
+        i0 = max(0, i0)
+        i1 = min(len(col), i1)
+        if i1 - i0 <= STATS_SCAN_MAX:
+            return self.stats(col, i0, i1)
+        n = idx.count(i0, i1)
+        if n <= 0:
+            return _empty_stats()
+        m = (idx.sums[i1] - idx.sums[i0]) / n
+        var = (idx.sumsq[i1] - idx.sumsq[i0]) / n - m * m
+        ilo, ihi = self.range_extremes(col, pyr, i0, i1)
+        f, l = idx.first_last(i0, i1)
+        return {"count": n, "min": col[ilo], "max": col[ihi], "mean": idx.shift + m,
+                "std": sqrt(var) if var > 0 else 0.0, "first": col[f], "last": col[l]}
+
+    def edge_positions(self, t_ms: Sequence[int], edges_ms: Sequence[int]) -> List[int]:
+        """Sample index of each (sorted) edge time: first sample with t >= edge.
+
+        One forward sweep: every search starts where the previous edge ended."""
+        out: List[int] = []
+        lo = 0
+        for e in edges_ms:
+            lo = bisect_left(t_ms, e, lo)
+            out.append(lo)
+        return out
+
+    def bucket_means(self, t_ms: Sequence[int], idx: StatsIndex, edges_ms: Sequence[int]) -> List[Optional[float]]:
+        """Mean of the values with edges_ms[k] <= t < edges_ms[k + 1] per bucket
+        (None = no values), from the prefix sums: the cost is per bucket, not per sample."""
+        pos = self.edge_positions(t_ms, edges_ms)
+        return self.range_means(idx, pos[:-1], pos[1:])
+
+    def range_means(self, idx: StatsIndex, starts: Sequence[int], ends: Sequence[int]) -> List[Optional[float]]:
+        """Mean of the values in [starts[k], ends[k]) per range (None = no values)."""
+        out: List[Optional[float]] = []
+        for a, b in zip(starts, ends):
+            n = idx.count(a, b)
+            out.append(idx.shift + (idx.sums[b] - idx.sums[a]) / n if n > 0 else None)
+        return out
+
+    def nearest(self, t_ms: Sequence[int], targets: Sequence[int], max_gap_ms: int) -> List[int]:
+        """Index of the sample nearest to each (sorted) target time (ties -> earlier
+        sample), -1 when it is more than max_gap_ms away or there is no data."""
+        n = len(t_ms)
+        if not n:
+            return [-1] * len(targets)
+        out: List[int] = []
+        for g, i in zip(targets, self.edge_positions(t_ms, targets)):
+            if i <= 0:
+                i = 0
+            elif i >= n:
+                i = n - 1
+            elif g - t_ms[i - 1] <= t_ms[i] - g:
+                i -= 1
+            out.append(i if abs(t_ms[i] - g) <= max_gap_ms else -1)
+        return out
+
+    def resample(self, t_ms: Sequence[int], col: array, plan: ResamplePlan,
+                 pyr: Optional[MinMaxPyramid] = None, idx: Optional[StatsIndex] = None) -> List[Optional[float]]:
+        """Values of one channel on plan.grid (None = no value); mean needs the
+        channel's StatsIndex, min/max its MinMaxPyramid."""
+        m = plan.method
+        if m == "nearest":
+            return [None if i < 0 or col[i] != col[i] else col[i] for i in plan.index]
+        if m == "linear":
+            return self._interpolate(t_ms, col, plan)
+        if m == "mean":
+            return self.range_means(idx, plan.starts, plan.ends)
+        out: List[Optional[float]] = []
+        for a, b in zip(plan.starts, plan.ends):
+            ilo, ihi = self.range_extremes(col, pyr, a, b) if b > a else (-1, -1)
+            i = ilo if m == "min" else ihi
+            out.append(col[i] if i >= 0 else None)
+        return out
+
+    def _interpolate(self, t_ms: Sequence[int], col: array, plan: ResamplePlan) -> List[Optional[float]]:
+        n = len(t_ms)
+        out: List[Optional[float]] = []
+        for g, j in zip(plan.grid, plan.pos):
+            if j < n and t_ms[j] == g:
+                v = col[j]
+            elif 0 < j < n and t_ms[j] - t_ms[j - 1] <= plan.max_gap_ms:
+                t0, v0 = t_ms[j - 1], col[j - 1]
+                v = v0 + (col[j] - v0) * ((g - t0) / (t_ms[j] - t0))
+            else:
+                v = None
+            out.append(v if v == v else None)
+        return out
+
+    def build_pyramid(self, col: array) -> MinMaxPyramid:
+        B = MINMAX_BLOCK
+        mins, maxs, imins, imaxs = array("d"), array("d"), array("q"), array("q")
+        for s in range(0, len(col), B):
+            vals = col[s:s + B]
+            ok = vals if vals == vals else [v for v in vals if v == v]  # drop NaN
+            if ok:
+                lo = min(ok)
+                hi = max(ok)
+                mins.append(lo)
+                maxs.append(hi)
+                imins.append(s + vals.index(lo))
+                imaxs.append(s + vals.index(hi))
+            else:
+                mins.append(INF)
+                maxs.append(-INF)
+                imins.append(-1)
+                imaxs.append(-1)
+        levels = [(mins, maxs, imins, imaxs)]
+        while len(mins) > B:
+            up = array("d"), array("d"), array("q"), array("q")
+            self._pyramid_up(levels[-1], 0, up)
+            levels.append(up)
+            mins = up[0]
+        return MinMaxPyramid(levels)
+
+    def _pyramid_up(self, lower: Tuple[array, array, array, array], j0: int,
+                    up: Tuple[array, array, array, array]) -> None:
+        """Append to `up` the entries of the next level for lower-level entries j0.. (j0 on a block edge)."""
+        B = MINMAX_BLOCK
+        mins, maxs, imins, imaxs = lower
+        for j in range(j0, len(mins), B):
+            seg = mins[j:j + B]
+            lo = min(seg)
+            up[0].append(lo)
+            up[2].append(imins[j + seg.index(lo)])
+            seg = maxs[j:j + B]
+            hi = max(seg)
+            up[1].append(hi)
+            up[3].append(imaxs[j + seg.index(hi)])
+
+    def extend_pyramid(self, pyr: MinMaxPyramid, col: array, n_old: int) -> MinMaxPyramid:
+        """Pyramid of col after samples were appended to its first n_old: the
+        blocks before the first one touched by the new samples are copied, only
+        the tail of every level is computed (same result as build_pyramid)."""
+        B = MINMAX_BLOCK
+        if not pyr.levels:
+            return self.build_pyramid(col)
+        s = n_old // B * B  # first level-0 block with new samples
+        tail = self.build_pyramid(col[s:]).levels[0]
+        mins, maxs, imins, imaxs = (a[:s // B] for a in pyr.levels[0])
+        mins.extend(tail[0])
+        maxs.extend(tail[1])
+        imins.extend(i + s if i >= 0 else -1 for i in tail[2])
+        imaxs.extend(i + s if i >= 0 else -1 for i in tail[3])
+        levels = [(mins, maxs, imins, imaxs)]
+        j = s // B  # first changed entry of the level below
+        while len(levels[-1][0]) > B:
+            k = len(levels)
+            j = j // B * B if k < len(pyr.levels) else 0  # a new top level is built whole
+            up = tuple(a[:j // B] for a in pyr.levels[k]) if j else (array("d"), array("d"), array("q"), array("q"))
+            self._pyramid_up(levels[-1], j, up)
+            levels.append(up)
+            j //= B
+        return MinMaxPyramid(levels)
+
+    def _scan(self, col: array, pyr: MinMaxPyramid, lvl: int, j0: int, j1: int, best: List[Any]) -> None:
+        """Merge the extremes of entries j0..j1-1 of a level (-1 = raw samples) into
+        best = [min, argmin, max, argmax]; ties keep the earlier sample."""
+        if j0 >= j1:
+            return
+        if lvl < 0:
+            vals = col[j0:j1]
+            ok = vals if vals == vals else [v for v in vals if v == v]
+            if not ok:
+                return
+            lo = min(ok)
+            hi = max(ok)
+            ilo = j0 + vals.index(lo)
+            ihi = j0 + vals.index(hi)
+        else:
+            mins, maxs, imins, imaxs = pyr.levels[lvl]
+            seg = mins[j0:j1]
+            lo = min(seg)
+            ilo = imins[j0 + seg.index(lo)]
+            seg = maxs[j0:j1]
+            hi = max(seg)
+            ihi = imaxs[j0 + seg.index(hi)]
+        if ilo >= 0 and (best[1] < 0 or lo < best[0] or (lo == best[0] and ilo < best[1])):
+            best[0], best[1] = lo, ilo
+        if ihi >= 0 and (best[3] < 0 or hi > best[2] or (hi == best[2] and ihi < best[3])):
+            best[2], best[3] = hi, ihi
+
+    def range_extremes(self, col: array, pyr: MinMaxPyramid, a: int, b: int) -> Tuple[int, int]:
+        """(argmin, argmax) of col[a:b] with NaN skipped, -1 when there are no values.
+
+        The range is split into whole pyramid blocks: at most 2 * (MINMAX_BLOCK - 1)
+        entries per level are scanned, whatever the range length."""
+        best: List[Any] = [INF, -1, -INF, -1]
+        lvl, size = -1, 1
+        while a < b:
+            nsize = size * MINMAX_BLOCK
+            a2 = -(-a // nsize) * nsize
+            b2 = b // nsize * nsize
+            if lvl + 1 >= len(pyr.levels) or a2 >= b2:
+                self._scan(col, pyr, lvl, a // size, -(-b // size), best)
+                break
+            self._scan(col, pyr, lvl, a // size, a2 // size, best)
+            self._scan(col, pyr, lvl, b2 // size, b // size, best)
+            a, b = a2, b2
+            lvl, size = lvl + 1, nsize
+        return best[1], best[3]
+
+    def minmax(self, col: array, pyr: MinMaxPyramid, plan: MinMaxPlan) -> List[Optional[float]]:
+        """Values of one channel for plan.times(): per bucket min and max in order
+        of occurrence, None for buckets without values."""
+        out: List[Optional[float]] = []
+        for a, b in zip(plan.edges, plan.edges[1:]):
+            if b - a == 1:
+                v = col[a]
+                out.append(v if v == v else None)
+                continue
+            ilo, ihi = self.range_extremes(col, pyr, a, b)
+            if ilo < 0:
+                out += (None, None)
+            elif ilo <= ihi:
+                out += (col[ilo], col[ihi])
+            else:
+                out += (col[ihi], col[ilo])
+        return out
+
+    def _valid_indices(self, col: array, i0: int, i1: int) -> Sequence[int]:
+        vals = col[i0:i1]
+        if vals == vals:
+            return range(i0, i1)
+        return list(compress(range(i0, i1), map(eq, vals, vals)))  # NaN != NaN
+
+    def _gap_positions(self, idx: Sequence[int], min_gap: int) -> List[int]:
+        """Positions k where idx[k - 1] -> idx[k] skips min_gap or more samples."""
+        return list(compress(count(1), map(gt, map(sub, islice(idx, 1, None), idx), repeat(min_gap))))
+
+    def _segment_xy(self, t_ms: Sequence[int], col: array, seg: Sequence[int], t0: int):
+        """x = time from t0 (ms), y = value of the samples seg."""
+        return list(map(sub, map(t_ms.__getitem__, seg), repeat(t0))), list(map(col.__getitem__, seg))
+
+    def _lttb_pick(self, xs: Sequence[float], ys: Sequence[float], n_out: int) -> List[int]:
+        """Largest-Triangle-Three-Buckets: positions of n_out points to keep.
+
+        Bucket averages use fsum, areas are (k1*y + k2*x) - c in that order,
+        ties keep the first point: the numpy version picks the same points.
+        """
+        n = len(xs)
+        if n_out >= n:
+            return list(range(n))
+        if n_out < 3:
+            return [0, n - 1][:max(1, n_out)]
+        every = (n - 2) / (n_out - 2)
+        out = [0]
+        a = 0
+        for i in range(n_out - 2):
+            s = int(i * every) + 1
+            e = int((i + 1) * every) + 1
+            ne = min(int((i + 2) * every) + 1, n)
+            cx = fsum(xs[e:ne]) / (ne - e)
+            cy = fsum(ys[e:ne]) / (ne - e)
+            ax, ay = xs[a], ys[a]
+            k1 = ax - cx
+            k2 = cy - ay
+            c = k1 * ay + ax * k2
+            areas = list(map(abs, map(sub, map(add, map(mul, repeat(k1), ys[s:e]), map(mul, repeat(k2), xs[s:e])),
+                                      repeat(c))))
+            a = s + areas.index(max(areas))
+            out.append(a)
+        out.append(n - 1)
+        return out
+
+    def lttb(self, t_ms: Sequence[int], col: array, i0: int, i1: int,
+             max_points: int) -> Tuple[List[int], List[Optional[float]]]:
+        """(times, values) of about max_points samples of col[i0:i1] picked by LTTB.
+
+        NaN samples are skipped; a run of NaN at least as long as one output
+        point's share of the range splits the data into segments, each reduced
+        on its own (budget by its share of values) and separated by a None
+        point at the gap start, so Plotly breaks the line there.
+        """
+        idx = self._valid_indices(col, i0, i1)
+        if not len(idx) or max_points <= 0:
+            return [], []
+        min_gap = max(1, (i1 - i0) // max_points)
+        cuts = [0] + self._gap_positions(idx, min_gap) + [len(idx)]
+        budget = max(len(cuts) - 1, max_points - (len(cuts) - 2))
+        t0 = t_ms[i0]
+        times: List[int] = []
+        values: List[Optional[float]] = []
+        for a, b in zip(cuts, cuts[1:]):
+            if a:
+                times.append(t_ms[idx[a - 1] + 1])  # first NaN of the gap
+                values.append(None)
+            seg = idx[a:b]
+            want = max(min(2, b - a), round(budget * (b - a) / len(idx)))
+            xs, ys = self._segment_xy(t_ms, col, seg, t0)
+            for k in self._lttb_pick(xs, ys, want):
+                times.append(t_ms[seg[k]])
+                values.append(float(ys[k]))
+        return times, values
+
+
+class NumpyBackend(PythonBackend):
+    """Vectorized implementation; anything numpy can't reproduce exactly goes
+    through the PythonBackend code."""
+
+    name = "numpy"
+
+    def __init__(self):
+        import numpy
+        self.np = numpy
+
+    def decode_block(self, layout, block, n: int, out: Dict[str, Any], decode_field: DecodeField) -> None:
+        np = self.np
+        recs = np.frombuffer(block, dtype=np.uint8, count=n * layout.record_len).reshape(n, layout.record_len)
+        live = recs[:, 0] != 0x2A  # b"*"
+        if not live.all():
+            recs = recs[live]
+        # copy the fields out first: no view may outlive the (mmap) block
+        raws = [np.ascontiguousarray(recs[:, off:off + fd.length])
+                for (_, fd), off in zip(layout.picks, layout.offsets)]
+        m = len(recs)
+        del recs
+        if not m:
+            return
+        for (_, fd), raw in zip(layout.picks, raws):
+            if fd.length == 0:
+                out[fd.name].extend(decode_field([b""] * m, fd))
+            elif fd.ftype == "N" and self._decode_numeric(raw, fd, out[fd.name]):
+                pass
+            else:
+                # V keeps the bytes as they are (S would drop trailing NULs)
+                out[fd.name].extend(decode_field(raw.view(f"V{fd.length}").ravel().tolist(), fd))
+
+    def _decode_numeric(self, raw, fd, col: array) -> bool:
+        np = self.np
+        if (raw == 0).any():
+            return False  # float() rejects NUL padding, numpy strips it
+        s = raw.view(f"S{fd.length}").ravel()
+        # empty values -> NaN, as in _parse_dbf_value
+        empty = (raw == 0x20).all(axis=1) | (s == b".".rjust(fd.length)) | (s == b".".ljust(fd.length))
+        if empty.any():
+            s = s.copy()
+            s[empty] = b"nan"
+        try:
+            vals = s.astype(np.float64)
+        except ValueError:
+            return False
+        col.frombytes(vals.tobytes())
+        return True
+
+    def _to_list(self, a) -> List[Optional[float]]:
+        nan = self.np.isnan(a)
+        if not nan.any():
+            return a.tolist()
+        vals = a.astype(object)
+        vals[nan] = None
+        return vals.tolist()
+
+    def _to_array(self, typecode: str, a) -> array:
+        out = array(typecode)
+        out.frombytes(a.astype(self.np.float64 if typecode == "d" else self.np.int64).tobytes())
+        return out
+
+    def take(self, col: array, i0: int, i1: int, step: int = 1) -> List[Optional[float]]:
+        return self._to_list(self.np.frombuffer(col, dtype=self.np.float64)[i0:i1:step])
+
+    def stats(self, col: array, i0: int, i1: int) -> Dict[str, Any]:
+        np = self.np
+        a = np.frombuffer(col, dtype=np.float64)[i0:i1]
+        a = a[~np.isnan(a)]
+        if not len(a):
+            return _empty_stats()
+        return {"count": int(len(a)), "min": float(a.min()), "max": float(a.max()), "mean": float(a.mean()),
+                "std": float(a.std()), "first": float(a[0]), "last": float(a[-1])}
+
+    def edge_positions(self, t_ms: Sequence[int], edges_ms: Sequence[int]) -> List[int]:
+        np = self.np
+        t = np.frombuffer(t_ms, dtype=np.int64) if isinstance(t_ms, array) else np.asarray(t_ms, dtype=np.int64)
+        return np.searchsorted(t, np.asarray(edges_ms, dtype=np.int64), side="left").tolist()
+
+    def bucket_means(self, t_ms: Sequence[int], idx: StatsIndex, edges_ms: Sequence[int]) -> List[Optional[float]]:
+        pos = self.edge_positions(t_ms, edges_ms)
+        return self.range_means(idx, pos[:-1], pos[1:])
+
+    def range_means(self, idx: StatsIndex, starts: Sequence[int], ends: Sequence[int]) -> List[Optional[float]]:
+        np = self.np
+        a = np.asarray(starts, dtype=np.int64)
+        b = np.asarray(ends, dtype=np.int64)
+        if not len(a):
+            return []
+        if idx.counts is None:
+            n = b - a
+        else:
+            counts = np.frombuffer(idx.counts, dtype=np.int64)
+            n = counts[b] - counts[a]
+        sums = np.frombuffer(idx.sums, dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = idx.shift + (sums[b] - sums[a]) / n
+        return self._to_list(np.where(n > 0, means, np.nan))
+
+    def build_stats_index(self, col: array) -> StatsIndex:
+        np = self.np
+        a = np.frombuffer(col, dtype=np.float64)
+        nan = np.isnan(a)
+        ok = np.nonzero(~nan)[0]
+        shift = float(a[ok[0]]) if len(ok) else 0.0
+        d = np.where(nan, 0.0, a - shift)
+        counts = None
+        if len(ok) < len(a):
+            counts = np.zeros(len(a) + 1, dtype=np.int64)
+            np.cumsum(~nan, out=counts[1:])
+        # cumsum adds left to right like accumulate(): same sums as PythonBackend
+        sums = np.zeros(len(a) + 1)
+        np.cumsum(d, out=sums[1:])
+        sumsq = np.zeros(len(a) + 1)
+        np.cumsum(d * d, out=sumsq[1:])
+        return StatsIndex(None if counts is None else self._to_array("q", counts),
+                          self._to_array("d", sums), self._to_array("d", sumsq), shift)
+
+    def nearest(self, t_ms: Sequence[int], targets: Sequence[int], max_gap_ms: int) -> List[int]:
+        np = self.np
+        n = len(t_ms)
+        if not n:
+            return [-1] * len(targets)
+        t = np.frombuffer(t_ms, dtype=np.int64) if isinstance(t_ms, array) else np.asarray(t_ms, dtype=np.int64)
+        g = np.asarray(targets, dtype=np.int64)
+        j = np.searchsorted(t, g, side="left")
+        i = np.clip(j, 1, n - 1)
+        i = np.where(np.abs(g - t[i - 1]) <= np.abs(t[i] - g), i - 1, i)
+        i = np.where(j <= 0, 0, np.where(j >= n, n - 1, i))
+        i = np.where(np.abs(t[i] - g) <= max_gap_ms, i, -1)
+        return i.tolist()
+
+    def resample(self, t_ms: Sequence[int], col: array, plan: ResamplePlan,
+                 pyr: Optional[MinMaxPyramid] = None, idx: Optional[StatsIndex] = None) -> List[Optional[float]]:
+        np = self.np
+        if plan.method not in ("nearest", "linear") or not len(t_ms) or not len(plan.grid):
+            return super().resample(t_ms, col, plan, pyr, idx)
+        v = np.frombuffer(col, dtype=np.float64)
+        if plan.method == "nearest":
+            i = np.asarray(plan.index, dtype=np.int64)
+            return self._to_list(np.where(i >= 0, v[i], np.nan))
+        n = len(t_ms)
+        t = np.frombuffer(t_ms, dtype=np.int64) if isinstance(t_ms, array) else np.asarray(t_ms, dtype=np.int64)
+        g = np.asarray(plan.grid, dtype=np.int64)
+        j = np.asarray(plan.pos, dtype=np.int64)
+        b = np.clip(j, 1, n - 1)
+        a = b - 1
+        dt = t[b] - t[a]
+        inside = (j > 0) & (j < n) & (dt <= plan.max_gap_ms)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out = v[a] + (v[b] - v[a]) * ((g - t[a]) / dt)
+        out = np.where(inside, out, np.nan)
+        exact = j < n
+        exact[exact] = t[j[exact]] == g[exact]
+        out[exact] = v[j[exact]]
+        return self._to_list(out)
+
+    def _valid_indices(self, col: array, i0: int, i1: int) -> Sequence[int]:
+        np = self.np
+        return np.nonzero(~np.isnan(np.frombuffer(col, dtype=np.float64)[i0:i1]))[0] + i0
+
+    def _gap_positions(self, idx: Sequence[int], min_gap: int) -> List[int]:
+        return (self.np.nonzero(self.np.diff(idx) > min_gap)[0] + 1).tolist()
+
+    def _segment_xy(self, t_ms: Sequence[int], col: array, seg: Sequence[int], t0: int):
+        np = self.np
+        t = np.frombuffer(t_ms, dtype=np.int64) if isinstance(t_ms, array) else np.asarray(t_ms, dtype=np.int64)
+        return (t[seg] - t0).astype(np.float64), np.frombuffer(col, dtype=np.float64)[seg]
+
+    def _lttb_pick(self, xs: Sequence[float], ys: Sequence[float], n_out: int) -> List[int]:
+        np = self.np
+        n = len(xs)
+        if n_out >= n or n_out < 3:
+            return super()._lttb_pick(xs, ys, n_out)
+        x = np.asarray(xs, dtype=np.float64)
+        y = np.asarray(ys, dtype=np.float64)
+        every = (n - 2) / (n_out - 2)
+        edges = [int(i * every) + 1 for i in range(n_out)]  # bucket i = edges[i]..edges[i + 1]
+        # next-bucket averages with exact sums: bit for bit as in the reference
+        nxt = [(e, min(ne, n)) for e, ne in zip(edges[1:], edges[2:])]
+        cx = [fsum(x[e:ne].tolist()) / (ne - e) for e, ne in nxt]
+        cy = [fsum(y[e:ne].tolist()) / (ne - e) for e, ne in nxt]
+        out = [0]
+        a = 0
+        for i in range(n_out - 2):
+            s, e = edges[i], edges[i + 1]
+            ax, ay = x[a], y[a]
+            k1 = ax - cx[i]
+            k2 = cy[i] - ay
+            c = k1 * ay + ax * k2
+            a = s + int(np.abs(k1 * y[s:e] + k2 * x[s:e] - c).argmax())
+            out.append(a)
+        out.append(n - 1)
+        return out
+
+    def _block_extremes(self, v):
+        """Per row of a 2-D float array: (argmin, argmax, empty) with NaN skipped."""
+        np = self.np
+        nan = np.isnan(v)
+        jl = np.where(nan, np.inf, v).argmin(axis=1)
+        jh = np.where(nan, -np.inf, v).argmax(axis=1)
+        return jl, jh, nan.all(axis=1)
+
+    def build_pyramid(self, col: array) -> MinMaxPyramid:
+        np = self.np
+        B = MINMAX_BLOCK
+        a = np.frombuffer(col, dtype=np.float64)
+        nb = -(-len(a) // B)
+        if not nb:
+            return super().build_pyramid(col)
+        v = np.full(nb * B, np.nan)
+        v[:len(a)] = a
+        v = v.reshape(nb, B)
+        jl, jh, empty = self._block_extremes(v)
+        rows = np.arange(nb)
+        imins = np.where(empty, -1, rows * B + jl)
+        imaxs = np.where(empty, -1, rows * B + jh)
+        # +-inf samples next to NaN: argmin may land on the NaN, redo those blocks
+        for r in np.nonzero(~empty & (np.isnan(v[rows, jl]) | np.isnan(v[rows, jh])))[0].tolist():
+            best = [INF, -1, -INF, -1]
+            self._scan(col, None, -1, r * B, min(len(a), r * B + B), best)
+            imins[r], imaxs[r] = best[1], best[3]
+        mins = np.where(empty, np.inf, a[imins])
+        maxs = np.where(empty, -np.inf, a[imaxs])
+        levels = [(mins, maxs, imins, imaxs)]
+        while len(mins) > B:
+            nb = -(-len(mins) // B)
+            rows = np.arange(nb) * B
+            pm = np.full(nb * B, np.inf)
+            pm[:len(mins)] = mins
+            jl = rows + pm.reshape(nb, B).argmin(axis=1)
+            pm = np.full(nb * B, -np.inf)
+            pm[:len(maxs)] = maxs
+            jh = rows + pm.reshape(nb, B).argmax(axis=1)
+            mins, maxs, imins, imaxs = mins[jl], maxs[jh], imins[jl], imaxs[jh]
+            levels.append((mins, maxs, imins, imaxs))
+        return MinMaxPyramid([(self._to_array("d", lo), self._to_array("d", hi),
+                               self._to_array("q", ilo), self._to_array("q", ihi))
+                              for lo, hi, ilo, ihi in levels])
+
+    def minmax(self, col: array, pyr: MinMaxPyramid, plan: MinMaxPlan) -> List[Optional[float]]:
+        np = self.np
+        edges = np.asarray(plan.edges, dtype=np.int64)
+        if len(edges) < 2:
+            return []
+        a = np.frombuffer(col, dtype=np.float64)
+        w, size = plan.width, plan.size
+        nbk = len(edges) - 1
+        ilo = np.full(nbk, -1, dtype=np.int64)
+        ihi = np.full(nbk, -1, dtype=np.int64)
+        lens = edges[1:] - edges[:-1]
+        full = np.nonzero(lens == w)[0]  # whole buckets: consecutive and grid-aligned
+        if len(full) and w > 1:
+            k0, nf = int(full[0]), len(full)
+            start = int(edges[k0])
+            if plan.level < 0:
+                jl, jh, empty = self._block_extremes(a[start:start + nf * w].reshape(nf, w))
+                base = start + np.arange(nf) * w
+                ilo[full] = np.where(empty, -1, base + jl)
+                ihi[full] = np.where(empty, -1, base + jh)
+            else:
+                mins, maxs, imins, imaxs = pyr.levels[plan.level]
+                m = w // size
+                j0 = start // size
+                rows = j0 + np.arange(nf) * m
+                seg = np.frombuffer(mins, dtype=np.float64)[j0:j0 + nf * m].reshape(nf, m)
+                ilo[full] = np.frombuffer(imins, dtype=np.int64)[rows + seg.argmin(axis=1)]
+                seg = np.frombuffer(maxs, dtype=np.float64)[j0:j0 + nf * m].reshape(nf, m)
+                ihi[full] = np.frombuffer(imaxs, dtype=np.int64)[rows + seg.argmax(axis=1)]
+        done = np.zeros(nbk, dtype=bool)
+        done[full] = w > 1
+        single = lens == 1
+        ilo[single] = ihi[single] = edges[:-1][single]
+        for k in np.nonzero(~done & ~single)[0].tolist():
+            ilo[k], ihi[k] = self.range_extremes(col, pyr, int(edges[k]), int(edges[k + 1]))
+        if plan.level < 0 and len(full) and w > 1:
+            # +-inf samples next to NaN (see build_pyramid)
+            bad = full[np.isnan(a[ilo[full]]) | np.isnan(a[ihi[full]])]
+            for k in bad[ilo[bad] >= 0].tolist():
+                ilo[k], ihi[k] = self.range_extremes(col, pyr, int(edges[k]), int(edges[k + 1]))
+        first = np.minimum(ilo, ihi)
+        second = np.maximum(ilo, ihi)
+        vals = np.empty((nbk, 2))
+        vals[:, 0] = np.where(ilo < 0, np.nan, a[first])
+        vals[:, 1] = np.where(ilo < 0, np.nan, a[second])
+        keep = np.ones((nbk, 2), dtype=bool)
+        keep[single, 1] = False
+        return self._to_list(vals[keep])
+
+
+_BACKENDS = {"python": PythonBackend, "numpy": NumpyBackend}
+_BACKEND: Optional[PythonBackend] = None
+
+
+def _make_backend(name: str) -> PythonBackend:
+    name = (name or "auto").strip().lower()
+    if name not in _BACKENDS and name != "auto":
+        print(f"[COMPUTE] unknown backend {name!r}, using auto")
+        name = "auto"
+    if name in ("auto", "numpy"):
+        try:
+            return NumpyBackend()
+        except ImportError:
+            if name == "numpy":
+                print("[COMPUTE] numpy is not installed, using the python backend")
+    return PythonBackend()
+
+
+def get_backend() -> PythonBackend:
+    """Backend in use: LEMURE_BACKEND from the environment, numpy when importable."""
+    global _BACKEND
+    if _BACKEND is None:
+        _BACKEND = _make_backend(os.environ.get(BACKEND_ENV, "auto"))
+    return _BACKEND
+
+
+def set_backend(name: str) -> PythonBackend:
+    """Switch backend ("auto", "python", "numpy") for this process and the
+    decode workers it starts."""
+    global _BACKEND
+    os.environ[BACKEND_ENV] = name
+    _BACKEND = _make_backend(name)
+    return _BACKEND
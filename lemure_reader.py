@@ -1,12 +1,21 @@
 # lemure_reader.py
 # Чтение тестов LeMuRe/Project Engineering (Prova*.dbf + Set/Canali.def)
-# Реализовано без pandas/numpy — подходит для старых систем (в т.ч. Windows 7 + Python 3.8)
+# Реализовано без pandas/numpy — подходит для старых систем (в т.ч. Windows 7 + Python 3.8);
+# если numpy установлен, тяжёлые циклы идут через него (см. lemure_compute.py)
 
 from __future__ import annotations
-import os, re
+import heapq, mmap, os, re, struct, threading, time
+from collections import OrderedDict
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
 from dataclasses import dataclass
 from datetime import datetime, date
-from typing import Dict, List, Tuple, Optional, Any, Iterable
+from itertools import count, repeat
+from operator import add, mul
+from typing import Callable, Collection, Dict, List, Tuple, Optional, Any, Iterable, Iterator
+
+from lemure_compute import MinMaxPlan, MinMaxPyramid, ResamplePlan, StatsIndex, get_backend, grow
 
 
 @dataclass
@@ -70,6 +79,8 @@ def parse_prova_dat(prova_dat_path: str) -> Dict[str, str]:
 
 # ---------------- DBF reader ----------------
 
+NAN = float("nan")  # missing value marker in numeric columns
+
 @dataclass
 class DbfField:
     name: str
@@ -86,9 +97,12 @@ class DbfHeader:
     header_len: int
     record_len: int
     fields: List[DbfField]
+    # read_dbf_columns(): physical records consumed (the file may hold more by now)
+    read_end: int = 0
 
 
-def _read_dbf_header(buf: bytes) -> DbfHeader:
+def _read_dbf_header(buf) -> DbfHeader:
+    """Parse the header from bytes or a memoryview over the file."""
     if len(buf) < 32:
         raise ValueError("DBF слишком короткий")
     version = buf[0]
@@ -103,7 +117,7 @@ def _read_dbf_header(buf: bytes) -> DbfHeader:
         desc = buf[off:off + 32]
         if desc[0] == 0x0D:
             break
-        name = desc[0:11].split(b"\x00", 1)[0].decode("ascii", errors="ignore").strip()
+        name = bytes(desc[0:11]).split(b"\x00", 1)[0].decode("ascii", errors="ignore").strip()
         ftype = chr(desc[11])
         length = desc[16]
         decimals = desc[17]
@@ -168,45 +182,54 @@ def _parse_dbf_value(raw: bytes, f: DbfField):
 #         rows.append(row)
 #
 #     return hdr, rows
+def _read_dbf_header_from_file(f) -> DbfHeader:
+    head32 = f.read(32)
+    if len(head32) < 32:
+        raise ValueError("DBF слишком короткий")
+
+    header_len = int.from_bytes(head32[8:10], "little", signed=False)
+    if header_len < 32:
+        raise ValueError("Некорректная длина заголовка DBF")
+
+    f.seek(0)
+    header_buf = f.read(header_len)
+    if len(header_buf) < header_len:
+        header_buf = header_buf + (b"\x00" * (header_len - len(header_buf)))
+
+    return _read_dbf_header(header_buf)
+
+
+def _iter_rows_from(f, hdr: DbfHeader, start: int = 0) -> Iterable[Dict[str, Any]]:
+    rec_len = hdr.record_len
+    f.seek(hdr.header_len + start * rec_len)
+    for _ in range(hdr.records - start):
+        rec = f.read(rec_len)
+        if not rec or len(rec) < rec_len:
+            break
+        if rec[0:1] == b"*":
+            continue
+
+        off = 1
+        row: Dict[str, Any] = {}
+        for fdef in hdr.fields:
+            raw = rec[off:off + fdef.length]
+            off += fdef.length
+            row[fdef.name] = _parse_dbf_value(raw, fdef)
+        yield row
+
+
 def iter_dbf_rows(dbf_path: str) -> Iterable[Dict[str, Any]]:
     """Memory-efficient streaming DBF iterator.
 
     Fixes:
       - reads full header based on header_len (some DBF have header > 8KB)
       - streams records one-by-one
+
+    Reference row decoder; load_test uses the bulk read_dbf_columns().
     """
     with open(dbf_path, "rb") as f:
-        head32 = f.read(32)
-        if len(head32) < 32:
-            raise ValueError("DBF слишком короткий")
-
-        header_len = int.from_bytes(head32[8:10], "little", signed=False)
-        if header_len < 32:
-            raise ValueError("Некорректная длина заголовка DBF")
-
-        f.seek(0)
-        header_buf = f.read(header_len)
-        if len(header_buf) < header_len:
-            header_buf = header_buf + (b"\x00" * (header_len - len(header_buf)))
-
-        hdr = _read_dbf_header(header_buf)
-        f.seek(hdr.header_len)
-
-        rec_len = hdr.record_len
-        for _ in range(hdr.records):
-            rec = f.read(rec_len)
-            if not rec or len(rec) < rec_len:
-                break
-            if rec[0:1] == b"*":
-                continue
-
-            off = 1
-            row: Dict[str, Any] = {}
-            for fdef in hdr.fields:
-                raw = rec[off:off + fdef.length]
-                off += fdef.length
-                row[fdef.name] = _parse_dbf_value(raw, fdef)
-            yield row
+        hdr = _read_dbf_header_from_file(f)
+        yield from _iter_rows_from(f, hdr)
 
 
 def read_dbf_rows(dbf_path: str) -> Tuple[DbfHeader, List[Dict[str, Any]]]:
@@ -228,6 +251,647 @@ def read_dbf_rows(dbf_path: str) -> Tuple[DbfHeader, List[Dict[str, Any]]]:
 
     return hdr, list(iter_dbf_rows(dbf_path))
 
+# ------------- Bulk (columnar) DBF decoder -------------
+
+# records per read() in the bulk decoder (~1-4 MB blocks for typical LeMuRe files)
+DBF_BLOCK_RECORDS = 8192
+
+
+class LoadCancelled(Exception):
+    """load_test() was stopped through LoadProgress.cancel()."""
+
+
+class LoadProgress:
+    """Progress of one load_test() call; other threads read it while it runs.
+
+    phase -- "scan" (headers), "decode", "merge", "cache" (read from the
+             on-disk cache), "done"
+    Counters are updated by the loading thread only. cancel() makes it
+    raise LoadCancelled at the next decoded block (next file with the
+    process pool).
+    """
+
+    def __init__(self):
+        self.phase = "scan"
+        self.files_total = 0
+        self.files_done = 0
+        self.records_total = 0
+        self.records_done = 0
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self.started = time.monotonic()
+        self._decode_started: Optional[float] = None
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise LoadCancelled("Загрузка отменена")
+
+    def set_phase(self, phase: str) -> None:
+        self.check()
+        self.phase = phase
+        if phase == "decode" and self._decode_started is None:
+            self._decode_started = time.monotonic()
+
+    def advance(self, records: int, nbytes: int) -> None:
+        self.records_done += records
+        self.bytes_done += nbytes
+        self.check()
+
+    def file_done(self) -> None:
+        self.files_done += 1
+        self.check()
+
+    def eta_s(self) -> Optional[float]:
+        """Seconds left in the decode phase, from the rate so far (None = unknown)."""
+        if self.phase != "decode" or self.cancelled or self._decode_started is None or not self.records_done:
+            return None
+        left = max(0, self.records_total - self.records_done)
+        return (time.monotonic() - self._decode_started) * left / self.records_done
+
+    def snapshot(self) -> Dict[str, Any]:
+        eta = self.eta_s()
+        return {
+            "phase": self.phase,
+            "files_total": self.files_total,
+            "files_done": self.files_done,
+            "records_total": self.records_total,
+            "records_done": self.records_done,
+            "bytes_total": self.bytes_total,
+            "bytes_done": self.bytes_done,
+            "elapsed_s": round(time.monotonic() - self.started, 1),
+            "eta_s": None if eta is None else round(eta, 1),
+        }
+
+
+class DbfLayout:
+    """Record layout compiled once per DBF header.
+
+    `struct` splits a record into (deleted flag, field1, field2, ...) bytes,
+    so a whole block is cut with one Struct.iter_unpack call. With `only`
+    the other fields become pad bytes and are not even sliced.
+    """
+
+    def __init__(self, hdr: DbfHeader, only: Optional[Collection[str]] = None):
+        self.fields = hdr.fields
+        self.record_len = hdr.record_len
+        # duplicate field names: the last one wins, as in the row dicts
+        last = {fd.name: j for j, fd in enumerate(hdr.fields)}
+        fmt = "<1s"
+        # (position in the unpacked tuple, field) and the field offsets in the record
+        self.picks: List[Tuple[int, DbfField]] = []
+        self.offsets: List[int] = []
+        off = 1
+        for j, fd in enumerate(hdr.fields):
+            if last[fd.name] == j and (only is None or fd.name in only):
+                self.picks.append((len(self.picks) + 1, fd))
+                self.offsets.append(off)
+                fmt += f"{fd.length}s"
+            else:
+                fmt += f"{fd.length}x"
+            off += fd.length
+        used = struct.calcsize(fmt)
+        # fields longer than the record: the row decoder truncates them, keep that path
+        self.valid = 0 < used <= hdr.record_len
+        if self.valid and used < hdr.record_len:
+            fmt += f"{hdr.record_len - used}x"
+        self.struct = struct.Struct(fmt) if self.valid else None
+
+
+def _numeric_slow(raw: bytes, f: DbfField) -> float:
+    v = _parse_dbf_value(raw, f)
+    return NAN if v is None else v
+
+
+def _decode_numeric(raws: Sequence, f: DbfField) -> array:
+    # float() takes ASCII bytes directly; anything it rejects (blank, ".", garbage)
+    # goes through _parse_dbf_value so results match the row decoder
+    try:
+        return array("d", map(float, raws))
+    except ValueError:
+        pass
+    # empty fields: swap for b"nan" and stay on the C-level map()
+    empty = {b" " * f.length: b"nan", b".".rjust(f.length): b"nan", b".".ljust(f.length): b"nan"}
+    try:
+        return array("d", map(float, map(empty.get, raws, raws)))
+    except ValueError:
+        return array("d", [_numeric_slow(b, f) for b in raws])
+
+
+def _decode_cached(raws: Sequence, f: DbfField) -> List[Any]:
+    # D/C columns repeat a lot (one date per day) -> decode each distinct value once
+    cache: Dict[bytes, Any] = {}
+    out: List[Any] = []
+    for b in raws:
+        try:
+            out.append(cache[b])
+        except KeyError:
+            v = cache[b] = _parse_dbf_value(b, f)
+            out.append(v)
+    return out
+
+
+def _decode_field(raws: Sequence, f: DbfField):
+    if f.ftype == "N":
+        return _decode_numeric(raws, f)
+    return _decode_cached(raws, f)
+
+
+def _rows_to_columns(rows: List[Dict[str, Any]], hdr: DbfHeader, only: Optional[Collection[str]] = None) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for fd in {fd.name: fd for fd in hdr.fields}.values():
+        if only is not None and fd.name not in only:
+            continue
+        if fd.ftype == "N":
+            out[fd.name] = array("d", [NAN if r.get(fd.name) is None else r[fd.name] for r in rows])
+        else:
+            out[fd.name] = [r.get(fd.name) for r in rows]
+    return out
+
+
+def _decode_block(layout: DbfLayout, block, n: int, out: Dict[str, Any]) -> None:
+    """Decode n whole records from a bytes/memoryview block into out columns."""
+    get_backend().decode_block(layout, block, n, out, _decode_field)
+
+
+def _new_columns(layout: DbfLayout) -> Dict[str, Any]:
+    return {fd.name: (array("d") if fd.ftype == "N" else []) for _, fd in layout.picks}
+
+
+def _map_file(f) -> Optional[mmap.mmap]:
+    try:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None  # empty file, pipe, some network shares
+
+
+def _read_columns_mapped(mm: mmap.mmap, block_records: int, only: Optional[Collection[str]],
+                         progress: Optional[LoadProgress] = None,
+                         start: int = 0) -> Optional[Tuple[DbfHeader, Dict[str, Any]]]:
+    """Decode straight from the mapping: blocks are memoryview slices, no read() copies.
+
+    Returns None when the mapped layout can't be used (the stream path handles it).
+    """
+    size = len(mm)
+    if size < 32:
+        return None
+    with memoryview(mm) as mv:
+        header_len = int.from_bytes(mv[8:10], "little", signed=False)
+        if header_len < 32 or header_len > size:
+            return None
+        hdr = _read_dbf_header(mv[:header_len])
+        layout = DbfLayout(hdr, only)
+        if not layout.valid:
+            return None
+
+        out = _new_columns(layout)
+        rec_len = hdr.record_len
+        # the header count may disagree with the file size (truncated copy, logger
+        # still writing): decode only records that are really there and complete
+        end = min(hdr.records, (size - header_len) // rec_len)
+        hdr.read_end = max(start, end)
+        left = end - start
+        pos = header_len + start * rec_len
+        while left > 0:
+            n = min(block_records, left)
+            block = mv[pos:pos + n * rec_len]
+            try:
+                _decode_block(layout, block, n, out)
+            finally:
+                block.release()
+            pos += n * rec_len
+            left -= n
+            if progress is not None:
+                progress.advance(n, n * rec_len)
+    return hdr, out
+
+
+def read_dbf_columns(dbf_path: str, block_records: int = DBF_BLOCK_RECORDS,
+                     only: Optional[Collection[str]] = None,
+                     progress: Optional[LoadProgress] = None,
+                     start: int = 0) -> Tuple[DbfHeader, Dict[str, Any]]:
+    """Bulk decoder: return (header, {field: column}).
+
+    N fields come back as array('d') with NaN for empty values, other fields as
+    lists of the same values iter_dbf_rows() yields. Deleted records are skipped.
+    only     -- decode just these fields (others are skipped, not parsed).
+    progress -- advanced after every block (and may cancel the read).
+    start    -- first physical record to read (the tail of a growing file);
+                hdr.read_end is where the next read should start.
+
+    The file is memory-mapped (shared page cache, no per-block copies); plain
+    block reads are the fallback when mapping is not possible.
+    """
+    with open(dbf_path, "rb") as f:
+        mm = _map_file(f)
+        if mm is not None:
+            try:
+                res = _read_columns_mapped(mm, block_records, only, progress, start)
+            finally:
+                mm.close()
+            if res is not None:
+                return res
+            f.seek(0)
+
+        hdr = _read_dbf_header_from_file(f)
+        layout = DbfLayout(hdr, only)
+        if not layout.valid:
+            rows = list(_iter_rows_from(f, hdr, start))
+            hdr.read_end = max(start, (f.tell() - hdr.header_len) // max(1, hdr.record_len))
+            return hdr, _rows_to_columns(rows, hdr, only)
+
+        f.seek(hdr.header_len + start * hdr.record_len)
+        out = _new_columns(layout)
+        rec_len = hdr.record_len
+        left = hdr.records - start
+        hdr.read_end = start
+        while left > 0:
+            want = min(block_records, left)
+            buf = f.read(want * rec_len)
+            n = len(buf) // rec_len
+            if n <= 0:
+                break
+            _decode_block(layout, memoryview(buf)[:n * rec_len], n, out)
+            left -= n
+            hdr.read_end += n
+            if progress is not None:
+                progress.advance(n, n * rec_len)
+            if n < want:
+                break  # truncated file: same as the short read in iter_dbf_rows
+        return hdr, out
+
+
+# ------------- Columnar dataset -------------
+
+
+class RowView(Sequence):
+    """Read-only list-of-dicts view over ColumnarDataset (legacy callers).
+
+    Rows are materialized on access, nothing is stored per sample.
+    """
+
+    def __init__(self, ds: "ColumnarDataset"):
+        self._ds = ds
+
+    def __len__(self) -> int:
+        return len(self._ds)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._ds.row(j) for j in range(*i.indices(len(self._ds)))]
+        if i < 0:
+            i += len(self._ds)
+        if i < 0 or i >= len(self._ds):
+            raise IndexError("row index out of range")
+        return self._ds.row(i)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self._ds)):
+            yield self._ds.row(i)
+
+
+# unique per dataset object for the process lifetime (cache keys; id() gets reused)
+_DATASET_VERSIONS = count(1)
+
+# per dataset: prefix-sum stats indexes (~16-24 bytes/sample per channel) kept in an LRU
+STATS_INDEX_BYTES = 256 * 1024 * 1024
+
+
+class ColumnarDataset:
+    """Test data stored by columns.
+
+    t_ms     -- array('q'), sorted sample times (ms since epoch)
+    columns  -- {code: array('d')}, one value per sample, NaN = no value
+    version  -- process-unique number of this dataset (cache keys)
+    revision -- number of append()s so far (a followed test grows at the end)
+
+    Read channels through column()/values()/value(): subclasses may decode
+    them on first use.
+    """
+
+    def __init__(self, t_ms: array, columns: Dict[str, array], cols: Optional[Iterable[str]] = None):
+        self.version = next(_DATASET_VERSIONS)
+        self.t_ms = t_ms
+        self.columns = columns
+        self.cols: List[str] = sorted(columns if cols is None else cols)
+        self._colset = set(self.cols)
+        self._pyramids: Dict[str, MinMaxPyramid] = {}
+        self._pyramid_lock = threading.Lock()
+        self._stats_index: "OrderedDict[str, StatsIndex]" = OrderedDict()
+        self._stats_index_bytes = 0
+        self.revision = 0
+
+    def __len__(self) -> int:
+        return len(self.t_ms)
+
+    def has(self, code: str) -> bool:
+        return code in self._colset
+
+    def column(self, code: str) -> Optional[array]:
+        return self.columns.get(code)
+
+    def load_column(self, code: str) -> Optional[array]:
+        """Like column(), but bypasses any column cache (bulk readers, cache writer)."""
+        return self.column(code)
+
+    def value(self, i: int, code: str) -> Optional[float]:
+        col = self.column(code)
+        if col is None:
+            return None
+        v = col[i]
+        return v if v == v else None
+
+    def values(self, code: str, i0: int, i1: int, step: int = 1) -> List[Optional[float]]:
+        """Slice of one channel with NaN converted to None (JSON/Excel friendly)."""
+        col = self.column(code)
+        if col is None:
+            return [None] * len(range(i0, min(i1, len(self)), step))
+        return get_backend().take(col, i0, i1, step)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held: time index, decoded columns, pyramids, stats indexes."""
+        n = self.t_ms.itemsize * len(self.t_ms)
+        n += sum(c.itemsize * len(c) for c in list(self.columns.values()))
+        n += sum(p.nbytes for p in list(self._pyramids.values()))
+        return n + self._stats_index_bytes
+
+    def pyramid(self, code: str) -> Optional[MinMaxPyramid]:
+        """Min/max pyramid of a channel, built on first use and kept (~1 byte/sample)."""
+        pyr = self._pyramids.get(code)
+        if pyr is not None or not self.has(code):
+            return pyr
+        with self._pyramid_lock:
+            pyr = self._pyramids.get(code)
+            if pyr is None:
+                pyr = self._pyramids[code] = get_backend().build_pyramid(self.column(code))
+        return pyr
+
+    def minmax_plan(self, i0: int, i1: int, max_points: int) -> MinMaxPlan:
+        return MinMaxPlan(len(self), i0, i1, max_points)
+
+    def minmax_values(self, code: str, plan: MinMaxPlan) -> List[Optional[float]]:
+        """Min/max envelope of one channel for plan.times(self.t_ms)."""
+        pyr = self.pyramid(code)
+        if pyr is None:
+            return [None] * len(plan.times(self.t_ms))
+        return get_backend().minmax(self.column(code), pyr, plan)
+
+    def lttb(self, code: str, i0: int, i1: int, max_points: int) -> Tuple[List[int], List[Optional[float]]]:
+        """(times, values) of one channel reduced by LTTB; None marks data gaps."""
+        col = self.column(code)
+        if col is None:
+            return [], []
+        return get_backend().lttb(self.t_ms, col, i0, i1, max_points)
+
+    def stats_index(self, code: str) -> Optional[StatsIndex]:
+        """Prefix-sum index of a channel, built on first use (LRU of STATS_INDEX_BYTES)."""
+        if not self.has(code):
+            return None
+        with self._pyramid_lock:
+            idx = self._stats_index.get(code)
+            if idx is not None:
+                self._stats_index.move_to_end(code)
+                return idx
+            idx = self._stats_index[code] = get_backend().build_stats_index(self.column(code))
+            self._stats_index_bytes += idx.nbytes
+            while self._stats_index_bytes > STATS_INDEX_BYTES and len(self._stats_index) > 1:
+                _, old = self._stats_index.popitem(last=False)
+                self._stats_index_bytes -= old.nbytes
+        return idx
+
+    def stats(self, code: str, i0: int, i1: int) -> Dict[str, Any]:
+        """count/min/max/mean/std/first/last of one channel over samples i0..i1-1
+        (NaN skipped); after the first call per channel the cost doesn't depend on
+        the range length."""
+        idx = self.stats_index(code)
+        if idx is None:
+            return {"count": 0, "min": None, "max": None, "mean": None, "std": None, "first": None, "last": None}
+        return get_backend().range_stats(self.column(code), self.pyramid(code), idx, i0, i1)
+
+    def bucket_means(self, code: str, edges_ms: Sequence[int]) -> List[Optional[float]]:
+        """Mean of one channel per time bucket [edges_ms[k], edges_ms[k + 1]) (None = no values)."""
+        idx = self.stats_index(code)
+        if idx is None:
+            return [None] * max(0, len(edges_ms) - 1)
+        return get_backend().bucket_means(self.t_ms, idx, edges_ms)
+
+    def resample_plan(self, grid_ms: Sequence[int], method: str = "nearest",
+                      max_gap_ms: int = 0, window_ms: int = 0) -> ResamplePlan:
+        return ResamplePlan(self.t_ms, grid_ms, method, max_gap_ms, window_ms)
+
+    def resample(self, code: str, plan: ResamplePlan) -> List[Optional[float]]:
+        """One channel on plan.grid (None = no value; see ResamplePlan)."""
+        col = self.column(code)
+        if col is None:
+            return [None] * len(plan.grid)
+        pyr = self.pyramid(code) if plan.method in ("min", "max") else None
+        idx = self.stats_index(code) if plan.method == "mean" else None
+        return get_backend().resample(self.t_ms, col, plan, pyr, idx)
+
+    def append(self, t_ms: array, columns: Dict[str, array]) -> int:
+        """Add samples recorded after the current last one (a followed test);
+        returns how many were added.
+
+        Older samples are dropped (the time index stays sorted), channels
+        missing in `columns` get NaN, new channels NaN before. Existing
+        samples never change, so readers are not locked out: the channels,
+        pyramids and stats indexes grow first and the time column last, i.e.
+        whatever len() a reader sees is covered by the rest.
+        """
+        n_old = len(self)
+        if n_old and len(t_ms) and t_ms[0] < self.t_ms[-1]:
+            skip = bisect_left(t_ms, self.t_ms[-1])
+            t_ms = t_ms[skip:]
+            columns = {code: vals[skip:] for code, vals in columns.items()}
+        n_new = len(t_ms)
+        if not n_new:
+            return 0
+        backend = get_backend()
+        with self._pyramid_lock:
+            added = [code for code in columns if code not in self._colset]
+            if added:
+                self.cols = sorted(self.cols + added)
+                self._colset.update(added)
+            self._grow_columns(n_old, {code: columns.get(code) or array("d", [NAN]) * n_new for code in self.cols})
+            # indexes of channels that are not decoded are dropped (rebuilt on use)
+            for code, pyr in list(self._pyramids.items()):
+                col = self._decoded(code)
+                if col is None:
+                    del self._pyramids[code]
+                else:
+                    self._pyramids[code] = backend.extend_pyramid(pyr, col, n_old)
+            for code, idx in list(self._stats_index.items()):
+                col = self._decoded(code)
+                self._stats_index_bytes -= idx.nbytes
+                if col is None:
+                    del self._stats_index[code]
+                else:
+                    idx = self._stats_index[code] = backend.extend_stats_index(idx, col, n_old)
+                    self._stats_index_bytes += idx.nbytes
+            self.t_ms = grow(self.t_ms, t_ms)
+            self.revision += 1
+        return n_new
+
+    def _decoded(self, code: str) -> Optional[array]:
+        """The channel if it is in memory (no decoding)."""
+        return self.columns.get(code)
+
+    def _grow_columns(self, n_old: int, tails: Dict[str, array]) -> None:
+        for code, vals in tails.items():
+            col = self.columns.get(code)
+            if col is None:
+                col = array("d", [NAN]) * n_old
+            self.columns[code] = grow(col, vals)
+
+    def iter_columns(self, workers: Optional[int] = None) -> Iterator[Tuple[str, array]]:
+        """(code, column) for every channel, bypassing any column cache (the
+        cache writer); workers -- see load_test()."""
+        for code in self.cols:
+            yield code, self.load_column(code)
+
+    def row(self, i: int) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"t_ms": self.t_ms[i]}
+        for code in self.cols:
+            v = self.column(code)[i]
+            out[code] = v if v == v else None
+        return out
+
+    @property
+    def rows(self) -> RowView:
+        return RowView(self)
+
+
+class LazyColumnarDataset(ColumnarDataset):
+    """Channels are decoded by `loader(code)` on first use.
+
+    Decoded columns are kept in an LRU bounded by `cache_bytes` (the most
+    recently used column always stays). Samples added by append() are kept
+    for every channel and joined to what the loader returns (the first
+    `base` samples).
+    """
+
+    def __init__(self, t_ms: array, cols: Iterable[str], loader: Callable[[str], array], cache_bytes: int):
+        super().__init__(t_ms, OrderedDict(), cols)
+        self._loader = loader
+        self._cache_bytes = cache_bytes
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._decode_lock = threading.Lock()
+        self._base = len(t_ms)
+        self._base_cols = set(self.cols)
+        self._appended: Dict[str, array] = {}
+
+    @property
+    def nbytes(self) -> int:
+        return super().nbytes + sum(a.itemsize * len(a) for a in list(self._appended.values()))
+
+    def _load(self, code: str) -> array:
+        col = self._loader(code) if code in self._base_cols else array("d", [NAN]) * self._base
+        tail = self._appended.get(code)
+        if tail is not None:
+            col.extend(tail)
+        return col
+
+    def _decoded(self, code: str) -> Optional[array]:
+        with self._lock:
+            return self.columns.get(code)
+
+    def _grow_columns(self, n_old: int, tails: Dict[str, array]) -> None:
+        with self._decode_lock:
+            for code, vals in tails.items():
+                self._appended[code] = grow(self._appended.get(code, array("d")), vals)
+            with self._lock:
+                for code, col in list(self.columns.items()):
+                    self.columns[code] = grow(col, tails[code])
+                    self._bytes += col.itemsize * len(tails[code])
+
+    def _cached(self, code: str) -> Optional[array]:
+        with self._lock:
+            col = self.columns.get(code)
+            if col is not None:
+                self.columns.move_to_end(code)
+            return col
+
+    def column(self, code: str) -> Optional[array]:
+        if code not in self._colset:
+            return None
+        col = self._cached(code)
+        if col is not None:
+            return col
+        with self._decode_lock:
+            col = self._cached(code)  # decoded by another request meanwhile
+            if col is not None:
+                return col
+            col = self._load(code)
+            # published before append() (_grow_columns) can run: it extends the
+            # cached columns, so one it missed would stay shorter than t_ms
+            with self._lock:
+                self.columns[code] = col
+                self._bytes += col.itemsize * len(col)
+                while self._bytes > self._cache_bytes and len(self.columns) > 1:
+                    _, old = self.columns.popitem(last=False)
+                    self._bytes -= old.itemsize * len(old)
+        return col
+
+    def load_column(self, code: str) -> Optional[array]:
+        if code not in self._colset:
+            return None
+        return self._cached(code) or self._load(code)
+
+    def iter_columns(self, workers: Optional[int] = None) -> Iterator[Tuple[str, array]]:
+        """Decoded channels as they are, the others in one pass of the loader
+        over the sources when it has one (_DbfColumnLoader.load_many)."""
+        load_many = getattr(self._loader, "load_many", None)
+        if load_many is None:
+            yield from super().iter_columns(workers)
+            return
+        with self._lock:
+            decoded = dict(self.columns)
+        yield from decoded.items()
+        missing = [code for code in self.cols if code not in decoded]
+        for code, col in load_many([code for code in missing if code in self._base_cols], workers):
+            tail = self._appended.get(code)
+            if tail is not None:
+                col.extend(tail)
+            yield code, col
+        for code in missing:
+            if code not in self._base_cols:
+                yield code, self._load(code)
+
+
+def _time_part_column(raw, n: int) -> List[int]:
+    """Ore/Minuti/... column -> ints, missing/unparsable values -> 0."""
+    if raw is None:
+        return [0] * n
+    if isinstance(raw, array):
+        try:
+            return list(map(int, raw))
+        except (ValueError, OverflowError):
+            pass  # NaN/inf somewhere: per-value path below
+    out: List[int] = []
+    for v in raw:
+        try:
+            out.append(int(float(v or 0)))
+        except Exception:
+            out.append(0)
+    return out
+
+
+def _to_column_value(v: Any) -> float:
+    if v is None:
+        return NAN
+    if isinstance(v, (int, float)):
+        return float(v)
+    try:
+        return float(str(v).replace(",", "."))
+    except Exception:
+        return NAN
+
+
 # ------------- Test loader -------------
 
 _TIME_COLS = {"Data", "Ore", "Minuti", "Secondi", "mSecondi"}
@@ -257,16 +921,385 @@ def _dbf_sort_key(path: str) -> int:
     return int(m.group(1)) if m else 0
 
 
-def load_test(folder: str):
-    root = _find_test_root(folder)
+# mSecondi -> fraction added by datetime.timestamp() (microsecond / 1e6)
+_MS_FRACTION = [(ms * 1000) / 1e6 for ms in range(1000)]
+
+
+def _hour_base(d: date, hh: int) -> Optional[int]:
+    """Epoch seconds of local d hh:00:00, or None if the hour is not a plain
+    3600 s stretch of local time (DST switch inside it)."""
+    s0 = datetime(d.year, d.month, d.day, hh).timestamp()
+    s1 = datetime(d.year, d.month, d.day, hh, 59, 59).timestamp()
+    if s1 - s0 != 3599:
+        return None
+    return int(s0)
+
+
+class _HourBases(dict):
+    """(date, hour) -> _hour_base(), computed on first lookup."""
+
+    def __missing__(self, key):
+        v = self[key] = _hour_base(*key)
+        return v
+
+
+def _timestamps_ms(dates: List[Any], hh: List[int], mi: List[int], ss: List[int], mss: List[int],
+                   keep: List[int]) -> array:
+    """t_ms for the kept records, same values as
+    int(datetime(d, hh, mi, ss, mss * 1000).timestamp() * 1000).
+
+    The local-time offset (incl. DST) is resolved once per (date, hour) by
+    datetime itself; everything else is column arithmetic with map(), i.e. no
+    Python-level work per record. Columns with out-of-range parts or an hour
+    containing a DST switch take the per-record path.
+    """
+    if len(keep) != len(dates):
+        pick = lambda col: [col[i] for i in keep]  # noqa: E731
+        dates, hh, mi, ss, mss = pick(dates), pick(hh), pick(mi), pick(ss), pick(mss)
+    if not dates:
+        return array("q")
+
+    bases = _HourBases()
+    if (0 <= min(hh) and max(hh) <= 23 and 0 <= min(mi) and max(mi) <= 59
+            and 0 <= min(ss) and max(ss) <= 59 and 0 <= min(mss) and max(mss) <= 999):
+        hour_base = list(map(bases.__getitem__, zip(dates, hh)))
+        if None not in hour_base:
+            sec = map(add, map(add, hour_base, map(mul, mi, repeat(60))), ss)
+            # same float steps as timestamp(): seconds + microsecond / 1e6, then * 1000
+            return array("q", map(int, map(mul, map(add, sec, map(_MS_FRACTION.__getitem__, mss)), repeat(1000))))
+
+    out = array("q")
+    for d, h, m, s, ms in zip(dates, hh, mi, ss, mss):
+        base = None
+        if 0 <= h <= 23 and 0 <= m <= 59 and 0 <= s <= 59 and 0 <= ms <= 999:
+            base = bases[(d, h)]
+        if base is None:
+            ts = datetime(d.year, d.month, d.day, h, m, s, ms * 1000)
+            out.append(int(ts.timestamp() * 1000))
+        else:
+            out.append(int((base + m * 60 + s + _MS_FRACTION[ms]) * 1000))
+    return out
+
+
+def _is_sorted(t: array) -> bool:
+    return all(t[i] <= t[i + 1] for i in range(len(t) - 1))
+
+
+@dataclass
+class _FilePlan:
+    """How the records of one file map onto the merged time index.
+
+    Lets a channel be decoded later (lazy mode) into exactly the samples the
+    time scan produced.
+    """
+    path: str
+    n_rec: int                  # non-deleted records seen by the scan
+    keep: Optional[array]       # record numbers with a valid date (None = all)
+    order: Optional[array]      # in-file time sort permutation (None = already sorted)
+    fields: Dict[str, str]      # channel field -> DBF type
+    records: int = 0            # physical records read (a follow goes on from here)
+
+
+def _decode_dbf_file(dbf_path: str, time_only: bool = False,
+                     progress: Optional[LoadProgress] = None,
+                     start: int = 0) -> Tuple[array, Dict[str, array], _FilePlan]:
+    """Decode one ProvaN.dbf into (t_ms, {code: values}, plan), sorted by time.
+
+    Runs in a worker process for multi-file tests: arrays pickle as raw bytes,
+    so the columns travel back to the parent cheaply.
+    time_only -- decode just the Data/Ore/... fields (lazy mode).
+    progress  -- in-process decoding only (it does not cross processes).
+    start     -- decode records from this one on (the new tail of a followed file).
+    """
+    t_ms = array("q")
+    columns: Dict[str, array] = {}
+
+    hdr, fcols = read_dbf_columns(dbf_path, only=_TIME_COLS if time_only else None, progress=progress,
+                                  start=start)
+    fields = {fd.name: fd.ftype for fd in hdr.fields if fd.name not in _TIME_COLS}
+    dates = fcols.get("Data")
+    if not dates:
+        return t_ms, columns, _FilePlan(dbf_path, 0, None, None, fields, hdr.read_end)
+    n_rec = len(dates)
+    keep = [i for i, d in enumerate(dates) if isinstance(d, date)]
+    if not keep:
+        return t_ms, columns, _FilePlan(dbf_path, n_rec, None, None, fields, hdr.read_end)
+    hh, mi, ss, mss = (_time_part_column(fcols.get(k), n_rec) for k in ("Ore", "Minuti", "Secondi", "mSecondi"))
+    t_ms = _timestamps_ms(dates, hh, mi, ss, mss, keep)
+
+    plan = _FilePlan(dbf_path, n_rec, array("l", keep) if len(keep) != n_rec else None, None, fields,
+                     hdr.read_end)
+    for k, raw in fcols.items():
+        if k not in _TIME_COLS:
+            columns[k] = _plan_values(plan, raw)
+
+    # a logger file is normally in time order -> sort only when needed (stable)
+    if not _is_sorted(t_ms):
+        order = sorted(range(len(t_ms)), key=t_ms.__getitem__)
+        t_ms = array("q", [t_ms[i] for i in order])
+        for k, col in list(columns.items()):
+            columns[k] = array("d", [col[i] for i in order])
+        plan.order = array("l", order)
+
+    return t_ms, columns, plan
+
+
+def _plan_values(plan: _FilePlan, raw) -> array:
+    """Decoded field -> float column restricted to the plan's kept records."""
+    vals = raw if isinstance(raw, array) else array("d", map(_to_column_value, raw))
+    if plan.keep is not None:
+        vals = array("d", [vals[i] for i in plan.keep])
+    elif len(vals) != plan.n_rec:
+        vals = vals[:plan.n_rec]  # file grew since the scan
+    return vals
+
+
+def _merge_segments(runs: List[array]) -> List[Tuple[int, int, int]]:
+    """k-way merge of sorted time runs -> [(run, start, end), ...] in output order.
+
+    Ties go to the earlier run, i.e. the same order as a stable sort of the
+    concatenated files. Whole stretches are taken with bisect, so files that
+    don't overlap cost one segment each.
+    """
+    heap = [(t[0], k) for k, t in enumerate(runs) if len(t)]
+    heapq.heapify(heap)
+    pos = [0] * len(runs)
+    segs: List[Tuple[int, int, int]] = []
+    while heap:
+        _, k = heapq.heappop(heap)
+        t = runs[k]
+        start = pos[k]
+        if heap:
+            nt, nk = heap[0]
+            end = bisect_right(t, nt, start) if k < nk else bisect_left(t, nt, start)
+        else:
+            end = len(t)
+        segs.append((k, start, end))
+        pos[k] = end
+        if end < len(t):
+            heapq.heappush(heap, (t[end], k))
+    return segs
+
+
+def _merge_times(times: List[array], segs: List[Tuple[int, int, int]]) -> array:
+    t_ms = array("q")
+    for k, i0, i1 in segs:
+        t_ms.extend(times[k][i0:i1])
+    return t_ms
+
+
+def _merge_column(per_run: List[Optional[array]], segs: List[Tuple[int, int, int]]) -> array:
+    col = array("d")
+    for k, i0, i1 in segs:
+        src = per_run[k]
+        if src is None:
+            # channel missing in this file: no values for its samples
+            col.extend(array("d", [NAN]) * (i1 - i0))
+        else:
+            col.extend(src[i0:i1])
+    return col
+
 
-    set_dir = os.path.join(root, "Set")
-    channels = parse_canali_def(os.path.join(set_dir, "Canali.def"))
+def _plan_columns(plan: _FilePlan, codes: Sequence[str]) -> Dict[str, array]:
+    """Channels of one file in the plan's sample order (one read of the file).
 
-    meta = {}
+    Runs in a worker process when the cache writer decodes a big test.
+    """
+    only = [code for code in codes if code in plan.fields]
+    out: Dict[str, array] = {}
+    if not only:
+        return out
+    _, fcols = read_dbf_columns(plan.path, only=only)
+    for code in only:
+        vals = _plan_values(plan, fcols[code])
+        if plan.order is not None:
+            vals = array("d", [vals[i] for i in plan.order])
+        out[code] = vals
+    return out
+
+
+class _DbfColumnLoader:
+    """Decode one channel from the test's DBF files (lazy mode)."""
+
+    def __init__(self, plans: List[_FilePlan], segs: List[Tuple[int, int, int]]):
+        self.plans = plans
+        self.segs = segs
+
+    def __call__(self, code: str) -> array:
+        return _merge_column([_plan_columns(plan, (code,)).get(code) for plan in self.plans], self.segs)
+
+    def load_many(self, codes: Sequence[str], workers: Optional[int] = None) -> Iterator[Tuple[str, array]]:
+        """(code, column) for all the codes from one read of each file (the
+        cache writer), not one read per channel. Big multi-file tests are
+        decoded in the process pool like load_test(), so this process (and
+        its GIL) is left to the requests."""
+        codes = list(codes)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(self.plans))
+        per_file: Optional[List[Dict[str, array]]] = None
+        if workers > 1:
+            total = 0
+            for plan in self.plans:
+                try:
+                    total += os.path.getsize(plan.path)
+                except OSError:
+                    pass
+            if total >= PARALLEL_MIN_BYTES:
+                try:
+                    per_file = list(_get_pool(workers).map(_plan_columns, self.plans, repeat(codes)))
+                except (OSError, RuntimeError, ImportError, EOFError) as e:
+                    try:
+                        print("[LOAD] process pool failed, decoding sequentially:", e)
+                    except Exception:
+                        pass
+                    _drop_pool()
+        if per_file is None:
+            per_file = [_plan_columns(plan, codes) for plan in self.plans]
+        for code in codes:
+            # popped: every merged column frees its per-file parts
+            yield code, _merge_column([cols.pop(code, None) for cols in per_file], self.segs)
+
+
+# Multi-file tests are decoded in a process pool (one file per task).
+# Below this total size the pool start-up costs more than it saves.
+PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+
+_POOL = None
+_POOL_WORKERS = 0
+_POOL_LOCK = threading.Lock()
+
+
+def _get_pool(workers: int):
+    global _POOL, _POOL_WORKERS
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_WORKERS != workers:
+            if _POOL is not None:
+                _POOL.shutdown(wait=False)
+            # spawn: the server is multi-threaded, forking it is not safe
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _POOL_WORKERS = workers
+        return _POOL
+
+
+def _drop_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False)
+        _POOL = None
+
+
+def dbf_records_available(path: str) -> int:
+    """Whole records in a DBF now: the header count, but no more than the
+    file holds (a logger may update the count before the record is complete)."""
+    with open(path, "rb") as f:
+        head = f.read(12)
+        size = os.fstat(f.fileno()).st_size
+    if len(head) < 12:
+        return 0
+    header_len = int.from_bytes(head[8:10], "little")
+    record_len = int.from_bytes(head[10:12], "little")
+    if record_len <= 0 or size < header_len:
+        return 0
+    return min(int.from_bytes(head[4:8], "little"), (size - header_len) // record_len)
+
+
+def _dbf_record_count(path: str) -> int:
+    """Record count from the DBF header (0 if unreadable)."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(8)
+    except OSError:
+        return 0
+    return int.from_bytes(head[4:8], "little") if len(head) == 8 else 0
+
+
+def _decode_pooled(pool, dbfs: List[str], time_only: bool, progress: Optional[LoadProgress],
+                   sizes: List[int], records: List[int]) -> List[Tuple[array, Dict[str, array], _FilePlan]]:
+    if progress is None:
+        return list(pool.map(_decode_dbf_file, dbfs, [time_only] * len(dbfs)))
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    futs = [pool.submit(_decode_dbf_file, p, time_only) for p in dbfs]
+    index = {f: k for k, f in enumerate(futs)}
+    pending = set(futs)
+    try:
+        while pending:
+            # wake up now and then so a cancel doesn't wait for a whole file
+            done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+            for f in done:
+                f.result()  # re-raise worker errors here
+                k = index[f]
+                progress.advance(records[k], sizes[k])
+                progress.file_done()
+            progress.check()
+    except LoadCancelled:
+        for f in pending:
+            f.cancel()  # files already in a worker finish there and are dropped
+        raise
+    return [f.result() for f in futs]
+
+
+def _decode_files(dbfs: List[str], workers: Optional[int], time_only: bool = False,
+                  progress: Optional[LoadProgress] = None) -> List[Tuple[array, Dict[str, array], _FilePlan]]:
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(dbfs))
+    sizes = []
+    for p in dbfs:
+        try:
+            sizes.append(os.path.getsize(p))
+        except OSError:
+            sizes.append(0)
+    total = sum(sizes)
+    records = [_dbf_record_count(p) for p in dbfs] if progress is not None else [0] * len(dbfs)
+    if progress is not None:
+        progress.files_total = len(dbfs)
+        progress.records_total = sum(records)
+        progress.bytes_total = total
+        progress.set_phase("decode")
+    if workers > 1 and total >= PARALLEL_MIN_BYTES:
+        try:
+            return _decode_pooled(_get_pool(workers), dbfs, time_only, progress, sizes, records)
+        except (OSError, RuntimeError, ImportError, EOFError) as e:
+            # BrokenProcessPool is a RuntimeError; fall back to in-process decoding
+            try:
+                print("[LOAD] process pool failed, decoding sequentially:", e)
+            except Exception:
+                pass
+            _drop_pool()
+            if progress is not None:
+                progress.files_done = progress.records_done = progress.bytes_done = 0
+    out = []
+    for p in dbfs:
+        out.append(_decode_dbf_file(p, time_only, progress))
+        if progress is not None:
+            progress.file_done()
+    return out
+
+
+@dataclass
+class ProvaFiles:
+    root: str
+    dbfs: List[str]     # ProvaN.dbf, in N order
+    dat: str            # first Prova*.dat ("" if none)
+    canali: str         # Set/Canali.def (may not exist)
+
+    def all_paths(self) -> List[str]:
+        return list(self.dbfs) + [p for p in (self.dat, self.canali) if p]
+
+
+def find_test_files(folder: str) -> ProvaFiles:
+    root = _find_test_root(folder)
+
+    dat = ""
     for fname in os.listdir(root):
         if re.match(r"Prova\d+\.dat$", fname, re.IGNORECASE):
-            meta = parse_prova_dat(os.path.join(root, fname))
+            dat = os.path.join(root, fname)
             break
 
     dbfs = []
@@ -277,59 +1310,87 @@ def load_test(folder: str):
         raise FileNotFoundError("В папке теста нет Prova*.dbf")
     dbfs.sort(key=_dbf_sort_key)
 
-    data_rows: List[Dict[str, Any]] = []
-    cols_set = set()
-
-    for dbf in dbfs:
-        for r in iter_dbf_rows(dbf):
-            d = r.get("Data")
-            if not isinstance(d, date):
-                continue
-
-            try:
-                hh = int(float(r.get("Ore") or 0))
-            except Exception:
-                hh = 0
-            try:
-                mm = int(float(r.get("Minuti") or 0))
-            except Exception:
-                mm = 0
-            try:
-                ss = int(float(r.get("Secondi") or 0))
-            except Exception:
-                ss = 0
-            try:
-                mss = int(float(r.get("mSecondi") or 0))
-            except Exception:
-                mss = 0
-
-            ts = datetime(d.year, d.month, d.day, hh, mm, ss, mss * 1000)
-
-            row2: Dict[str, Any] = {"t_ms": int(ts.timestamp() * 1000)}
-            for k, v in r.items():
-                if k in _TIME_COLS:
-                    continue
-                if v is None:
-                    row2[k] = None
-                elif isinstance(v, (int, float)):
-                    row2[k] = float(v)
-                else:
-                    try:
-                        row2[k] = float(str(v).replace(",", "."))
-                    except Exception:
-                        row2[k] = str(v)
-
-            data_rows.append(row2)
-            cols_set.update(row2.keys())
+    return ProvaFiles(root=root, dbfs=dbfs, dat=dat, canali=os.path.join(root, "Set", "Canali.def"))
 
-    data_rows.sort(key=lambda x: x["t_ms"])
-    cols_set.discard("t_ms")
-    cols = sorted(cols_set)
 
+def make_test_data(root: str, meta: Dict[str, str], channels: Dict[str, ChannelInfo], ds: ColumnarDataset,
+                   sources: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """The dict load_test() returns (also built from the on-disk cache)."""
     return {
         "root": root,
         "meta": meta,
         "channels": channels,  # dict[str, ChannelInfo]
-        "rows": data_rows,     # list[dict], t_ms + values
-        "cols": cols,
+        "dataset": ds,         # ColumnarDataset: t_ms + one array per channel
+        "rows": ds.rows,       # legacy row view (dict per sample, built on access)
+        "cols": ds.cols,
+        "sources": sources or {},  # ProvaN.dbf path -> records in the dataset (read_test_tail)
     }
+
+
+def read_test_tail(files: ProvaFiles, sources: Dict[str, int]) -> Tuple[array, Dict[str, array], Dict[str, int]]:
+    """Records written since the last read: (t_ms, {code: values}, new sources).
+
+    sources -- ProvaN.dbf path -> records already read (load_test()'s
+               "sources"); files not in it (a new ProvaN+1.dbf) are read whole.
+    Only complete records are read; a half-written last one waits for the
+    next call. Raises ValueError when a file got shorter (it was replaced).
+    """
+    out = dict(sources)
+    runs = []
+    for path in files.dbfs:
+        start = sources.get(path, 0)
+        avail = dbf_records_available(path)
+        if avail < start:
+            raise ValueError(f"Файл {os.path.basename(path)} стал короче, загрузите тест заново")
+        if avail == start:
+            continue
+        t_ms, columns, plan = _decode_dbf_file(path, start=start)
+        out[path] = plan.records
+        if len(t_ms):
+            runs.append((t_ms, columns))
+    if not runs:
+        return array("q"), {}, out
+    times = [r[0] for r in runs]
+    segs = _merge_segments(times)
+    codes = sorted({k for _, cols in runs for k in cols})
+    columns = {code: _merge_column([r[1].get(code) for r in runs], segs) for code in codes}
+    return _merge_times(times, segs), columns, out
+
+
+# lazy mode: decoded channels kept in memory per test
+LAZY_CACHE_BYTES = 512 * 1024 * 1024
+
+
+def load_test(folder: str, workers: Optional[int] = None, lazy: bool = False,
+              cache_bytes: int = LAZY_CACHE_BYTES, progress: Optional[LoadProgress] = None):
+    """Load a test folder into a ColumnarDataset.
+
+    workers  -- processes used to decode ProvaN.dbf files in parallel
+                (None = one per CPU, 1 = decode in this process).
+    lazy     -- scan only the time fields now; each channel is decoded when it
+                is first requested (LazyColumnarDataset, LRU of cache_bytes).
+    progress -- filled while loading; its cancel() raises LoadCancelled here.
+    """
+    files = find_test_files(folder)
+
+    channels = parse_canali_def(files.canali)
+    meta = parse_prova_dat(files.dat) if files.dat else {}
+
+    decoded = _decode_files(files.dbfs, workers, time_only=lazy, progress=progress)
+    sources = {plan.path: plan.records for _, _, plan in decoded}
+    runs = [r for r in decoded if len(r[0])]
+    if progress is not None:
+        progress.set_phase("merge")
+    times = [r[0] for r in runs]
+    segs = _merge_segments(times)
+    t_ms = _merge_times(times, segs)
+    codes = sorted({k for _, _, plan in runs for k in plan.fields})
+
+    if lazy:
+        plans = [r[2] for r in runs]
+        ds: ColumnarDataset = LazyColumnarDataset(t_ms, codes, _DbfColumnLoader(plans, segs), cache_bytes)
+    else:
+        columns = {code: _merge_column([r[1].get(code) for r in runs], segs) for code in codes}
+        ds = ColumnarDataset(t_ms, columns)
+
+    return make_test_data(files.root, meta, channels, ds, sources)
@@ -3,18 +3,28 @@ from __future__ import annotations
 import os
 from flask import Flask
 
-from .config import PROJECT_ROOT
+from lemure_compute import get_backend, set_backend
+
+from .config import COMPUTE_BACKEND, PROJECT_ROOT
+from .http_cache import hash_static_files, static_url
 from .routes_pages import pages_bp
 from .routes_api import api_bp
 
 
 def create_app() -> Flask:
+    # "auto" keeps LEMURE_BACKEND from the environment (numpy when importable)
+    backend = get_backend() if COMPUTE_BACKEND == "auto" else set_backend(COMPUTE_BACKEND)
+    print(f"[COMPUTE] backend: {backend.name}")
+
     app = Flask(
         __name__,
         static_folder=os.path.join(PROJECT_ROOT, 'static'),
         template_folder=os.path.join(PROJECT_ROOT, 'templates'),
     )
 
+    hash_static_files(app.static_folder)
+    app.jinja_env.globals['static_url'] = static_url
+
     app.register_blueprint(pages_bp)
     app.register_blueprint(api_bp)
 
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+# client views remembered for generation checks (oldest forgotten first)
+MAX_VIEWS = 1024
+
+# check() -> True when the work may be dropped
+CancelCheck = Callable[[], bool]
+
+
+class Superseded(Exception):
+    """A newer request of the same view arrived: this one's work was dropped."""
+
+
+def never() -> bool:
+    return False
+
+
+class ViewGenerations:
+    """Latest request generation per client view.
+
+    The browser numbers the series requests of a view (a plot in a tab);
+    once a newer one arrives, the older ones in flight are not worth
+    finishing.
+    """
+
+    def __init__(self, max_views: int = MAX_VIEWS):
+        self.max_views = max_views
+        self._latest: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def begin(self, view: str, gen: Optional[int]) -> CancelCheck:
+        """Register request `gen` of `view`; returns its "superseded?" check."""
+        if not view or gen is None:
+            return never
+        with self._lock:
+            if gen > self._latest.get(view, -1):
+                self._latest[view] = gen
+            self._latest.move_to_end(view)
+            while len(self._latest) > self.max_views:
+                self._latest.popitem(last=False)
+
+        def superseded() -> bool:
+            return self._latest.get(view, gen) > gen
+        return superseded
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "checks")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.checks: List[CancelCheck] = []
+
+    def abandoned(self) -> bool:
+        # checks only grows; a late joiner that still wants the result keeps it alive
+        return all(check() for check in list(self.checks))
+
+
+class SingleFlight:
+    """Identical concurrent computations run once, the other callers wait
+    for that result.
+
+    fn(check) gets a check that turns True only when *every* caller waiting
+    for the result has been superseded; it should then raise Superseded.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Any, _Call] = {}
+        self._lock = threading.Lock()
+        self.shared = 0  # callers served by someone else's computation
+
+    def do(self, key: Any, fn: Callable[[CancelCheck], Any], check: CancelCheck = never) -> Any:
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                else:
+                    self.shared += 1
+                call.checks.append(check)
+            if leader:
+                try:
+                    call.result = fn(call.abandoned)
+                except BaseException as e:
+                    call.error = e
+                finally:
+                    with self._lock:
+                        del self._calls[key]
+                    call.done.set()
+            else:
+                call.done.wait()
+            if isinstance(call.error, Superseded) and not check():
+                continue  # dropped for the others, but this caller still wants it
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+
+# /api/series: identical queries share one computation; X-View-Id / X-View-Gen
+# headers let a newer request of a plot drop the older ones
+SERIES_FLIGHTS = SingleFlight()
+SERIES_VIEWS = ViewGenerations()
@@ -17,6 +17,47 @@ PRESETS_DIR = os.path.join(PROJECT_ROOT, "saved_presets")
 
 SETTINGS_FILE = os.path.join(PROJECT_ROOT, "viewer_settings.json")
 
+# Processes used to decode ProvaN.dbf files of one test in parallel
+# (None = one per CPU core, 1 = decode inside the server process).
+LOAD_WORKERS = None
+
+# Decoded tests are cached as binary columns for instant reloads.
+# DATASET_CACHE_DIR = None -> ".lemure_cache" inside the test folder.
+DATASET_CACHE = True
+DATASET_CACHE_DIR = None
+
+# Lazy mode: on load only the time index is built, a channel is decoded when it
+# is first plotted/exported. Decoded channels are kept up to LAZY_CACHE_BYTES.
+LAZY_LOAD = True
+LAZY_CACHE_BYTES = 512 * 1024 * 1024
+
+# Several tests stay loaded at once (switching back to one is instant, tabs can
+# view different tests); above this many bytes the least recently used is dropped.
+LOADED_TESTS_BYTES = 2 * 1024 * 1024 * 1024
+
+# /api/series keeps per-channel chunks of downsampled data up to this many bytes
+SERIES_CACHE_BYTES = 64 * 1024 * 1024
+
+# /api/resample: grid points per request at most
+RESAMPLE_MAX_POINTS = 200000
+
+# Follow mode (a test still being recorded): seconds between checks of its files
+FOLLOW_POLL_S = 1.0
+# /api/follow_stream: at most one batch of new samples per this many seconds per tab
+FOLLOW_STREAM_INTERVAL_S = 1.0
+
+# Background prefetch of the likely next /api/series windows (pans and zoom-out
+# around the viewed one, channels of a loaded preset). It runs only while no API
+# request is in progress, takes at most PREFETCH_CPU_SHARE of its thread's time
+# and stops once the series cache is fuller than PREFETCH_CACHE_SHARE.
+PREFETCH = True
+PREFETCH_CPU_SHARE = 0.25
+PREFETCH_CACHE_SHARE = 0.5
+
+# Compute backend for decoding/slicing/stats: "auto" (numpy when installed),
+# "python" (reference implementation) or "numpy".
+COMPUTE_BACKEND = "auto"
+
 
 def send_file_compat(send_file_fn, fp, mimetype: str, filename: str):
     """send_file compat for different Flask versions (download_name vs attachment_filename)."""
@@ -0,0 +1,215 @@
+"""On-disk columnar cache of decoded tests (instant reloads).
+
+The cache directory of a test holds one entry (a subdirectory named after
+the source fingerprint) per state of its files:
+  manifest.json  -- format version, source fingerprint, meta, channels, columns
+  t_ms.bin       -- time column, int64 little-endian
+  cNNNN.bin      -- one float64 little-endian file per channel (NaN = no value)
+
+The manifest is written last, so an entry without a valid manifest is simply
+ignored and rebuilt. An entry is never rewritten in place: a lazy dataset
+read from it loads its channels from there later on, so older entries are
+deleted only once no loaded dataset uses them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import weakref
+from array import array
+from typing import Any, Dict, List, Optional
+
+from lemure_reader import (
+    ChannelInfo,
+    ColumnarDataset,
+    LazyColumnarDataset,
+    ProvaFiles,
+    dbf_records_available,
+    find_test_files,
+    make_test_data,
+)
+
+from .config import DATASET_CACHE_DIR, LAZY_CACHE_BYTES, LOAD_WORKERS
+
+CACHE_FORMAT_VERSION = 1
+CACHE_SUBDIR = ".lemure_cache"
+MANIFEST = "manifest.json"
+
+
+def fingerprint(files: ProvaFiles) -> str:
+    """size/mtime of every source file + the DBF headers (record count etc.)."""
+    h = hashlib.sha1()
+    for p in files.all_paths():
+        try:
+            st = os.stat(p)
+        except OSError:
+            h.update(f"{os.path.basename(p)}:missing;".encode("utf-8"))
+            continue
+        h.update(f"{os.path.basename(p)}:{st.st_size}:{st.st_mtime_ns};".encode("utf-8"))
+        if p.lower().endswith(".dbf"):
+            try:
+                with open(p, "rb") as f:
+                    h.update(f.read(32))
+            except OSError:
+                pass
+    return h.hexdigest()
+
+
+def cache_dir_for(root: str) -> str:
+    if DATASET_CACHE_DIR:
+        key = hashlib.sha1(os.path.normcase(os.path.abspath(root)).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(DATASET_CACHE_DIR, key)
+    return os.path.join(root, CACHE_SUBDIR)
+
+
+def _entry_dir(cdir: str, fp: str) -> str:
+    return os.path.join(cdir, fp[:16])
+
+
+# entry directory -> lazy datasets still loading channels from it
+_USERS: Dict[str, "weakref.WeakSet[ColumnarDataset]"] = {}
+_USERS_LOCK = threading.Lock()
+
+
+def _use_entry(edir: str, ds: ColumnarDataset) -> None:
+    with _USERS_LOCK:
+        _USERS.setdefault(edir, weakref.WeakSet()).add(ds)
+
+
+def _drop_stale(cdir: str, keep: str) -> None:
+    """Delete the entries of a test other than `keep` that no loaded dataset
+    reads (and files of the old one-entry layout)."""
+    try:
+        names = os.listdir(cdir)
+    except OSError:
+        return
+    with _USERS_LOCK:
+        for name in names:
+            path = os.path.join(cdir, name)
+            if path == keep:
+                continue
+            if os.path.isdir(path):
+                if ".tmp" in name or len(_USERS.get(path) or ()):
+                    continue  # being written / in use
+                _USERS.pop(path, None)
+                shutil.rmtree(path, ignore_errors=True)
+            elif name == MANIFEST or name.endswith(".bin"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def _read_array(path: str, typecode: str, n: int) -> array:
+    a = array(typecode)
+    with open(path, "rb") as f:
+        a.fromfile(f, n)
+    if sys.byteorder != "little":
+        a.byteswap()
+    return a
+
+
+def _write_array(path: str, a: array) -> None:
+    if sys.byteorder != "little":
+        a = array(a.typecode, a)
+        a.byteswap()
+    with open(path, "wb") as f:
+        a.tofile(f)
+
+
+def load_cached(folder: str, files: Optional[ProvaFiles] = None, lazy: bool = False) -> Optional[Dict[str, Any]]:
+    """Return load_test()-style data from the cache, or None if missing/stale.
+
+    lazy -- read only the time column now, channel files on first use.
+    """
+    try:
+        files = files or find_test_files(folder)
+        fp = fingerprint(files)
+        cdir = _entry_dir(cache_dir_for(files.root), fp)
+        with open(os.path.join(cdir, MANIFEST), "r", encoding="utf-8") as f:
+            man = json.load(f)
+        if man.get("version") != CACHE_FORMAT_VERSION or man.get("fingerprint") != fp:
+            return None
+
+        n = int(man["points"])
+        t_ms = _read_array(os.path.join(cdir, man["t_ms"]), "q", n)
+        col_files: Dict[str, str] = man["columns"]
+        if lazy:
+            for fn in col_files.values():
+                if os.path.getsize(os.path.join(cdir, fn)) != n * 8:
+                    return None
+
+            def _loader(code: str) -> array:
+                return _read_array(os.path.join(cdir, col_files[code]), "d", n)
+
+            ds: ColumnarDataset = LazyColumnarDataset(t_ms, col_files, _loader, LAZY_CACHE_BYTES)
+            _use_entry(cdir, ds)
+        else:
+            ds = ColumnarDataset(t_ms, {code: _read_array(os.path.join(cdir, fn), "d", n) for code, fn in col_files.items()})
+        channels = {c["code"]: ChannelInfo(code=c["code"], name=c["name"], unit=c["unit"]) for c in man["channels"]}
+        # the fingerprint matched: the files hold exactly the cached records
+        sources = {p: dbf_records_available(p) for p in files.dbfs}
+        _drop_stale(os.path.dirname(cdir), cdir)
+        return make_test_data(files.root, man.get("meta") or {}, channels, ds, sources)
+    except (OSError, ValueError, KeyError, TypeError, EOFError):
+        return None
+
+
+def save_cached(data: Dict[str, Any], files: ProvaFiles, fp: str) -> bool:
+    """Write the cache entry for loaded data.
+
+    fp must be taken *before* decoding, so files changed meanwhile invalidate it.
+    Failures (read-only share etc.) are not fatal.
+    """
+    cdir = cache_dir_for(files.root)
+    edir = _entry_dir(cdir, fp)
+    # unique temp dir: two loads of the same test may write at the same time
+    tmp = f"{edir}.tmp{os.getpid()}_{threading.get_ident()}"
+    try:
+        os.makedirs(tmp, exist_ok=True)
+
+        ds: ColumnarDataset = data["dataset"]
+        t_ms = ds.t_ms
+        n = len(t_ms)  # a followed test may grow meanwhile: write these samples
+        _write_array(os.path.join(tmp, "t_ms.bin"), t_ms)
+        col_files: Dict[str, str] = {}
+        for i, (code, col) in enumerate(ds.iter_columns(LOAD_WORKERS)):
+            fn = f"c{i:04d}.bin"
+            _write_array(os.path.join(tmp, fn), col if len(col) == n else col[:n])
+            col_files[code] = fn
+
+        channels: List[Dict[str, str]] = [
+            {"code": ch.code, "name": ch.name, "unit": ch.unit} for ch in (data.get("channels") or {}).values()
+        ]
+        man = {
+            "version": CACHE_FORMAT_VERSION,
+            "fingerprint": fp,
+            "points": n,
+            "t_ms": "t_ms.bin",
+            "columns": col_files,
+            "channels": channels,
+            "meta": data.get("meta") or {},
+        }
+        with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(man, f, ensure_ascii=False)
+
+        try:
+            os.replace(tmp, edir)
+        except OSError:
+            if not os.path.isfile(os.path.join(edir, MANIFEST)):
+                raise
+            shutil.rmtree(tmp, ignore_errors=True)  # the other writer finished first
+        _drop_stale(cdir, edir)
+        return True
+    except Exception as e:
+        shutil.rmtree(tmp, ignore_errors=True)
+        try:
+            print("[CACHE] not saved:", e)
+        except Exception:
+            pass
+        return False
@@ -1,33 +1,104 @@
 from __future__ import annotations
 
 import io
+import tempfile
 import datetime as dt
-from typing import Any, Dict, List
+from typing import IO, Any, Callable, Iterator, List
 
+from lemure_reader import ColumnarDataset
 
-def export_csv(rows: List[Dict[str, Any]], channels: List[str]) -> bytes:
+from .xlsx_stream import TimeTableXlsx, excel_serial
+
+# CSV rows formatted and sent per block: memory stays bounded whatever the range
+CSV_BLOCK_ROWS = 4096
+
+# XLSX exports are kept in memory up to this size, larger ones in a temp file
+XLSX_SPOOL_BYTES = 16 * 1024 * 1024
+# timestamp column: Excel datetimes with milliseconds
+XLSX_TIME_FORMAT = "yyyy-mm-dd hh:mm:ss.000"
+
+
+def timestamp_formatter() -> Callable[[int], str]:
+    """ms -> "YYYY-MM-DD HH:MM:SS.mmm" (local time); the date/time part is
+    formatted once per second (consecutive samples mostly share it)."""
+    last = [None, ""]
+
+    def fmt(t: int) -> str:
+        sec, ms = divmod(t, 1000)
+        if sec != last[0]:
+            last[0] = sec
+            last[1] = dt.datetime.fromtimestamp(sec).strftime("%Y-%m-%d %H:%M:%S.")
+        return f"{last[1]}{ms:03d}"
+    return fmt
+
+
+def iter_csv(ds: ColumnarDataset, channels: List[str], i0: int, i1: int, step: int = 1,
+             block_rows: int = CSV_BLOCK_ROWS) -> Iterator[bytes]:
+    """CSV of every step-th sample of [i0, i1) as UTF-8 chunks (BOM first, for
+    Excel): the header, then one chunk per block of block_rows rows."""
     import csv
 
     out = io.StringIO()
     writer = csv.writer(out, delimiter=";")
     writer.writerow(["timestamp"] + channels)
-    for r in rows:
-        ts = dt.datetime.fromtimestamp(r["t_ms"] / 1000).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-        writer.writerow([ts] + [r.get(c) if r.get(c) is not None else "" for c in channels])
-    return out.getvalue().encode("utf-8-sig")
-
-
-def export_xlsx(rows: List[Dict[str, Any]], channels: List[str]) -> bytes:
-    from openpyxl import Workbook
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "data"
-    ws.append(["timestamp"] + channels)
-    for r in rows:
-        ts = dt.datetime.fromtimestamp(r["t_ms"] / 1000).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-        ws.append([ts] + [r.get(c) for c in channels])
-    bio = io.BytesIO()
-    wb.save(bio)
-    bio.seek(0)
-    return bio.getvalue()
+    yield out.getvalue().encode("utf-8-sig")
+
+    fmt = timestamp_formatter()
+    span = block_rows * step
+    for a in range(i0, i1, span):
+        b = min(i1, a + span)
+        out.seek(0)
+        out.truncate()
+        cols = [["" if v is None else v for v in ds.values(c, a, b, step)] for c in channels]
+        writer.writerows(zip(map(fmt, ds.t_ms[a:b:step]), *cols))
+        yield out.getvalue().encode("utf-8")
+
+
+def excel_times() -> Callable[[int], float]:
+    """ms -> Excel serial date of the local time; the second is converted
+    once per second, the milliseconds are added."""
+    last: List[Any] = [None, 0.0]
+
+    def conv(t: int) -> float:
+        sec, ms = divmod(t, 1000)
+        if sec != last[0]:
+            last[0] = sec
+            last[1] = excel_serial(dt.datetime.fromtimestamp(sec))
+        return last[1] + ms / 86400000.0
+    return conv
+
+
+def export_xlsx(ds: ColumnarDataset, channels: List[str], i0: int, i1: int, step: int = 1,
+                block_rows: int = CSV_BLOCK_ROWS) -> IO[bytes]:
+    """XLSX of every step-th sample of [i0, i1), rows streamed into the file
+    per block (TimeTableXlsx), timestamps as Excel dates. Returns the file,
+    in memory up to XLSX_SPOOL_BYTES and on disk beyond, positioned at 0."""
+    out = tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_BYTES)
+    try:
+        book = TimeTableXlsx(out, ["timestamp"] + channels, XLSX_TIME_FORMAT,
+                             rows_hint=len(range(i0, i1, step)))
+        to_serial = excel_times()
+        span = block_rows * step
+        for a in range(i0, i1, span):
+            b = min(i1, a + span)
+            book.write_rows([to_serial(t) for t in ds.t_ms[a:b:step]],
+                            [ds.values(c, a, b, step) for c in channels])
+        book.close()
+    except BaseException:
+        out.close()
+        raise
+    out.seek(0)
+    return out
+
+
+def iter_file(f: IO[bytes], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Response body read from f in chunks; f is closed at the end (or when
+    the client goes away)."""
+    try:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
@@ -9,10 +9,11 @@ from typing import Any, Dict, List
 
 from flask import jsonify
 
-from lemure_reader import ChannelInfo
+from lemure_compute import time_grid
+from lemure_reader import ChannelInfo, ColumnarDataset
 
 from ..config import TEMPLATE_FILE, PROJECT_ROOT
-from ..state import STATE, nearest_index
+from ..state import get_snapshot
 from ..settings import (
     get_viewer_settings,
     DEFAULT_VIEWER_SETTINGS,
@@ -24,24 +25,25 @@ from ..settings import (
 def export_template_impl(args) -> Any:
     """Fill template.xlsx preserving formatting/colors/formulas."""
 
-    if not STATE.get("loaded"):
-        return jsonify({"ok": False, "error": "Данные не загружены"}), 400
+    snap, err = get_snapshot(args)  # one snapshot for the whole export, even if a reload publishes another
+    if snap is None:
+        return jsonify({"ok": False, "error": err}), 400
 
-    data = STATE["data"]
-    rows: List[Dict[str, Any]] = data["rows"]
-    t_list: List[int] = STATE["t_list"]
+    data = snap.data
+    ds: ColumnarDataset = data["dataset"]
+    t_list = snap.t_list
     cols: List[str] = data.get("cols") or []
     channels: Dict[str, ChannelInfo] = data.get("channels") or {}
 
-    if not rows:
+    if not len(ds):
         return jsonify({"ok": False, "error": "Нет строк данных"}), 400
 
     try:
-        start_ms = int(float(args.get("start_ms", rows[0]["t_ms"])))
-        end_ms = int(float(args.get("end_ms", rows[-1]["t_ms"])))
+        start_ms = int(float(args.get("start_ms", t_list[0])))
+        end_ms = int(float(args.get("end_ms", t_list[-1])))
     except Exception:
-        start_ms = rows[0]["t_ms"]
-        end_ms = rows[-1]["t_ms"]
+        start_ms = t_list[0]
+        end_ms = t_list[-1]
 
     if start_ms > end_ms:
         start_ms, end_ms = end_ms, start_ms
@@ -53,21 +55,10 @@ def export_template_impl(args) -> Any:
     if t0 > end_ms:
         return jsonify({"ok": False, "error": "Пустой диапазон"}), 400
 
-    # build 20s grid
-    grid_ms: List[int] = []
-    g = t0
-    step_ms = 20000
-    while g <= end_ms:
-        grid_ms.append(g)
-        g += step_ms
-
-    idxs: List[int] = []
-    for g in grid_ms:
-        idx = nearest_index(t_list, g)
-        if idx < 0 or abs(t_list[idx] - g) > 30000:
-            idxs.append(-1)
-        else:
-            idxs.append(idx)
+    # 20 s grid from the first sample; each row is the sample nearest to its
+    # time, none when that is more than 30 s away
+    plan = ds.resample_plan(time_grid(t0, end_ms, 20000), "nearest", 30000)
+    idxs: List[int] = plan.index
 
     ch_arg = (args.get("channels") or "").strip()
     selected_list = [c.strip() for c in ch_arg.split(",") if c.strip()]
@@ -194,7 +185,7 @@ def export_template_impl(args) -> Any:
 
     # test folder path D1
     try:
-        ws['D1'].value = (STATE.get('folder') or '').strip()
+        ws['D1'].value = (snap.folder or '').strip()
     except Exception:
         pass
 
@@ -250,6 +241,9 @@ def export_template_impl(args) -> Any:
 
     base_raw_cols = sorted(set(key_to_col.values()))
 
+    # every written channel on the grid (in lazy mode: decoded once)
+    col_data = {code: ds.resample(code, plan) for code, _ in writers + extra_writers}
+
     needed_last_row = start_row + len(idxs) - 1
 
     template_max_row = ws.max_row
@@ -290,7 +284,7 @@ def export_template_impl(args) -> Any:
         ws.cell(row=r, column=2).value = _dt.timedelta(seconds=j * 20)
 
         if idx >= 0:
-            tms = rows[idx]["t_ms"]
+            tms = t_list[idx]
             dt_obj = dt.datetime.fromtimestamp(tms / 1000)
             ws.cell(row=r, column=3).value = dt_obj.time()
         else:
@@ -300,24 +294,13 @@ def export_template_impl(args) -> Any:
             ws.cell(row=r, column=colnum).value = None
 
         if idx >= 0:
-            row = rows[idx]
             for code, colnum in writers:
-                v = row.get(code)
+                v = col_data[code][j]
                 if v is not None:
-                    try:
-                        ws.cell(row=r, column=colnum).value = float(v)
-                    except Exception:
-                        pass
+                    ws.cell(row=r, column=colnum).value = v
 
             for code, colnum in extra_writers:
-                v = row.get(code)
-                if v is None:
-                    ws.cell(row=r, column=colnum).value = None
-                else:
-                    try:
-                        ws.cell(row=r, column=colnum).value = float(v)
-                    except Exception:
-                        ws.cell(row=r, column=colnum).value = None
+                ws.cell(row=r, column=colnum).value = col_data[code][j]
         else:
             for _, colnum in extra_writers:
                 ws.cell(row=r, column=colnum).value = None
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import datetime as dt
+import zipfile
+from itertools import count, repeat
+from typing import IO, List, Optional, Sequence
+from xml.sax.saxutils import escape
+
+# rows per sheet in Excel (the header included)
+XLSX_MAX_ROWS = 1048576
+# sheet XML bytes per cell at most (for the zip64 decision)
+_CELL_BYTES = 40
+
+_EXCEL_EPOCH = dt.datetime(1899, 12, 30)
+_EMPTY = "<c/>"
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# cell style 1 = the timestamp format
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="{time_format}"/></numFmts>'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+)
+
+
+def column_letter(k: int) -> str:
+    """0 -> "A", 25 -> "Z", 26 -> "AA"."""
+    s = ""
+    k += 1
+    while k:
+        k, r = divmod(k - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+
+def excel_serial(d: dt.datetime) -> float:
+    """Naive datetime -> Excel serial date (days since 1899-12-30)."""
+    delta = d - _EXCEL_EPOCH
+    return delta.days + (delta.seconds + delta.microseconds / 1e6) / 86400.0
+
+
+class TimeTableXlsx:
+    """One-sheet XLSX of a time table written row by row straight into the zip.
+
+    SpreadsheetML is produced as text (no cell objects): column A holds the
+    timestamps as Excel dates (style 1, time_format), the other columns
+    numbers, None = empty cell. The header row is written as inline strings.
+    """
+
+    def __init__(self, f: IO[bytes], header: Sequence[str], time_format: str,
+                 sheet_name: str = "data", time_width: float = 24, rows_hint: int = 0):
+        self._zip = zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED)
+        self._zip.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        self._zip.writestr("_rels/.rels", _ROOT_RELS)
+        self._zip.writestr("xl/workbook.xml", _WORKBOOK.format(name=escape(sheet_name, {'"': "&quot;"})))
+        self._zip.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        self._zip.writestr("xl/styles.xml", _STYLES.format(time_format=escape(time_format, {'"': "&quot;"})))
+        # zip64 only for a sheet that may pass 2 GB (older readers don't expect it)
+        big = rows_hint * len(header) * _CELL_BYTES >= zipfile.ZIP64_LIMIT
+        self._sheet = self._zip.open("xl/worksheets/sheet1.xml", "w", force_zip64=big)
+        self._letters = [column_letter(k) for k in range(len(header))]
+        self._row = 1
+        cells = "".join(f'<c r="{c}1" t="inlineStr"><is><t>{escape(str(h))}</t></is></c>'
+                        for c, h in zip(self._letters, header))
+        self._write(f'{_SHEET_HEAD}<cols><col min="1" max="1" width="{time_width}" customWidth="1"/></cols>'
+                    f'<sheetData><row r="1">{cells}</row>')
+
+    def _write(self, text: str) -> None:
+        self._sheet.write(text.encode("utf-8"))
+
+    def write_rows(self, serials: Sequence[float], columns: List[Sequence[Optional[float]]]) -> None:
+        """Rows of Excel serial times and the values of each column."""
+        # cells are built column by column; without r="..." they fill the row in order
+        cols = [[_EMPTY if v is None else f"<c><v>{v!r}</v></c>" for v in col] for col in columns]
+        r0 = self._row
+        rows = [f'<row r="{r}"><c s="1"><v>{t!r}</v></c>' for r, t in zip(count(r0 + 1), serials)]
+        self._row = r0 + len(rows)
+        self._write("".join(map("".join, zip(rows, *cols, repeat("</row>")))))
+
+    def close(self) -> None:
+        self._write('</sheetData></worksheet>')
+        self._sheet.close()
+        self._zip.close()
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import dataclasses
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from lemure_reader import find_test_files, read_test_tail
+
+from .config import FOLLOW_POLL_S
+from .dataset_cache import fingerprint
+from .state import REGISTRY, DatasetSnapshot, summary
+
+# one tail read at a time (a follower stopped mid-read and its successor must not both append)
+_POLL_LOCK = threading.Lock()
+
+
+class Follower:
+    """Live tail of one loaded test: the logger's new records are appended to
+    the loaded dataset (no reload).
+
+    Every FOLLOW_POLL_S the test folder is listed again (a new ProvaN+1.dbf
+    is picked up) and each ProvaN.dbf is read from the record where the
+    previous read stopped (data["sources"]), as far as its header count and
+    size both say records are complete.
+
+    state -- "running", "stopped" or "error" (error: the message)
+
+    Streams (/api/follow_stream) sleep in wait() and are woken after every
+    append and when following ends.
+    """
+
+    def __init__(self, snap: DatasetSnapshot):
+        self.snap = snap
+        self.state = "running"
+        self.error = ""
+        self.appended = 0
+        self.checked_at: Optional[float] = None
+        self.appended_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._changed = threading.Condition()
+
+    def poll(self) -> int:
+        """One check of the files; returns the number of samples appended."""
+        with _POLL_LOCK:
+            return self._poll()
+
+    def _poll(self) -> int:
+        snap = self.snap
+        data = snap.data
+        files = find_test_files(data["root"])
+        fp = fingerprint(files)  # before reading: a later write makes it differ again
+        t_ms, columns, sources = read_test_tail(files, data.get("sources") or {})
+        ds = snap.dataset
+        n = ds.append(t_ms, columns)
+        data["sources"] = sources
+        data["cols"] = ds.cols
+        self.checked_at = time.time()
+        if n:
+            self.appended += n
+            self.appended_at = self.checked_at
+            self._notify()
+        if fp != snap.fingerprint:
+            # a reload of the folder now finds this snapshot instead of decoding again
+            snap = dataclasses.replace(snap, fingerprint=fp)
+            if REGISTRY.update(snap):
+                self.snap = snap
+        return n
+
+    def _run(self) -> None:
+        print(f"[FOLLOW] started: {self.snap.data['root']}")
+        while not self._stop.wait(FOLLOW_POLL_S):
+            if REGISTRY.update(self.snap) is False:
+                self.state = "stopped"
+                self.error = "Тест выгружен из памяти или загружен заново"
+                break
+            try:
+                self.poll()
+            except Exception as e:
+                self.state = "error"
+                self.error = str(e)
+                break
+        else:
+            self.state = "stopped"
+        self._notify()
+        print(f"[FOLLOW] {self.state}: {self.snap.data['root']} (+{self.appended} points) {self.error}")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self.state == "running":
+            self.state = "stopped"
+        self._notify()
+
+    def _notify(self) -> None:
+        with self._changed:
+            self._changed.notify_all()
+
+    def wait(self, revision: int, timeout: float) -> None:
+        """Sleep until the dataset revision differs from `revision`, following
+        ends or `timeout` seconds pass."""
+        with self._changed:
+            if self.state == "running" and self.snap.dataset.revision == revision:
+                self._changed.wait(timeout)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            'dataset_id': self.snap.version,
+            'state': self.state,
+            'revision': self.snap.dataset.revision,
+            'appended': self.appended,
+            'checked_at': self.checked_at,
+            'appended_at': self.appended_at,
+            'summary': summary(self.snap.data),
+        }
+        if self.error:
+            out['error'] = self.error
+        return out
+
+
+_FOLLOWERS: Dict[str, Follower] = {}
+_LOCK = threading.Lock()
+
+
+def start_follow(snap: DatasetSnapshot) -> Follower:
+    """Follow a loaded test (one follower per folder; an older snapshot's
+    follower is stopped)."""
+    with _LOCK:
+        f = _FOLLOWERS.get(snap.key)
+        if f is not None and f.state == "running":
+            if f.snap.version == snap.version:
+                return f
+            f.stop()
+        f = _FOLLOWERS[snap.key] = Follower(snap)
+    threading.Thread(target=f._run, daemon=True, name=f"follow-{snap.version}").start()
+    return f
+
+
+def stop_follow(snap: DatasetSnapshot) -> Optional[Follower]:
+    with _LOCK:
+        f = _FOLLOWERS.get(snap.key)
+    if f is None or f.snap.version != snap.version:
+        return None
+    f.stop()
+    return f
+
+
+def get_follower(snap: DatasetSnapshot) -> Optional[Follower]:
+    with _LOCK:
+        f = _FOLLOWERS.get(snap.key)
+    return f if f is not None and f.snap.version == snap.version else None
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Tuple
+
+from lemure_compute import get_backend
+
+from .coalesce import SingleFlight
+from .config import FOLLOW_STREAM_INTERVAL_S
+from .follow import Follower
+from .state import DatasetSnapshot, summary
+
+MIMETYPE = 'text/event-stream'
+
+# a comment line this often keeps proxies from closing an idle stream and finds
+# closed tabs (the write fails)
+HEARTBEAT_S = 15.0
+# the browser's EventSource reconnects after this long (ms) if the stream breaks
+RETRY_MS = 3000
+# encoded batches kept for the other tabs asking for the same samples
+KEEP_BATCHES = 64
+
+
+def _event(name: str, data: Dict[str, Any], event_id: Any = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    body = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f"{head}event: {name}\ndata: {body}\n\n"
+
+
+class _Batches:
+    """Encoded "samples" events by (dataset version, length, channels, from, step).
+
+    Every tab following a test at the same step asks for the same batch after
+    each append; the first one slices and encodes it, the rest send the text.
+    The lock covers the memo only: batches are built outside it (decoding a
+    channel may take a while) and tabs asking for one being built wait for it.
+    """
+
+    def __init__(self, keep: int = KEEP_BATCHES):
+        self.keep = keep
+        self._items: "OrderedDict[Tuple, Tuple[str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.built = 0
+        self.hits = 0
+
+    @property
+    def shared(self) -> int:
+        return self.hits + self._flights.shared
+
+    def get(self, follower: Follower, channels: Tuple[str, ...], i0: int, step: int) -> Tuple[str, int]:
+        """(event text, next sample) for the samples i0.. of the channels:
+        every step-th on the global grid of multiples of step, like the
+        stride series of /api/series, so the tail continues the plotted line."""
+        snap = follower.snap
+        n = len(snap.dataset)
+        p0 = -(-i0 // step) * step
+        key = (snap.version, n, channels, p0, step)
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return hit
+        return self._flights.do(key, lambda _check: self._build(snap, key))
+
+    def _build(self, snap: DatasetSnapshot, key: Tuple) -> Tuple[str, int]:
+        _version, n, channels, p0, step = key
+        with self._lock:
+            hit = self._items.get(key)  # finished just before this flight started
+        if hit is not None:
+            return hit
+        ds = snap.dataset
+        backend = get_backend()
+        t_ms = list(ds.t_ms[p0:n:step])
+        series: Dict[str, List[Any]] = {}
+        for code in channels:
+            col = ds.column(code) if ds.has(code) else None
+            series[code] = backend.take(col, p0, n, step) if col is not None else [None] * len(t_ms)
+        nxt = p0 + len(t_ms) * step
+        text = _event('samples', {
+            'dataset_id': snap.version,
+            'revision': ds.revision,
+            'from': p0,
+            'next': nxt,
+            'step': step,
+            't_ms': t_ms,
+            'series': series,
+            'summary': summary(snap.data),
+        }, nxt)
+        with self._lock:
+            self._items[key] = (text, nxt)
+            while len(self._items) > self.keep:
+                self._items.popitem(last=False)
+            self.built += 1
+        return text, nxt
+
+
+BATCHES = _Batches()
+
+
+def follow_events(follower: Follower, channels: List[str], start: int, step: int,
+                  interval: float = FOLLOW_STREAM_INTERVAL_S) -> Iterator[str]:
+    """SSE body for one tab: "samples" events with the samples from `start`
+    on as the follower appends them (at most one per `interval` seconds,
+    later appends are sent together), then one "state" event when following
+    ends. The event id is the next sample, so a reconnecting EventSource
+    (Last-Event-ID) continues where it stopped."""
+    chans = tuple(channels)
+    step = max(1, step)
+    yield f"retry: {RETRY_MS}\n\n"
+    revision = -1
+    sent = 0.0
+    while True:
+        running = follower.state == "running"  # read first: whatever was appended until now gets sent
+        ds = follower.snap.dataset
+        if ds.revision != revision:
+            # the first batch may be empty: it still carries the summary
+            revision = ds.revision
+            text, start = BATCHES.get(follower, chans, start, step)
+            sent = time.monotonic()
+            yield text
+        if not running:
+            yield _event('state', follower.to_dict())
+            return
+        follower.wait(revision, HEARTBEAT_S)
+        if follower.snap.dataset.revision == revision and follower.state == "running":
+            yield ": ping\n\n"
+            continue
+        time.sleep(max(0.0, sent + interval - time.monotonic()))
+
+
+def stream_stats() -> Dict[str, int]:
+    return {'batches_built': BATCHES.built, 'batches_shared': BATCHES.shared}
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import time as time_mod
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from flask import Response, request
+
+# Data ETags: the dataset version is only unique within one server run
+BOOT_ID = f"{os.getpid():x}{int(time_mod.time()):x}"
+
+GZIP_MIN_BYTES = 2048
+GZIP_LEVEL = 5
+_GZIP_TYPES = {
+    'application/json', 'text/csv', 'text/html', 'text/css',
+    'application/javascript', 'text/javascript',
+}
+
+# static file (path relative to static/, "/" separators) -> content hash
+ASSET_HASHES: Dict[str, str] = {}
+
+
+def hash_static_files(static_dir: str) -> Dict[str, str]:
+    """Hash every file under static/ once (at startup); URLs carry the hash."""
+    ASSET_HASHES.clear()
+    for root, _dirs, files in os.walk(static_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                with open(path, 'rb') as f:
+                    digest = hashlib.sha1(f.read()).hexdigest()[:12]
+            except OSError:
+                continue
+            ASSET_HASHES[os.path.relpath(path, static_dir).replace(os.sep, '/')] = digest
+    return ASSET_HASHES
+
+
+def static_url(path: str) -> str:
+    v = ASSET_HASHES.get(path)
+    return f"/static/{path}?v={v}" if v else f"/static/{path}"
+
+
+def data_etag(tag: Any) -> str:
+    """ETag of a data response: dataset tag (DatasetSnapshot.data_tag) + the
+    full query (+ Accept, which selects the series format)."""
+    key = f"{BOOT_ID}|{tag}|{request.full_path}|{request.headers.get('Accept', '')}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+
+def not_modified(etag: str) -> Optional[Response]:
+    """304 response when the client already has this ETag (plain or gzip variant)."""
+    inm = request.if_none_match
+    if inm and (inm.contains(etag) or inm.contains(etag + '-gz')):
+        resp = Response(status=304)
+        return cacheable(resp, etag)
+    return None
+
+
+def cacheable(resp: Response, etag: str) -> Response:
+    """Let the browser keep a data response and revalidate it by ETag."""
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    resp.vary.add('Accept')
+    return resp
+
+
+def _is_static_hashed() -> bool:
+    if request.endpoint != 'static':
+        return False
+    path = (request.view_args or {}).get('filename', '')
+    v = request.args.get('v')
+    return bool(v) and ASSET_HASHES.get(path) == v
+
+
+def apply_cache_headers(resp: Response) -> Response:
+    if _is_static_hashed():
+        resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    elif resp.headers.get('ETag') and request.endpoint != 'static':
+        return resp  # data response with its own validator (cacheable())
+    elif request.endpoint == 'static' or request.endpoint == 'pages.index':
+        # revalidate (static files have Last-Modified/ETag from send_file)
+        resp.headers['Cache-Control'] = 'no-cache'
+    else:
+        resp.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+        resp.headers['Pragma'] = 'no-cache'
+        resp.headers['Expires'] = '0'
+    return resp
+
+
+def _accepts_gzip() -> bool:
+    return 'gzip' in (request.headers.get('Accept-Encoding') or '').lower()
+
+
+def _gzip_etag(resp: Response) -> None:
+    resp.headers['Content-Encoding'] = 'gzip'
+    resp.vary.add('Accept-Encoding')
+    etag, weak = resp.get_etag()
+    if etag:
+        resp.set_etag(etag + '-gz', weak)  # strong ETags differ per encoding
+
+
+def gzip_response(resp: Response) -> Response:
+    """gzip large JSON/CSV/HTML bodies when the client accepts it."""
+    if (resp.status_code != 200 or resp.is_streamed and not resp.direct_passthrough
+            or 'Content-Encoding' in resp.headers
+            or resp.mimetype not in _GZIP_TYPES
+            or request.endpoint == 'static'
+            or not _accepts_gzip()):
+        return resp
+    resp.direct_passthrough = False  # send_file(BytesIO) bodies are read here
+    data = resp.get_data()
+    if len(data) < GZIP_MIN_BYTES:
+        return resp
+    resp.set_data(gzip.compress(data, GZIP_LEVEL))
+    _gzip_etag(resp)
+    return resp
+
+
+def _gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip header/trailer
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+def gzip_stream(resp: Response) -> Response:
+    """gzip a streamed body chunk by chunk as it is sent, when the client
+    accepts it (gzip_response leaves streamed bodies alone)."""
+    if resp.status_code != 200 or 'Content-Encoding' in resp.headers or not _accepts_gzip():
+        return resp
+    resp.response = _gzip_chunks(resp.response)
+    resp.headers.pop('Content-Length', None)
+    _gzip_etag(resp)
+    return resp
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from lemure_reader import LoadCancelled, LoadProgress
+
+from .state import folder_key
+
+# finished jobs kept for /api/load_status (the browser polls until it sees the end)
+KEEP_FINISHED_JOBS = 16
+
+
+class LoadJob:
+    """One background test load.
+
+    state -- "running", "done", "error" or "cancelled"
+    result -- what run() returned (the /api/load payload) once done
+    """
+
+    def __init__(self, folder: str, key: str):
+        self.id = uuid.uuid4().hex
+        self.folder = folder
+        self.key = key
+        self.progress = LoadProgress()
+        self.state = "running"
+        self.error = ""
+        self.result: Optional[Dict[str, Any]] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            'job_id': self.id,
+            'folder': self.folder,
+            'state': self.state,
+            'progress': self.progress.snapshot(),
+        }
+        if self.error:
+            out['error'] = self.error
+        if self.result is not None:
+            out['result'] = self.result
+        return out
+
+
+_JOBS: "OrderedDict[str, LoadJob]" = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def _run(job: LoadJob, run: Callable[[str, LoadProgress], Dict[str, Any]]) -> None:
+    try:
+        job.result = run(job.folder, job.progress)
+        job.progress.phase = "done"
+        job.state = "done"
+    except LoadCancelled:
+        job.state = "cancelled"
+    except Exception as e:
+        job.error = str(e)
+        job.state = "error"
+    finally:
+        job.finished_at = time.monotonic()
+        with _LOCK:
+            _forget_finished()
+        print(f"[LOAD] job {job.id[:8]} {job.state}: {job.folder} "
+              f"({job.progress.snapshot()['elapsed_s']} s)")
+
+
+def _forget_finished() -> None:
+    finished = [j for j in _JOBS.values() if j.state != "running"]
+    for j in finished[:max(0, len(finished) - KEEP_FINISHED_JOBS)]:
+        del _JOBS[j.id]
+
+
+def start_load(folder: str, run: Callable[[str, LoadProgress], Dict[str, Any]]) -> Tuple[LoadJob, bool]:
+    """Start run(folder, progress) in a background thread.
+
+    A load of a folder that is already loading attaches to that job
+    instead: returns (job, True).
+    """
+    key = folder_key(folder)
+    with _LOCK:
+        for job in _JOBS.values():
+            if job.key == key and job.state == "running" and not job.progress.cancelled:
+                return job, True
+        job = LoadJob(folder, key)
+        _JOBS[job.id] = job
+    threading.Thread(target=_run, args=(job, run), daemon=True, name=f"load-{job.id[:8]}").start()
+    return job, False
+
+
+def get_job(job_id: str) -> Optional[LoadJob]:
+    with _LOCK:
+        return _JOBS.get(job_id)
+
+
+def cancel_job(job_id: str) -> Optional[LoadJob]:
+    """Ask a running job to stop; it ends as "cancelled" at its next check."""
+    job = get_job(job_id)
+    if job is not None and job.state == "running":
+        job.progress.cancel()
+    return job
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from .state import ChannelResolver, DatasetSnapshot
+
+
+def overlay_series(snaps: List[DatasetSnapshot], channel: str, zero_ms: List[Optional[int]],
+                   from_ms: Optional[int], to_ms: Optional[int], max_points: int) -> Dict[str, Any]:
+    """One channel of several tests on a common grid of elapsed time.
+
+    zero_ms[k] -- time of test k that becomes elapsed 0 (an event); None = its start.
+    The grid covers [from_ms, to_ms] of elapsed time (default: all tests) in at
+    most max_points buckets; each test gets the mean of its samples per bucket,
+    so the response size doesn't depend on the tests' sample counts.
+    """
+    tests: List[Dict[str, Any]] = []
+    lo: Optional[int] = None
+    hi: Optional[int] = None
+    for snap, z in zip(snaps, zero_ms):
+        ds = snap.dataset
+        code = ChannelResolver(ds.cols).resolve(channel)
+        if z is None:
+            z = ds.t_ms[0] if len(ds) else 0
+        info = snap.data['channels'].get(code)
+        tests.append({
+            'dataset_id': snap.version,
+            'folder': snap.data['root'],
+            'code': code,
+            'label': info.label if info is not None else code,
+            'unit': info.unit if info is not None else '',
+            'zero_ms': z,
+        })
+        if len(ds):
+            lo = ds.t_ms[0] - z if lo is None else min(lo, ds.t_ms[0] - z)
+            hi = ds.t_ms[-1] - z if hi is None else max(hi, ds.t_ms[-1] - z)
+
+    start = from_ms if from_ms is not None else (lo or 0)
+    end = to_ms if to_ms is not None else (hi or 0)
+    if end < start:
+        start, end = end, start
+    step = max(1, -(-(end - start + 1) // max(1, max_points)))
+    count = -(-(end - start + 1) // step)
+    edges = [start + k * step for k in range(count + 1)]
+
+    for t, snap in zip(tests, snaps):
+        if not t['code']:
+            t['values'] = [None] * count
+            continue
+        z = t['zero_ms']
+        t['values'] = snap.dataset.bucket_means(t['code'], [e + z for e in edges])
+
+    return {
+        'channel': channel,
+        'start_ms': start,
+        'step_ms': step,
+        # bucket centres, ms of elapsed time
+        'x_ms': [e + step / 2 for e in edges[:-1]],
+        'tests': tests,
+    }
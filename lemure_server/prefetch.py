@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from .coalesce import CancelCheck, Superseded
+from .config import PREFETCH, PREFETCH_CACHE_SHARE, PREFETCH_CPU_SHARE
+from .series_cache import cache_full, series_plan, warm_series
+from .state import REGISTRY, DatasetSnapshot, slice_by_time
+
+# a task starts only after this long without API requests (the UI redraws ~150 ms after a change)
+IDLE_S = 0.15
+# queued tasks; the oldest are dropped first (the user has moved on)
+MAX_TASKS = 32
+# finished task keys remembered so repeated requests don't warm the same windows again
+KEEP_DONE = 256
+
+# preset fields missing -> the UI defaults (auto step, 5000 points, stride)
+PRESET_STEP_TARGET = 5000
+
+
+class Prefetcher:
+    """Background warm-up of data the user is likely to ask for next.
+
+    One worker thread runs tasks fn(check) newest first, only while no API
+    request is in progress: check() turns True as soon as one starts and the
+    task should then raise Superseded (it is dropped; finished chunks stay
+    cached). After a task the worker sleeps so that it uses at most
+    cpu_share of its thread's time, and nothing runs while the series cache
+    is fuller than cache_share.
+    """
+
+    def __init__(self, enabled: bool = PREFETCH, cpu_share: float = PREFETCH_CPU_SHARE,
+                 cache_share: float = PREFETCH_CACHE_SHARE):
+        self.enabled = enabled
+        self.cpu_share = min(1.0, max(0.01, cpu_share))
+        self.cache_share = cache_share
+        self._tasks: "Deque[Tuple[Hashable, Callable[[CancelCheck], Any]]]" = deque(maxlen=MAX_TASKS)
+        self._done: "OrderedDict[Hashable, None]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._active = 0
+        self._idle_since = time.monotonic()
+        self._thread: threading.Thread | None = None
+        self.counts = {'queued': 0, 'done': 0, 'interrupted': 0, 'skipped': 0, 'failed': 0}
+
+    # -- foreground requests ------------------------------------------------
+
+    def begin_foreground(self) -> None:
+        with self._cond:
+            self._active += 1
+
+    def end_foreground(self) -> None:
+        with self._cond:
+            self._active = max(0, self._active - 1)
+            self._idle_since = time.monotonic()
+            self._cond.notify_all()
+
+    def busy(self) -> bool:
+        return self._active > 0
+
+    # -- tasks --------------------------------------------------------------
+
+    def submit(self, tasks: List[Tuple[Hashable, Callable[[CancelCheck], Any]]]) -> None:
+        """Queue (key, fn) tasks, most wanted first; known keys are ignored."""
+        if not self.enabled or not tasks:
+            return
+        with self._cond:
+            queued = {key for key, _fn in self._tasks}
+            for key, fn in reversed(tasks[:MAX_TASKS]):  # the worker pops from the right
+                if key in queued or key in self._done:
+                    continue
+                self._tasks.append((key, fn))
+                self.counts['queued'] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="prefetch")
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _next(self) -> Tuple[Hashable, Callable[[CancelCheck], Any]]:
+        with self._cond:
+            while True:
+                wait = IDLE_S - (time.monotonic() - self._idle_since)
+                if self._tasks and not self._active and wait <= 0:
+                    return self._tasks.pop()
+                self._cond.wait(wait if self._tasks and not self._active else None)
+
+    def _run(self) -> None:
+        while True:
+            key, fn = self._next()
+            if cache_full(self.cache_share):
+                self.counts['skipped'] += 1
+                continue
+            started = time.monotonic()
+            try:
+                fn(self.busy)
+            except Superseded:
+                self.counts['interrupted'] += 1
+            except Exception as e:
+                self.counts['failed'] += 1
+                print(f"[PREFETCH] {key!r}: {e}")
+            else:
+                self.counts['done'] += 1
+                with self._cond:
+                    self._done[key] = None
+                    while len(self._done) > KEEP_DONE:
+                        self._done.popitem(last=False)
+            elapsed = time.monotonic() - started
+            time.sleep(elapsed * (1.0 / self.cpu_share - 1.0))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return dict(self.counts, pending=len(self._tasks), enabled=self.enabled)
+
+
+PREFETCH_WORKER = Prefetcher()
+
+
+def _loaded(version: int) -> Optional[DatasetSnapshot]:
+    """The registry's snapshot of a dataset id, without touching the LRU order."""
+    for snap in REGISTRY.snapshots():
+        if snap.version == version:
+            return snap
+    return None
+
+
+def _warm(version: int, channels: List[str], i0: int, i1: int, step: int, env_points: int):
+    # the task holds the dataset id, not the snapshot: a test dropped from the
+    # registry is freed at once, its queued tasks find nothing to warm and a
+    # running one stops at the next chunk
+    def run(check: CancelCheck) -> None:
+        snap = _loaded(version)
+        if snap is not None:
+            warm_series(snap.dataset, channels, i0, i1, step, env_points,
+                        lambda: check() or _loaded(version) is None)
+    return run
+
+
+def prefetch_around(snap: DatasetSnapshot, channels: List[str], mode: str,
+                    i0: int, i1: int, step: int, env_points: int) -> None:
+    """After a stride/minmax window [i0, i1): the pans right and left and the
+    zoom-out (twice the width around it, next-coarser step)."""
+    n = len(snap.dataset)
+    w = i1 - i0
+    if mode == 'lttb' or w <= 0 or (i0 <= 0 and i1 >= n):
+        return  # LTTB has no chunk cache; the whole test has no neighbours
+    chans = tuple(channels)
+    windows = [
+        (i1, min(n, i1 + w), step, env_points),
+        (max(0, i0 - w), i0, step, env_points),
+        (max(0, i0 - w // 2), min(n, i1 + w // 2), step * 2, env_points),
+    ]
+    tasks = []
+    for a, b, st, env in windows:
+        if b > a:
+            key = (snap.data_tag, chans, mode, a, b, st, env)
+            tasks.append((key, _warm(snap.version, list(chans), a, b, st, env)))
+    PREFETCH_WORKER.submit(tasks)
+
+
+def prefetch_preset(snap: DatasetSnapshot, preset: Dict[str, Any]) -> None:
+    """The first plot after a preset is applied: its channels over the whole
+    test with its step settings (decoding the channels and building their
+    min/max pyramids on the way)."""
+    ds = snap.dataset
+    chans = [str(c) for c in (preset.get('channels') or []) if ds.has(str(c))]
+    if not chans or not len(ds):
+        return
+    mode = str(preset.get('plot_mode') or 'stride')
+    if mode not in ('stride', 'minmax'):
+        mode = 'stride'  # LTTB: nothing cached but the decoded columns
+    try:
+        target = int(preset.get('step_target') or PRESET_STEP_TARGET)
+        step = max(1, int(preset.get('step') or 1))
+    except (TypeError, ValueError):
+        target, step = PRESET_STEP_TARGET, 1
+    t_list = snap.t_list
+    i0, i1 = slice_by_time(t_list, t_list[0], t_list[-1])
+    step, _want, env_points = series_plan(i1 - i0, step, target if preset.get('step_auto', True) else 0, mode)
+    # one task per channel: a request in between stops after the current one
+    PREFETCH_WORKER.submit([
+        ((snap.data_tag, (code,), mode, i0, i1, step, env_points), _warm(snap.version, [code], i0, i1, step, env_points))
+        for code in chans
+    ])
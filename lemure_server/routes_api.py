@@ -1,16 +1,26 @@
 from __future__ import annotations
 
-import io
 import os
 import datetime as dt
-from typing import Any, Dict, List
+from typing import Any, Dict, Tuple
 
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, Response, g, jsonify, request, send_file
 
-from .config import APP_PORT, PROJECT_ROOT, send_file_compat
+from lemure_compute import RESAMPLE_METHODS, time_grid
+from lemure_reader import ColumnarDataset, LoadProgress
+
+from .config import APP_PORT, PROJECT_ROOT, RESAMPLE_MAX_POINTS, send_file_compat
 from .settings import get_viewer_settings, normalize_viewer_settings, save_viewer_settings, set_viewer_settings
-from .state import STATE, build_state, channel_to_dict, summary, slice_by_time, validate_folder_path
-from .series_cache import cached_series_slice, clear_cache
+from .state import REGISTRY, build_state, channel_to_dict, get_snapshot, publish, summary, slice_by_time, validate_folder_path
+from .series_cache import cache_stats, minmax_series, series_plan, stride_series
+from .series_binary import MIMETYPE, pack_series, wants_binary
+from .http_cache import cacheable, data_etag, gzip_stream, not_modified
+from .coalesce import SERIES_FLIGHTS, SERIES_VIEWS, Superseded
+from .load_jobs import cancel_job, get_job, start_load
+from .follow import get_follower, start_follow, stop_follow
+from .follow_stream import MIMETYPE as STREAM_MIMETYPE, follow_events, stream_stats
+from .overlay import overlay_series
+from .prefetch import PREFETCH_WORKER, prefetch_around, prefetch_preset
 from .persistence import (
     load_saved_order,
     save_order,
@@ -25,12 +35,31 @@ from .persistence import (
     ensure_orders_dir,
     ensure_presets_dir,
 )
-from .exports.basic import export_csv, export_xlsx
+from .exports.basic import export_xlsx, iter_csv, iter_file
+from .exports.xlsx_stream import XLSX_MAX_ROWS
 from .exports.template import export_template_impl
 from .utils import log_exception_to_file
 
 api_bp = Blueprint('api', __name__)
 
+# /api/series downsampling modes (also kept in saved presets)
+PLOT_MODES = ('stride', 'minmax', 'lttb')
+
+
+# prefetch runs only between API requests (an open follow stream is not one)
+@api_bp.before_request
+def _foreground_begin():
+    if request.endpoint == 'api.api_follow_stream':
+        return
+    PREFETCH_WORKER.begin_foreground()
+    g.prefetch_paused = True
+
+
+@api_bp.teardown_request
+def _foreground_end(_exc):
+    if g.pop('prefetch_paused', False):
+        PREFETCH_WORKER.end_foreground()
+
 
 @api_bp.route('/api/settings', methods=['GET', 'POST'])
 def api_settings():
@@ -73,55 +102,162 @@ def api_load():
     if not os.path.isdir(folder):
         return jsonify({'ok': False, 'error': 'Папка не существует: ' + folder})
 
+    # parsing runs in a background job; the browser polls /api/load_status
+    job, attached = start_load(folder, _load_job)
+    return jsonify({'ok': True, 'job_id': job.id, 'attached': attached, 'state': job.state})
+
+
+def _load_job(folder: str, progress: LoadProgress) -> Dict[str, Any]:
+    """Body of a load job: the new test is published only once fully built.
+
+    Cached series of the previous test are keyed by its version and simply
+    age out of the LRU."""
+    snap = build_state(folder, progress)
+    progress.check()  # cancelled at the very end: keep the current test
+    publish(snap)
+
+    data = snap.data
+    channels = data['channels']
+    cols = data['cols']
+
+    ch_list = []
+    for c in cols:
+        if c in channels:
+            ch_list.append(channel_to_dict(channels[c]))
+        else:
+            ch_list.append({'code': c, 'name': '', 'unit': '', 'label': c})
+
+    return {
+        'ok': True,
+        'dataset_id': snap.version,
+        'folder': data['root'],
+        'meta': data['meta'],
+        'summary': summary(data),
+        'channels': ch_list,
+        'file_order': [c.get('code') for c in ch_list],
+        'saved_order': load_saved_order(),
+    }
+
+
+@api_bp.route('/api/datasets', methods=['GET'])
+def api_datasets():
+    """Tests held in memory, most recently used first."""
+    items = [{
+        'dataset_id': snap.version,
+        'folder': snap.data['root'],
+        'points': len(snap.dataset),
+        'bytes': snap.dataset.nbytes,
+    } for snap in REGISTRY.snapshots()]
+    return jsonify({'ok': True, 'datasets': items, 'max_bytes': REGISTRY.max_bytes})
+
+
+@api_bp.route('/api/follow', methods=['POST'])
+def api_follow():
+    """Start/stop appending a test's new records as the logger writes them."""
+    body = request.get_json(force=True, silent=True) or {}
+    snap, err = get_snapshot({'ds': str(body.get('ds') or '')})
+    if snap is None:
+        return jsonify({'ok': False, 'error': err}), 400
+    if body.get('on', True):
+        f = start_follow(snap)
+    else:
+        f = stop_follow(snap)
+        if f is None:
+            return jsonify({'ok': True, 'state': 'stopped', 'dataset_id': snap.version})
+    return jsonify(dict(f.to_dict(), ok=True))
+
+
+@api_bp.route('/api/follow_status', methods=['GET'])
+def api_follow_status():
+    snap, err = get_snapshot(request.args)
+    if snap is None:
+        return jsonify({'ok': False, 'error': err}), 400
+    f = get_follower(snap)
+    if f is None:
+        return jsonify({'ok': True, 'state': 'stopped', 'dataset_id': snap.version,
+                        'revision': snap.dataset.revision, 'summary': summary(snap.data)})
+    return jsonify(dict(f.to_dict(), ok=True))
+
+
+@api_bp.route('/api/follow_stream', methods=['GET'])
+def api_follow_stream():
+    """Server-Sent Events: new samples of the followed test for a live plot.
+
+    channels -- comma-separated codes; step -- every step-th sample (the plot's step);
+    after_ms -- the last time the plot already has (default: its current end).
+    """
+    snap, err = get_snapshot(request.args)
+    if snap is None:
+        return jsonify({'ok': False, 'error': err}), 400
+    f = get_follower(snap)
+    if f is None:
+        return jsonify({'ok': False, 'error': 'Слежение за этим тестом не включено'}), 409
+    ch = [c for c in (request.args.get('channels') or '').split(',') if c.strip()]
     try:
-        st = build_state(folder)
-        STATE.update(st)
-        clear_cache()
-
-        data = STATE['data']
-        channels = data['channels']
-        cols = data['cols']
-
-        ch_list = []
-        for c in cols:
-            if c in channels:
-                ch_list.append(channel_to_dict(channels[c]))
-            else:
-                ch_list.append({'code': c, 'name': '', 'unit': '', 'label': c})
-
-        return jsonify({
-            'ok': True,
-            'folder': data['root'],
-            'meta': data['meta'],
-            'summary': summary(data),
-            'channels': ch_list,
-            'file_order': [c.get('code') for c in ch_list],
-            'saved_order': load_saved_order(),
-        })
-    except Exception as e:
-        return jsonify({'ok': False, 'error': str(e)})
+        step_i = max(1, int(request.args.get('step', '1')))
+    except Exception:
+        step_i = 1
+    t_list = snap.t_list
+    # Last-Event-ID: a reconnecting EventSource resumes at the sample it had reached
+    try:
+        start = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        try:
+            start = slice_by_time(t_list, t_list[0], int(float(request.args['after_ms'])))[1] if t_list else 0
+        except Exception:
+            start = len(t_list)
+    resp = Response(follow_events(f, ch, max(0, start), step_i), mimetype=STREAM_MIMETYPE)
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+
+@api_bp.route('/api/load_status', methods=['GET'])
+def api_load_status():
+    job = get_job(request.args.get('job_id') or '')
+    if job is None:
+        return jsonify({'ok': False, 'error': 'Задача загрузки не найдена'}), 404
+    return jsonify(dict(job.to_dict(), ok=True))
+
+
+@api_bp.route('/api/load_cancel', methods=['POST'])
+def api_load_cancel():
+    body = request.get_json(force=True, silent=True) or {}
+    job = cancel_job(str(body.get('job_id') or ''))
+    if job is None:
+        return jsonify({'ok': False, 'error': 'Задача загрузки не найдена'}), 404
+    return jsonify({'ok': True, 'job_id': job.id, 'state': job.state})
 
 
 @api_bp.route('/api/series', methods=['GET'])
 def api_series():
-    if not STATE.get('loaded'):
-        return jsonify({'ok': False, 'error': 'Данные не загружены'})
+    snap, err = get_snapshot(request.args)
+    if snap is None:
+        return jsonify({'ok': False, 'error': err})
 
-    data = STATE['data']
-    rows: List[Dict[str, Any]] = data['rows']
-    t_list: List[int] = STATE['t_list']
+    ds: ColumnarDataset = snap.dataset
+    t_list = snap.t_list
 
     channels = request.args.get('channels', '')
     ch = [c for c in channels.split(',') if c.strip()]
     if not ch:
         return jsonify({'ok': False, 'error': 'Не выбраны каналы'})
 
+    # same dataset + same query -> same bytes: let the browser revalidate
+    etag = data_etag(snap.data_tag)
+    unchanged = not_modified(etag)
+    if unchanged is not None:
+        return unchanged
+    if not len(ds):
+        return jsonify({'ok': True, 't_ms': [], 'series': {code: [] for code in ch}, 'step': 1, 'points': 0})
+    # codes the test doesn't have get an empty trace (None series, no LTTB points) and are listed
+    unknown = [code for code in ch if not ds.has(code)]
+
     try:
-        start_ms = int(float(request.args.get('start_ms', rows[0]['t_ms'])))
-        end_ms = int(float(request.args.get('end_ms', rows[-1]['t_ms'])))
+        start_ms = int(float(request.args.get('start_ms', t_list[0])))
+        end_ms = int(float(request.args.get('end_ms', t_list[-1])))
     except Exception:
-        start_ms = rows[0]['t_ms']
-        end_ms = rows[-1]['t_ms']
+        start_ms = t_list[0]
+        end_ms = t_list[-1]
 
     if start_ms > end_ms:
         start_ms, end_ms = end_ms, start_ms
@@ -137,52 +273,78 @@ def api_series():
     except Exception:
         target = 0
 
+    # stride (default): every step-th sample; minmax: min and max of every bucket;
+    # lttb: Largest-Triangle-Three-Buckets, own times per channel (t_series)
+    mode = (request.args.get('mode') or 'stride').strip().lower()
+    if mode not in PLOT_MODES:
+        return jsonify({'ok': False, 'error': 'Неизвестный режим: ' + mode})
+
     i0, i1 = slice_by_time(t_list, start_ms, end_ms)
     raw_pts = max(0, i1 - i0)
 
-    if target and target > 0:
-        step_i = max(1, (raw_pts + target - 1) // target)
-
-    pts_after = max(0, (raw_pts + step_i - 1) // step_i) if raw_pts > 0 else 0
-    cells = pts_after * len(ch)
-    use_cache = (pts_after <= 40000) and (cells <= 400000)
-
-    channels_key = ','.join(ch)
-
-    try:
-        if use_cache:
-            t_ms, series = cached_series_slice(id(rows), channels_key, start_ms, end_ms, step_i)
+    # envelope of ~want_pts points (its buckets get their own power-of-two width);
+    # nothing to reduce when every sample fits
+    step_i, want_pts, env_points = series_plan(raw_pts, step_i, max(0, target), mode)
+
+    # format=bin / Accept: application/octet-stream -> JSON header + typed arrays
+    binary = wants_binary(request.args, request.headers.get('Accept', ''))
+    dtype = 'f8' if request.args.get('dtype') == 'f8' else 'f4'
+
+    def compute(check):
+        if mode == 'lttb' and step_i > 1:
+            t_series = {}
+            series = {}
+            for code in ch:
+                if check():
+                    raise Superseded()
+                t_series[code], series[code] = ds.lttb(code, i0, i1, want_pts)
+            head = {'ok': True, 'step': step_i, 'points': max([len(v) for v in series.values()] or [0]), 'mode': 'lttb',
+                    'unknown_channels': unknown}
+            if binary:
+                return pack_series(head, None, series, t_series, dtype)
+            head.update(t_ms=[], t_series=t_series, series=series)
+            return head
+
+        if env_points:
+            t_ms, series = minmax_series(ds, ch, i0, i1, env_points, as_arrays=binary, check=check)
         else:
-            sliced = rows[i0:i1:step_i]
-            t_ms = [r['t_ms'] for r in sliced]
+            t_ms, series = stride_series(ds, ch, i0, i1, step_i, as_arrays=binary, check=check)
 
-            def _to_float(v):
-                if v is None:
-                    return None
-                if isinstance(v, (int, float)):
-                    return float(v)
-                try:
-                    return float(str(v).replace(',', '.'))
-                except Exception:
-                    return None
+        head = {'ok': True, 'step': step_i, 'points': len(t_ms), 'mode': mode if env_points else 'stride',
+                'unknown_channels': unknown}
+        if binary:
+            return pack_series(head, t_ms, series, None, dtype)
+        head.update(t_ms=t_ms, series=series)
+        return head
 
-            series = {code: [_to_float(r.get(code)) for r in sliced] for code in ch}
-
-        return jsonify({'ok': True, 't_ms': t_ms, 'series': series, 'step': step_i, 'points': len(t_ms)})
+    # X-View-Id / X-View-Gen: a newer request of the same plot makes this one obsolete
+    try:
+        gen = int(request.headers.get('X-View-Gen', ''))
+    except ValueError:
+        gen = None
+    superseded = SERIES_VIEWS.begin(request.headers.get('X-View-Id', ''), gen)
 
+    try:
+        # the ETag covers dataset version + query + Accept: identical requests share one result
+        body = SERIES_FLIGHTS.do(etag, compute, superseded)
+    except Superseded:
+        return jsonify({'ok': False, 'superseded': True, 'error': 'Запрос заменён более новым'}), 409
     except Exception as e:
         return jsonify({'ok': False, 'error': str(e)})
+    prefetch_around(snap, ch, mode, i0, i1, step_i, env_points)
+    if binary:
+        return cacheable(Response(body, mimetype=MIMETYPE), etag)
+    return cacheable(jsonify(body), etag)
 
 
-@api_bp.route('/api/range_stats', methods=['GET'])
-def api_range_stats():
-    if not STATE.get('loaded'):
-        return jsonify({'ok': False, 'error': 'Данные не загружены'}), 400
+@api_bp.route('/api/cache_stats', methods=['GET'])
+def api_cache_stats():
+    return jsonify({'ok': True, 'series': cache_stats(), 'coalesced': SERIES_FLIGHTS.shared,
+                    'prefetch': PREFETCH_WORKER.stats(), 'follow_stream': stream_stats()})
 
-    t_list = STATE.get('t_list') or []
-    if not t_list:
-        return jsonify({'ok': True, 'points': 0, 'total': 0})
 
+def _time_range_args(t_list) -> Tuple[int, int]:
+    """start_ms/end_ms query args (default: the whole test), ordered."""
     try:
         start_ms = int(float(request.args.get('start_ms', t_list[0])))
         end_ms = int(float(request.args.get('end_ms', t_list[-1])))
@@ -192,10 +354,175 @@ def api_range_stats():
 
     if start_ms > end_ms:
         start_ms, end_ms = end_ms, start_ms
+    return start_ms, end_ms
+
+
+@api_bp.route('/api/range_stats', methods=['GET'])
+def api_range_stats():
+    snap, err = get_snapshot(request.args)
+    if snap is None:
+        return jsonify({'ok': False, 'error': err}), 400
+
+    t_list = snap.t_list
+    if not t_list:
+        return jsonify({'ok': True, 'points': 0, 'total': 0})
+
+    etag = data_etag(snap.data_tag)
+    unchanged = not_modified(etag)
+    if unchanged is not None:
+        return unchanged
 
+    start_ms, end_ms = _time_range_args(t_list)
     i0, i1 = slice_by_time(t_list, start_ms, end_ms)
     pts = max(0, i1 - i0)
-    return jsonify({'ok': True, 'start_ms': start_ms, 'end_ms': end_ms, 'points': pts, 'total': len(t_list)})
+    out = {'ok': True, 'start_ms': start_ms, 'end_ms': end_ms, 'points': pts, 'total': len(t_list)}
+
+    # optional per-channel stats over the range (same as /api/stats)
+    ch = [c for c in (request.args.get('channels') or '').split(',') if c.strip()]
+    if ch:
+        ds: ColumnarDataset = snap.dataset
+        out['stats'] = {code: ds.stats(code, i0, i1) for code in ch}
+    return cacheable(jsonify(out), etag)
+
+
+@api_bp.route('/api/stats', methods=['GET'])
+def api_stats():
+    """count/min/max/mean/std/first/last of channels over [start_ms, end_ms].
+
+    Answered from per-channel prefix sums + the min/max pyramid, so the
+    window length doesn't matter (the first request per channel builds them)."""
+    snap, err = get_snapshot(request.args)
+    if snap is None:
+        return jsonify({'ok': False, 'error': err}), 400
+
+    ch = [c for c in (request.args.get('channels') or '').split(',') if c.strip()]
+    if not ch:
+        return jsonify({'ok': False, 'error': 'Не выбраны каналы'})
+
+    ds: ColumnarDataset = snap.dataset
+    t_list = snap.t_list
+    etag = data_etag(snap.data_tag)
+    unchanged = not_modified(etag)
+    if unchanged is not None:
+        return unchanged
+
+    if not t_list:
+        return jsonify({'ok': True, 'points': 0, 'stats': {code: ds.stats(code, 0, 0) for code in ch}})
+
+    start_ms, end_ms = _time_range_args(t_list)
+    i0, i1 = slice_by_time(t_list, start_ms, end_ms)
+    stats = {code: ds.stats(code, i0, i1) for code in ch}
+    out = {'ok': True, 'start_ms': start_ms, 'end_ms': end_ms, 'points': max(0, i1 - i0), 'stats': stats}
+    return cacheable(jsonify(out), etag)
+
+
+@api_bp.route('/api/resample', methods=['GET'])
+def api_resample():
+    """Channels on a regular time grid: start_ms, start_ms + step_ms, ... up to end_ms.
+
+    method     -- nearest (default), linear, mean, min or max
+    max_gap_ms -- nearest/linear: no value farther from data than this
+                  (default 1.5 steps, the template export's 30 s for 20 s)
+    window_ms  -- mean/min/max: window centred on each grid time (default one step)
+    """
+    snap, err = get_snapshot(request.args)
+    if snap is None:
+        return jsonify({'ok': False, 'error': err}), 400
+
+    ch = [c for c in (request.args.get('channels') or '').split(',') if c.strip()]
+    if not ch:
+        return jsonify({'ok': False, 'error': 'Не выбраны каналы'})
+    method = (request.args.get('method') or 'nearest').strip().lower()
+    if method not in RESAMPLE_METHODS:
+        return jsonify({'ok': False, 'error': 'Неизвестный метод: ' + method}), 400
+    try:
+        step_ms = int(float(request.args.get('step_ms', '')))
+        max_gap_ms = int(float(request.args.get('max_gap_ms') or step_ms * 3 // 2))
+        window_ms = int(float(request.args.get('window_ms') or step_ms))
+    except (ValueError, OverflowError):  # inf / 1e400 overflow int()
+        return jsonify({'ok': False, 'error': 'Неверный шаг сетки'}), 400
+    if step_ms <= 0:
+        return jsonify({'ok': False, 'error': 'Неверный шаг сетки'}), 400
+    if max_gap_ms <= 0:
+        return jsonify({'ok': False, 'error': 'Неверный допуск разрыва (max_gap_ms)'}), 400
+    if window_ms <= 0:
+        return jsonify({'ok': False, 'error': 'Неверное окно (window_ms)'}), 400
+
+    ds: ColumnarDataset = snap.dataset
+    t_list = snap.t_list
+    etag = data_etag(snap.data_tag)
+    unchanged = not_modified(etag)
+    if unchanged is not None:
+        return unchanged
+
+    if t_list:
+        start_ms, end_ms = _time_range_args(t_list)
+    else:
+        start_ms = end_ms = 0
+    points = (end_ms - start_ms) // step_ms + 1
+    if points > RESAMPLE_MAX_POINTS:
+        return jsonify({'ok': False, 'error': f'Слишком много точек сетки ({points}), увеличьте шаг'}), 400
+
+    grid = time_grid(start_ms, end_ms, step_ms) if t_list else []
+    plan = ds.resample_plan(grid, method, max_gap_ms, window_ms)
+    series = {code: ds.resample(code, plan) for code in ch}
+    head = {'ok': True, 'method': method, 'start_ms': start_ms, 'end_ms': end_ms, 'step_ms': step_ms,
+            'points': len(grid)}
+    if wants_binary(request.args, request.headers.get('Accept', '')):
+        dtype = 'f8' if request.args.get('dtype') == 'f8' else 'f4'
+        return cacheable(Response(pack_series(head, grid, series, None, dtype), mimetype=MIMETYPE), etag)
+    head.update(t_ms=grid, series=series)
+    return cacheable(jsonify(head), etag)
+
+
+@api_bp.route('/api/overlay', methods=['GET'])
+def api_overlay():
+    """One channel of several loaded tests aligned on elapsed time.
+
+    ds       -- dataset ids, comma separated
+    channel  -- code or suffix ("T1" matches "A-T1" in each test)
+    zero_ms  -- per test, the time that becomes 0 (an event); empty = test start
+    from_ms, to_ms -- elapsed window (ms); max_points -- grid size
+    """
+    ids = [x.strip() for x in (request.args.get('ds') or '').split(',') if x.strip()]
+    channel = (request.args.get('channel') or '').strip()
+    if not ids:
+        return jsonify({'ok': False, 'error': 'Не выбраны тесты'}), 400
+    if not channel:
+        return jsonify({'ok': False, 'error': 'Не выбран канал'}), 400
+
+    snaps = []
+    for x in ids:
+        try:
+            snap = REGISTRY.get(int(x))
+        except ValueError:
+            return jsonify({'ok': False, 'error': 'Неверный идентификатор теста: ' + x}), 400
+        if snap is None:
+            return jsonify({'ok': False, 'error': 'Тест выгружен из памяти, загрузите его снова: ' + x}), 404
+        snaps.append(snap)
+
+    # ids are snapshot versions: the URL alone identifies the data
+    etag = data_etag(tuple(s.data_tag for s in snaps))
+    unchanged = not_modified(etag)
+    if unchanged is not None:
+        return unchanged
+
+    try:
+        zero_ms = [int(float(z)) if z.strip() else None
+                   for z in (request.args.get('zero_ms') or '').split(',')]
+        from_ms = request.args.get('from_ms')
+        to_ms = request.args.get('to_ms')
+        from_ms = int(float(from_ms)) if from_ms not in (None, '') else None
+        to_ms = int(float(to_ms)) if to_ms not in (None, '') else None
+        max_points = int(request.args.get('max_points', '2000'))
+    except ValueError:
+        return jsonify({'ok': False, 'error': 'Неверные параметры'}), 400
+    zero_ms = (zero_ms + [None] * len(snaps))[:len(snaps)]
+    max_points = max(10, min(20000, max_points))
+
+    out = overlay_series(snaps, channel, zero_ms, from_ms, to_ms, max_points)
+    out['ok'] = True
+    return cacheable(jsonify(out), etag)
 
 
 @api_bp.route('/api/save_order', methods=['POST'])
@@ -328,6 +655,8 @@ def api_presets_save():
     else:
         order = []
 
+    plot_mode = str(preset.get('plot_mode') or '').strip().lower()
+
     payload = {
         'name': name,
         'key': key,
@@ -339,6 +668,7 @@ def api_presets_save():
         'step_target': int(preset.get('step_target') or 5000),
         'step': int(preset.get('step') or 1),
         'show_legend': bool(preset.get('show_legend')) if isinstance(preset.get('show_legend'), bool) else True,
+        'plot_mode': plot_mode if plot_mode in PLOT_MODES else 'stride',
     }
 
     try:
@@ -363,6 +693,11 @@ def api_presets_load():
             return jsonify({'ok': False, 'error': 'Сохранённый набор не найден: ' + key}), 404
         preset = dict(data)
         preset.pop('ok', None)
+        # ds given: warm the cache for the plot the preset is about to request
+        if request.args.get('ds'):
+            snap, _err = get_snapshot(request.args)
+            if snap is not None:
+                prefetch_preset(snap, preset)
         return jsonify({'ok': True, 'key': key, 'name': str(data.get('name') or key), 'preset': preset})
     except Exception as e:
         return jsonify({'ok': False, 'error': str(e)}), 500
@@ -386,25 +721,32 @@ def api_presets_delete():
 
 @api_bp.route('/api/export', methods=['GET'])
 def api_export():
-    if not STATE.get('loaded'):
-        return jsonify({'ok': False, 'error': 'Данные не загружены'}), 400
+    snap, err = get_snapshot(request.args)
+    if snap is None:
+        return jsonify({'ok': False, 'error': err}), 400
 
-    data = STATE['data']
-    rows: List[Dict[str, Any]] = data['rows']
-    t_list: List[int] = STATE['t_list']
+    ds: ColumnarDataset = snap.dataset
+    t_list = snap.t_list
 
     fmt = (request.args.get('format', 'csv') or 'csv').lower()
     channels = request.args.get('channels', '')
     ch = [c for c in channels.split(',') if c.strip()]
     if not ch:
         return jsonify({'ok': False, 'error': 'Не выбраны каналы'}), 400
+    if not len(ds):
+        return jsonify({'ok': False, 'error': 'Нет строк данных'}), 400
+
+    etag = data_etag(snap.data_tag)
+    unchanged = not_modified(etag)
+    if unchanged is not None:
+        return unchanged
 
     try:
-        start_ms = int(float(request.args.get('start_ms', rows[0]['t_ms'])))
-        end_ms = int(float(request.args.get('end_ms', rows[-1]['t_ms'])))
+        start_ms = int(float(request.args.get('start_ms', t_list[0])))
+        end_ms = int(float(request.args.get('end_ms', t_list[-1])))
     except Exception:
-        start_ms = rows[0]['t_ms']
-        end_ms = rows[-1]['t_ms']
+        start_ms = t_list[0]
+        end_ms = t_list[-1]
 
     try:
         step_i = max(1, int(request.args.get('step', '1')))
@@ -412,16 +754,23 @@ def api_export():
         step_i = 1
 
     i0, i1 = slice_by_time(t_list, start_ms, end_ms)
-    sliced = rows[i0:i1:step_i]
 
     if fmt == 'xlsx':
-        payload = export_xlsx(sliced, ch)
-        return send_file_compat(send_file, io.BytesIO(payload),
-                                'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                                'export.xlsx')
-
-    payload = export_csv(sliced, ch)
-    return send_file_compat(send_file, io.BytesIO(payload), 'text/csv', 'export.csv')
+        rows = len(range(i0, i1, step_i))
+        if rows + 1 > XLSX_MAX_ROWS:
+            return jsonify({'ok': False, 'error': f'Слишком много строк для Excel ({rows}), увеличьте шаг или используйте CSV'}), 400
+        f = export_xlsx(ds, ch, i0, i1, step_i)
+        size = f.seek(0, os.SEEK_END)
+        f.seek(0)
+        resp = Response(iter_file(f), mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        resp.headers['Content-Disposition'] = 'attachment; filename=export.xlsx'
+        resp.headers['Content-Length'] = str(size)
+        return cacheable(resp, etag)
+
+    # streamed (chunked) as it is formatted: the download starts at once, memory stays bounded
+    resp = Response(iter_csv(ds, ch, i0, i1, step_i), mimetype='text/csv')
+    resp.headers['Content-Disposition'] = 'attachment; filename=export.csv'
+    return gzip_stream(cacheable(resp, etag))
 
 
 @api_bp.route('/api/export_template', methods=['GET'])
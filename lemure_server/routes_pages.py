@@ -1,21 +1,20 @@
 from __future__ import annotations
 
-from pathlib import Path
+import json
 
 from flask import Blueprint, render_template
 
-from .config import APP_PORT, PROJECT_ROOT
-from .utils import now_asset_version_fallback
+from .config import APP_PORT
+from .http_cache import ASSET_HASHES, apply_cache_headers, gzip_response
 
 pages_bp = Blueprint('pages', __name__)
 
 
 @pages_bp.after_app_request
-def add_no_cache_headers(resp):
+def add_cache_headers(resp):
     try:
-        resp.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-        resp.headers["Pragma"] = "no-cache"
-        resp.headers["Expires"] = "0"
+        resp = apply_cache_headers(resp)
+        resp = gzip_response(resp)
     except Exception:
         pass
     return resp
@@ -23,27 +22,8 @@ def add_no_cache_headers(resp):
 
 @pages_bp.route('/')
 def index():
-    try:
-        base = Path(PROJECT_ROOT)
-        mt = 0.0
-        # static files
-        for p in (base / 'static').rglob('*'):
-            try:
-                if p.is_file():
-                    mt = max(mt, p.stat().st_mtime)
-            except Exception:
-                pass
-        # templates
-        for p in (base / 'templates').rglob('*.html'):
-            try:
-                mt = max(mt, p.stat().st_mtime)
-            except Exception:
-                pass
-        asset_v = str(int(mt)) if mt > 0 else now_asset_version_fallback()
-    except Exception:
-        asset_v = now_asset_version_fallback()
-
-    return render_template('index.html', port=APP_PORT, asset_v=asset_v)
+    # static URLs carry content hashes computed at startup (http_cache.hash_static_files)
+    return render_template('index.html', port=APP_PORT, asset_hashes=json.dumps(ASSET_HASHES))
 
 
 @pages_bp.route('/favicon.ico')
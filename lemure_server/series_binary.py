@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import json
+import sys
+from array import array
+from operator import sub
+from typing import Any, Dict, List, Optional, Sequence
+
+# Binary /api/series response (little-endian):
+#   uint32 header length, UTF-8 JSON header, zero padding to 8 bytes, body.
+# Header "t" / series[code]["t"] / series[code]["v"] are [offset in body, count].
+# Times: t_enc "d32" -> int32 deltas from t0 (first delta 0), "f64" -> absolute ms
+# (a gap longer than int32 allows). Values: dtype "f4" or "f8", NaN = no value.
+MIMETYPE = "application/octet-stream"
+
+_INT32_MAX = 2 ** 31 - 1
+NAN = float("nan")
+
+
+def wants_binary(args, accept: str) -> bool:
+    fmt = (args.get("format") or "").strip().lower()
+    if fmt:
+        return fmt in ("bin", "binary")
+    return MIMETYPE in (accept or "")
+
+
+class _Body:
+    def __init__(self):
+        self.buf = bytearray()
+
+    def add(self, arr: array) -> List[int]:
+        if sys.byteorder != "little":
+            arr = array(arr.typecode, arr)
+            arr.byteswap()
+        off = len(self.buf)
+        self.buf += arr.tobytes()
+        self.buf += bytes(-len(self.buf) % 8)
+        return [off, len(arr)]
+
+
+def _times(body: _Body, t_ms: Sequence[int]) -> Dict[str, Any]:
+    if not len(t_ms):
+        return {"t0": 0, "t_enc": "d32", "t": body.add(array("i"))}
+    t0 = t_ms[0]
+    deltas = list(map(sub, t_ms, [t0] + list(t_ms[:-1])))
+    if max(deltas) <= _INT32_MAX and min(deltas) >= -_INT32_MAX:
+        return {"t0": t0, "t_enc": "d32", "t": body.add(array("i", deltas))}
+    return {"t0": t0, "t_enc": "f64", "t": body.add(array("d", t_ms))}
+
+
+def pack_series(head: Dict[str, Any], t_ms: Optional[Sequence[int]], series: Dict[str, Any],
+                t_series: Optional[Dict[str, Sequence[int]]] = None, dtype: str = "f4") -> bytes:
+    """Encode a series response; series values are array('d') with NaN gaps
+    (or lists with None).
+
+    t_series (per-channel times, LTTB) replaces the shared t_ms.
+    """
+    body = _Body()
+    head = dict(head, dtype=dtype)
+    if t_series is None:
+        head.update(_times(body, t_ms or []))
+    head["series"] = {}
+    for code, vals in series.items():
+        if not isinstance(vals, array):
+            vals = array("d", [NAN if v is None else v for v in vals])
+        sec: Dict[str, Any] = {}
+        if t_series is not None:
+            sec.update(_times(body, t_series.get(code) or []))
+        sec["v"] = body.add(vals if dtype == "f8" else array("f", vals))
+        head["series"][code] = sec
+    hdr = json.dumps(head, separators=(",", ":")).encode("utf-8")
+    pre = len(hdr).to_bytes(4, "little") + hdr
+    return pre + bytes(-len(pre) % 8) + bytes(body.buf)
@@ -1,45 +1,203 @@
 from __future__ import annotations
 
-from functools import lru_cache
-from typing import Any, Dict, List, Tuple
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from .state import STATE, slice_by_time
+from lemure_compute import MinMaxPlan, get_backend
+from lemure_reader import ColumnarDataset
 
+from .coalesce import CancelCheck, Superseded, never
+from .config import SERIES_CACHE_BYTES
 
-@lru_cache(maxsize=8)
-def cached_series_slice(data_id: int, channels_key: str, start_ms: int, end_ms: int, step_i: int) -> Tuple[List[int], Dict[str, List[float | None]]]:
-    """Return (t_ms, series_dict) for the requested channels and time range.
+# output points per cached chunk
+CHUNK_POINTS = 2048
 
-    Cached to speed up repeated redraws with the same parameters.
+NAN = float('nan')
+
+
+class SeriesCache:
+    """LRU of per-channel series chunks bounded by total bytes.
+
+    Keys are (dataset version, channel, mode, level, chunk): a chunk is a fixed
+    run of CHUNK_POINTS outputs on a grid aligned to sample 0, so pans and
+    repeated zoom levels reuse the chunks they overlap.
     """
-    rows = STATE["data"]["rows"]
-    t_list = STATE["t_list"]
-    channels = [c.strip() for c in channels_key.split(",") if c.strip()]
-
-    i0, i1 = slice_by_time(t_list, start_ms, end_ms)
-    sliced = rows[i0:i1:step_i]
-
-    t = [r["t_ms"] for r in sliced]
-
-    def _to_float(v: Any):
-        if v is None:
-            return None
-        if isinstance(v, (int, float)):
-            return float(v)
-        try:
-            return float(str(v).replace(",", "."))
-        except Exception:
-            return None
-
-    series: Dict[str, List[float | None]] = {}
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[Tuple, array]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple, build: Callable[[], array]) -> array:
+        with self._lock:
+            val = self._items.get(key)
+            if val is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return val
+            self.misses += 1
+        val = build()
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = val
+                self._bytes += val.itemsize * len(val)
+                while self._bytes > self.max_bytes and len(self._items) > 1:
+                    _, old = self._items.popitem(last=False)
+                    self._bytes -= old.itemsize * len(old)
+        return val
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._items),
+                    'bytes': self._bytes, 'max_bytes': self.max_bytes}
+
+
+SERIES_CACHE = SeriesCache(SERIES_CACHE_BYTES)
+
+
+def series_plan(raw_pts: int, step: int, max_points: int, mode: str) -> Tuple[int, int, int]:
+    """(step, points wanted, envelope points) of a /api/series query over raw_pts samples.
+
+    max_points > 0 picks the step itself (a power of two: zooming back to a
+    level reuses its cached chunks); env points are 0 unless minmax has
+    something to reduce."""
+    if max_points > 0:
+        step = max(1, (raw_pts + max_points - 1) // max_points)
+        want_pts = (raw_pts + step - 1) // step
+        step = 1 << (step - 1).bit_length()
+    else:
+        want_pts = (raw_pts + step - 1) // step
+    return step, want_pts, (want_pts if mode == 'minmax' and step > 1 else 0)
+
+
+def _nan_array(vals: List[Optional[float]]) -> array:
+    return array('d', [NAN if v is None else v for v in vals])
+
+
+def _finish(vals: array, as_arrays: bool):
+    return vals if as_arrays else get_backend().take(vals, 0, len(vals))
+
+
+def _chunk(ds: ColumnarDataset, code: str, mode: str, level: int, k: int, span: int) -> Tuple[Tuple, int]:
+    """(cache key, end sample) of chunk k; the last chunk of a followed test
+    still grows, so it is keyed by the data length too."""
+    n = len(ds)
+    end = (k + 1) * span
+    if end <= n:
+        return (ds.version, code, mode, level, k), end
+    return (ds.version, code, mode, level, k, n), n
+
+
+def _stride_chunk(ds: ColumnarDataset, code: str, step: int, k: int) -> array:
+    span = CHUNK_POINTS * step
+    key, end = _chunk(ds, code, 'stride', step, k, span)
+    return SERIES_CACHE.get(key, lambda: ds.column(code)[k * span:end:step])
+
+
+def _minmax_chunk(ds: ColumnarDataset, code: str, plan: MinMaxPlan, k: int) -> array:
+    w = plan.width
+    span = CHUNK_POINTS // 2 * w  # 2 outputs per bucket
+    key, b = _chunk(ds, code, 'minmax', w, k, span)
+
+    def build() -> array:
+        a = k * span
+        return _nan_array(get_backend().minmax(ds.column(code), ds.pyramid(code),
+                                               plan.sub(list(range(a, b, w)) + [b])))
+    return SERIES_CACHE.get(key, build)
+
+
+def _from_chunks(get_chunk: Callable[[int], array], p0: int, p1: int, check: CancelCheck = never) -> array:
+    """Outputs p0..p1-1 of the chunked grid; stops (Superseded) when check() turns True."""
+    out = array('d')
+    for k in range(p0 // CHUNK_POINTS, -(-p1 // CHUNK_POINTS)):
+        if check():
+            raise Superseded()
+        base = k * CHUNK_POINTS
+        out.extend(get_chunk(k)[max(p0, base) - base:p1 - base])
+    return out
+
+
+def stride_series(ds: ColumnarDataset, channels: List[str], i0: int, i1: int, step: int,
+                  as_arrays: bool = False, check: CancelCheck = never) -> Tuple[List[int], Dict[str, Any]]:
+    """Every step-th sample of [i0, i1), on the global grid of multiples of step.
+
+    Values are lists with None gaps, or array('d') with NaN when as_arrays.
+    check -- polled between chunks: True drops the work (raises Superseded)."""
+    p0 = -(-i0 // step)
+    p1 = max(p0, -(-i1 // step))
+    t = list(ds.t_ms[p0 * step:i1:step])
+    series: Dict[str, Any] = {}
     for code in channels:
-        series[code] = [_to_float(r.get(code)) for r in sliced]
+        if not ds.has(code):
+            series[code] = _finish(array('d', [NAN]) * len(t), as_arrays)
+            continue
+        series[code] = _finish(_from_chunks(lambda k: _stride_chunk(ds, code, step, k), p0, p1, check), as_arrays)
+    return t, series
+
 
+def minmax_series(ds: ColumnarDataset, channels: List[str], i0: int, i1: int, max_points: int,
+                  as_arrays: bool = False, check: CancelCheck = never) -> Tuple[List[int], Dict[str, Any]]:
+    """Min/max envelope of [i0, i1); whole buckets come from the chunk cache,
+    the buckets cut by the range are computed directly."""
+    plan = ds.minmax_plan(i0, i1, max_points)
+    if plan.width == 1:
+        return stride_series(ds, channels, i0, i1, 1, as_arrays, check)  # 1-sample buckets: the raw data
+    t = plan.times(ds.t_ms)
+    edges = plan.edges
+    w = plan.width
+    # buckets fully inside the range: edges[j0]..edges[j1] on the grid
+    j0 = 0 if edges[0] % w == 0 else 1
+    j1 = len(edges) - 1
+    if j1 > j0 and edges[j1] % w != 0 and edges[j1] != len(ds):
+        j1 -= 1
+    series: Dict[str, Any] = {}
+    for code in channels:
+        if check():
+            raise Superseded()
+        if not ds.has(code):
+            series[code] = _finish(array('d', [NAN]) * len(t), as_arrays)
+            continue
+        out = array('d')
+        if j0:
+            out += _nan_array(ds.minmax_values(code, plan.sub(edges[:2])))
+        if j1 > j0:
+            # 2 values per bucket (only a 1-sample bucket at the end of data has 1)
+            b0, b1 = edges[j0] // w, -(-edges[j1] // w)
+            out += _from_chunks(lambda k: _minmax_chunk(ds, code, plan, k), 2 * b0, 2 * b1, check)
+        if j1 < len(edges) - 1:
+            out += _nan_array(ds.minmax_values(code, plan.sub(edges[-2:])))
+        series[code] = _finish(out, as_arrays)
     return t, series
 
 
+def warm_series(ds: ColumnarDataset, channels: List[str], i0: int, i1: int, step: int, env_points: int,
+                check: CancelCheck = never) -> None:
+    """Fill the cache with the chunks a stride/minmax query of [i0, i1) would use."""
+    if env_points:
+        minmax_series(ds, channels, i0, i1, env_points, as_arrays=True, check=check)
+    else:
+        stride_series(ds, channels, i0, i1, step, as_arrays=True, check=check)
+
+
+def cache_full(share: float) -> bool:
+    """True when the cache holds more than `share` of its byte budget."""
+    st = SERIES_CACHE.stats()
+    return st['bytes'] > st['max_bytes'] * share
+
+
+def cache_stats() -> Dict[str, Any]:
+    return SERIES_CACHE.stats()
+
+
 def clear_cache() -> None:
-    try:
-        cached_series_slice.cache_clear()
-    except Exception:
-        pass
+    SERIES_CACHE.clear()
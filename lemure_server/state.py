@@ -1,25 +1,197 @@
 from __future__ import annotations
 
 import os
+import threading
 import datetime as dt
+from collections import OrderedDict
 from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from lemure_reader import load_test, ChannelInfo
+from lemure_reader import load_test, find_test_files, ChannelInfo, ColumnarDataset, LoadProgress, ProvaFiles
 
-STATE: Dict[str, Any] = {
-    "loaded": False,
-    "folder": "",
-    "data": None,
-    "t_list": [],
-}
+from .config import DATASET_CACHE, LAZY_CACHE_BYTES, LAZY_LOAD, LOAD_WORKERS, LOADED_TESTS_BYTES
+from .dataset_cache import fingerprint, load_cached, save_cached
 
+@dataclass(frozen=True)
+class DatasetSnapshot:
+    """One loaded test; never changed after publish(), except that a followed
+    test's dataset grows at the end (follow.py; existing samples never change).
 
-def build_state(folder: str) -> Dict[str, Any]:
-    data = load_test(folder)
-    t_list = [r["t_ms"] for r in data["rows"]]
-    return {"loaded": True, "folder": folder, "data": data, "t_list": t_list}
+    version     -- the dataset's process-unique version: grows with every load,
+                   caches and ETags key their entries by it; also the dataset id
+                   (?ds=) the browser tabs send
+    key         -- normalized test root (one registry slot per folder)
+    fingerprint -- dataset_cache.fingerprint() of the sources when loaded
+                   (or last followed)
+    """
+    folder: str
+    data: Dict[str, Any]    # load_test() result
+    version: int
+    key: str = ""
+    fingerprint: str = ""
+
+    @property
+    def dataset(self) -> ColumnarDataset:
+        return self.data["dataset"]
+
+    @property
+    def t_list(self) -> Sequence[int]:
+        # time column is shared with the dataset (array('q') works with bisect as is)
+        return self.data["dataset"].t_ms
+
+    @property
+    def data_tag(self) -> Tuple[int, int]:
+        """(version, revision): changes whenever the data does (ETags)."""
+        return self.version, self.data["dataset"].revision
+
+
+class DatasetRegistry:
+    """Loaded tests by folder, LRU bounded by max_bytes.
+
+    Snapshots are shared by all tabs; a request names the one it reads with
+    ?ds=<version>. Sizes grow as lazy channels get decoded, so the budget is
+    re-checked on every access; the most recently used test always stays.
+    Dropping a test only drops the registry's reference: requests holding
+    the snapshot finish normally.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, DatasetSnapshot]" = OrderedDict()
+        self._latest = ""
+        self._lock = threading.Lock()
+
+    def _evict(self) -> None:
+        sizes = {key: snap.dataset.nbytes for key, snap in self._items.items()}
+        total = sum(sizes.values())
+        while total > self.max_bytes and len(self._items) > 1:
+            key, snap = self._items.popitem(last=False)
+            total -= sizes[key]
+            print(f"[REGISTRY] unloaded {snap.folder} ({sizes[key] // (1024 * 1024)} MB)")
+
+    def add(self, snap: DatasetSnapshot) -> None:
+        with self._lock:
+            self._items.pop(snap.key, None)
+            self._items[snap.key] = snap  # one reference store per slot
+            self._latest = snap.key
+            self._evict()
+
+    def get(self, version: int) -> Optional[DatasetSnapshot]:
+        with self._lock:
+            for key, snap in self._items.items():
+                if snap.version == version:
+                    self._items.move_to_end(key)
+                    self._evict()
+                    return snap
+        return None
+
+    def update(self, snap: DatasetSnapshot) -> bool:
+        """Swap in a new snapshot of the same dataset (a followed test's new
+        fingerprint) without touching the LRU order; False if it was dropped."""
+        with self._lock:
+            old = self._items.get(snap.key)
+            if old is None or old.version != snap.version:
+                return False
+            self._items[snap.key] = snap
+            return True
+
+    def find(self, key: str, fp: str) -> Optional[DatasetSnapshot]:
+        """Loaded snapshot of a folder if its sources haven't changed since."""
+        with self._lock:
+            snap = self._items.get(key)
+            if snap is None or snap.fingerprint != fp:
+                return None
+            self._items.move_to_end(key)
+            return snap
+
+    def latest(self) -> Optional[DatasetSnapshot]:
+        """The last loaded test, or the most recently used one once it is dropped."""
+        with self._lock:
+            snap = self._items.get(self._latest)
+            if snap is None and self._items:
+                snap = next(reversed(self._items.values()))
+            return snap
+
+    def snapshots(self) -> List[DatasetSnapshot]:
+        """Most recently used first."""
+        with self._lock:
+            return list(reversed(self._items.values()))
+
+
+REGISTRY = DatasetRegistry(LOADED_TESTS_BYTES)
+
+
+def current() -> Optional[DatasetSnapshot]:
+    """The last loaded test (None before the first load).
+
+    Take a snapshot once per request and read everything from that object: a
+    reload publishes a new snapshot, it doesn't change the one you hold.
+    """
+    return REGISTRY.latest()
+
+
+def publish(snap: DatasetSnapshot) -> None:
+    REGISTRY.add(snap)
+
+
+def get_snapshot(args) -> Tuple[Optional[DatasetSnapshot], str]:
+    """Snapshot a request reads: ?ds=<dataset id> (each tab sends its own),
+    otherwise the last loaded test. (None, error message) when there is none."""
+    ds_id = (args.get('ds') or '').strip()
+    if not ds_id:
+        snap = current()
+        return snap, '' if snap is not None else 'Данные не загружены'
+    try:
+        snap = REGISTRY.get(int(ds_id))
+    except ValueError:
+        return None, 'Неверный идентификатор теста: ' + ds_id
+    if snap is None:
+        return None, 'Тест выгружен из памяти, загрузите его снова'
+    return snap, ''
+
+
+def folder_key(root: str) -> str:
+    return os.path.normcase(os.path.realpath(root))
+
+
+def load_data(folder: str, progress: Optional[LoadProgress] = None,
+              files: Optional[ProvaFiles] = None, fp: str = "") -> Dict[str, Any]:
+    """load_test() through the on-disk cache (rebuilt when the sources change).
+
+    fp -- fingerprint(files) taken before loading (computed here if empty)."""
+    if not DATASET_CACHE:
+        return load_test(folder, workers=LOAD_WORKERS, lazy=LAZY_LOAD, cache_bytes=LAZY_CACHE_BYTES,
+                         progress=progress)
+    files = files or find_test_files(folder)
+    if progress is not None:
+        progress.set_phase("cache")
+    data = load_cached(folder, files, lazy=LAZY_LOAD)
+    if data is None:
+        fp = fp or fingerprint(files)
+        data = load_test(folder, workers=LOAD_WORKERS, lazy=LAZY_LOAD, cache_bytes=LAZY_CACHE_BYTES,
+                         progress=progress)
+        if LAZY_LOAD:
+            # writing the cache decodes every channel (one pass over the files,
+            # big tests in the process pool): do it off the request path
+            threading.Thread(target=save_cached, args=(data, files, fp), daemon=True).start()
+        else:
+            save_cached(data, files, fp)
+    return data
+
+
+def build_state(folder: str, progress: Optional[LoadProgress] = None) -> DatasetSnapshot:
+    """Snapshot of a test folder: the loaded one if its files are unchanged,
+    otherwise a fresh load."""
+    files = find_test_files(folder)
+    key = folder_key(files.root)
+    fp = fingerprint(files)
+    snap = REGISTRY.find(key, fp)
+    if snap is not None:
+        return snap
+    data = load_data(folder, progress, files, fp)
+    return DatasetSnapshot(folder=folder, data=data, version=data["dataset"].version, key=key, fingerprint=fp)
 
 
 def channel_to_dict(ch: ChannelInfo) -> Dict[str, str]:
@@ -27,13 +199,13 @@ def channel_to_dict(ch: ChannelInfo) -> Dict[str, str]:
 
 
 def summary(data: Dict[str, Any]) -> Dict[str, Any]:
-    rows = data["rows"]
-    if not rows:
+    ds: ColumnarDataset = data["dataset"]
+    if not len(ds):
         return {"points": 0}
-    t0 = rows[0]["t_ms"]
-    t1 = rows[-1]["t_ms"]
+    t0 = ds.t_ms[0]
+    t1 = ds.t_ms[-1]
     return {
-        "points": len(rows),
+        "points": len(ds),
         "start_ms": t0,
         "end_ms": t1,
         "start": dt.datetime.fromtimestamp(t0 / 1000).strftime("%Y-%m-%d %H:%M:%S"),
@@ -73,7 +245,7 @@ def nearest_index(t_list: List[int], target_ms: int) -> int:
 
 
 class ChannelResolver:
-    """Fast O(1) channel lookup (kept for future use)."""
+    """Channel lookup by code or by suffix ("T1" -> "A-T1", A- then C- preferred)."""
 
     def __init__(self, cols: List[str]):
         self.cols = set(cols)
@@ -3,7 +3,6 @@ from __future__ import annotations
 import os
 import datetime as dt
 import threading
-import time as time_mod
 import webbrowser
 
 
@@ -34,7 +33,3 @@ def open_browser_later(host: str, port: int, delay_s: float = 0.8) -> None:
             pass
 
     threading.Timer(delay_s, _open).start()
-
-
-def now_asset_version_fallback() -> str:
-    return str(int(time_mod.time()))
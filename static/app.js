@@ -1,8 +1,10 @@
 (function(){
   // Loader stub: real logic is split into /static/js/*.js for easier maintenance.
   // Keeps compatibility with existing index.html that loads /static/app.js.
-  var v = (window.ASSET_V != null) ? String(window.ASSET_V) : "";
+  // content hash of every static file (computed by the server at startup)
+  var hashes = window.ASSET_HASHES || {};
   function withV(url){
+    var v = hashes[url.replace(/^\/static\//, "")];
     if(!v) return url;
     return url + (url.indexOf("?")>=0 ? "&" : "?") + "v=" + encodeURIComponent(v);
   }
@@ -438,6 +438,7 @@ function _collectPresetPayload() {
     step_target: (isFinite(stepTarget) && stepTarget > 0) ? stepTarget : 5000,
     step: (isFinite(stepManual) && stepManual > 0) ? stepManual : 1,
     show_legend: showLegend,
+    plot_mode: getPlotMode(),
   };
 }
 
@@ -492,6 +493,7 @@ function _applyPresetObject(preset) {
   if(el('stepAuto') && typeof preset.step_auto === 'boolean') el('stepAuto').checked = preset.step_auto;
   if(el('stepTarget') && preset.step_target) el('stepTarget').value = String(parseInt(preset.step_target, 10));
   if(el('step') && preset.step) el('step').value = String(parseInt(preset.step, 10));
+  if(el('plotMode') && preset.plot_mode) el('plotMode').value = String(preset.plot_mode);
   updateStepUI();
 
   // 2) порядок/сортировка
@@ -533,7 +535,10 @@ function loadPreset() {
     return;
   }
 
-  fetch('/api/presets_load?key=' + encodeURIComponent(key))
+  // ds: сервер заранее готовит данные каналов набора для графика
+  const qs = new URLSearchParams({key});
+  withDataset(qs);
+  fetch('/api/presets_load?' + qs.toString())
     .then(r=>r.json())
     .then(j=>{
       if(!j.ok) {
@@ -613,6 +618,16 @@ function loadTest() {
   if(btn) btn.disabled = true;
   if(btnPick) btnPick.disabled = true;
 
+  let jobId = null;
+  setBusyCancel(() => {
+    if(!jobId) return;
+    fetch("/api/load_cancel", {
+      method:"POST",
+      headers: {"Content-Type":"application/json"},
+      body: JSON.stringify({job_id: jobId})
+    }).catch(()=>{});
+  });
+
   fetch("/api/load", {
     method:"POST",
     headers: {"Content-Type":"application/json"},
@@ -620,12 +635,28 @@ function loadTest() {
   })
   .then(r=>r.json())
   .then(j=>{
-    if(!j.ok) {
-      toast('Ошибка загрузки', j.error || 'Не удалось загрузить тест', 'err', 6000);
-      log("load error: " + j.error);
+    if(!j.ok) return j;
+    // Загрузка идёт в фоне на сервере: опрашиваем прогресс до завершения
+    jobId = j.job_id;
+    if(j.attached) log("load: already loading, waiting for it");
+    return waitLoadJob(jobId);
+  })
+  .then(j=>{
+    if(j && j.state === 'cancelled') {
+      toast('Загрузка отменена', 'Показан прежний тест', 'warn');
+      log("load cancelled: " + folder);
+      return;
+    }
+    if(j && j.state === 'error') j = {ok: false, error: j.error};
+    else if(j && j.state === 'done') j = j.result;
+    if(!j || !j.ok) {
+      const err = j && j.error;
+      toast('Ошибка загрузки', err || 'Не удалось загрузить тест', 'err', 6000);
+      log("load error: " + err);
       return;
     }
     LOADED = true;
+    DATASET_ID = (j.dataset_id != null) ? j.dataset_id : null;
 
     RANGE_STATS = null;
     _rangeStatsToken++;
@@ -635,10 +666,7 @@ function loadTest() {
 
     SUMMARY = j.summary || null;
     if(SUMMARY) {
-      el("summary").innerHTML =
-        `Точек: <b>${SUMMARY.points}</b> | ` +
-        `Начало: <b>${SUMMARY.start}</b> | ` +
-        `Конец: <b>${SUMMARY.end}</b>`;
+      renderSummary();
       currentRange = [SUMMARY.start_ms, SUMMARY.end_ms];
       // Новый тест загружен: на следующем построении графика диапазон должен
       // сброситься к полному диапазону текущего теста.
@@ -666,18 +694,222 @@ function loadTest() {
     log("Loaded: " + (j.folder || folder));
     toast('Тест загружен', `Каналов: ${CHANNELS_FILE.length}, точек: ${SUMMARY ? SUMMARY.points : '—'}`, 'ok');
     drawPlot();
+    syncFollow();
   })
   .catch(e=>{
     toast('Ошибка загрузки', (e && e.message) ? e.message : String(e), 'err', 6000);
     log("loadTest error: " + e);
   })
   .finally(()=>{
+    setBusyCancel(null);
     if(btn) btn.disabled = false;
     if(btnPick) btnPick.disabled = false;
     endBusy();
   });
 }
 
+function renderSummary() {
+  el("summary").innerHTML =
+    `Точек: <b>${SUMMARY.points}</b> | ` +
+    `Начало: <b>${SUMMARY.start}</b> | ` +
+    `Конец: <b>${SUMMARY.end}</b>`;
+}
+
+// Слежение за записью: сервер сам дописывает новые записи к тесту и присылает их
+// потоком (/api/follow_stream, Server-Sent Events); новые точки добавляются
+// в конец линий графика (Plotly.extendTraces) без перезапроса всей серии.
+let _followStream = null;
+let _followRevision = null;
+let _followPlot = null;      // {codes, step, end_ms} последнего построенного графика
+let _followExtended = 0;     // точек, добавленных потоком после последнего построения
+
+function setFollow(on) {
+  const box = el('followLive');
+  if(!LOADED || DATASET_ID == null) {
+    if(box) box.checked = false;
+    if(on) toast('Нет данных', 'Сначала загрузите тест', 'warn');
+    return;
+  }
+  fetch('/api/follow', {
+    method:'POST',
+    headers:{'Content-Type':'application/json'},
+    body: JSON.stringify({ds: DATASET_ID, on})
+  })
+  .then(r=>r.json())
+  .then(j=>{
+    if(!j.ok) {
+      if(box) box.checked = false;
+      toast('Слежение', j.error || 'Не удалось', 'err', 6000);
+      return;
+    }
+    applyFollowState(j);
+    log(`follow: ${j.state}`);
+  })
+  .catch(e=>log('follow error: ' + e));
+}
+
+// после загрузки: этот тест уже может отслеживаться (например, из другой вкладки)
+function syncFollow() {
+  closeFollowStream();
+  _followRevision = null;
+  _followPlot = null;
+  fetch('/api/follow_status?' + withDataset(new URLSearchParams()).toString())
+    .then(r=>r.json())
+    .then(j=>{ if(j.ok) applyFollowState(j); })
+    .catch(()=>{});
+}
+
+function closeFollowStream() {
+  if(_followStream) _followStream.close();
+  _followStream = null;
+}
+
+function applyFollowState(j) {
+  const box = el('followLive');
+  const running = j.state === 'running';
+  if(box) box.checked = running;
+  if(j.dataset_id !== DATASET_ID) return;  // ответ по тесту, который уже сменили
+  if(_followRevision !== null && j.revision !== _followRevision) applyFollowSummary(j.summary);
+  _followRevision = j.revision;
+  if(running && !_followStream) {
+    openFollowStream();
+  } else if(!running) {
+    closeFollowStream();
+    _followRevision = null;
+    if(j.error) toast('Слежение остановлено', j.error, 'warn', 6000);
+  }
+}
+
+// Вызывается после каждого построения графика: поток продолжает именно его линии
+// (те же каналы и шаг, точки после его конца).
+function followPlotDrawn(codes, step, end_ms) {
+  _followPlot = {codes: codes.slice(), step: Math.max(1, step || 1), end_ms};
+  _followExtended = 0;
+  if(_followStream) openFollowStream();
+}
+
+function openFollowStream() {
+  closeFollowStream();
+  if(!LOADED || DATASET_ID == null || typeof EventSource === 'undefined') return;
+  const qs = withDataset(new URLSearchParams());
+  const p = _followPlot;
+  qs.set('channels', p ? p.codes.join(',') : '');
+  qs.set('step', String(p ? p.step : 1));
+  if(p) qs.set('after_ms', String(p.end_ms));
+  const es = new EventSource('/api/follow_stream?' + qs.toString());
+  _followStream = es;
+  es.addEventListener('samples', e => {
+    if(es !== _followStream) return;
+    applyFollowBatch(JSON.parse(e.data));
+  });
+  es.addEventListener('state', e => {
+    if(es !== _followStream) return;
+    closeFollowStream();
+    applyFollowState(JSON.parse(e.data));
+  });
+  es.onerror = () => {
+    // обрыв связи: EventSource переподключится сам; CLOSED — сервер отказал (тест выгружен и т.п.)
+    if(es === _followStream && es.readyState === EventSource.CLOSED) {
+      _followStream = null;
+      syncFollow();
+    }
+  };
+}
+
+function applyFollowBatch(b) {
+  if(b.dataset_id !== DATASET_ID) return;
+  _followRevision = b.revision;
+  const s = b.summary;
+  if(!s || !s.points || !SUMMARY) return;
+  const p = _followPlot;
+  const plotDiv = el('plot');
+  const traces = plotDiv && plotDiv.data;
+  const n = (b.t_ms || []).length;
+  if(n && (!p || b.step !== p.step || !traces || traces.length !== p.codes.length
+           || _followExtended + n > getStepTarget() / 2)) {
+    // график не тот, что продолжает поток, или точек набралось много — строим заново
+    applyFollowSummary(s);
+    return;
+  }
+  if(n) {
+    const x = Array.from(b.t_ms, (ms) => new Date(msToPlotX(ms)));
+    // y из бинарной серии — типизированный массив: extendTraces дописывает в него через
+    // TypedArray.set, и null стал бы нулём. Разрыв линии в таком массиве — NaN.
+    const y = p.codes.map((code, i) => {
+      const vals = b.series[code] || new Array(n).fill(null);
+      const cur = traces[i].y;
+      return ArrayBuffer.isView(cur) ? cur.constructor.from(vals, v => (v == null ? NaN : v)) : vals;
+    });
+    Plotly.extendTraces(plotDiv, {x: p.codes.map(() => x), y}, p.codes.map((_, i) => i));
+    _followExtended += n;
+    p.end_ms = b.t_ms[n - 1];
+  }
+  if(traces) {
+    // полоса прокрутки — всегда на весь тест, окно у правого края едет за данными
+    const upd = {'xaxis.rangeslider.range': [new Date(msToPlotX(s.start_ms)), new Date(msToPlotX(s.end_ms))]};
+    const r = followWindow(s);
+    if(r) {
+      upd['xaxis.range'] = [new Date(msToPlotX(r[0])), new Date(msToPlotX(r[1]))];
+      currentRange = r;
+    }
+    Plotly.relayout(plotDiv, upd);
+  }
+  SUMMARY = s;
+  renderSummary();
+  RANGE_STATS = null;
+  updateRangeText();
+}
+
+// новые данные без графика, который можно продолжить: перерисовка целиком
+function applyFollowSummary(s) {
+  if(!s || !s.points || !SUMMARY) return;
+  _followRange = followWindow(s);
+  SUMMARY = s;
+  renderSummary();
+  RANGE_STATS = null;
+  scheduleRedraw();
+}
+
+// Окно графика после роста теста до s: если оно было у правого края — весь тест,
+// когда он весь на экране, иначе окно той же ширины у нового конца; null — не двигать.
+function followWindow(s) {
+  const vr = getVisibleRangeFromPlot() || currentRange;
+  if(!vr || vr.length !== 2 || Math.max(vr[0], vr[1]) < SUMMARY.end_ms) return null;
+  const lo = Math.min(vr[0], vr[1]);
+  return (lo <= SUMMARY.start_ms) ? [s.start_ms, s.end_ms] : [lo + (s.end_ms - SUMMARY.end_ms), s.end_ms];
+}
+
+const LOAD_PHASES = {scan: 'Читаю заголовки', decode: 'Читаю файлы', merge: 'Собираю данные',
+                     cache: 'Читаю кэш', done: 'Готово'};
+
+function loadProgressText(p) {
+  let s = 'Загружаю тест… ' + (LOAD_PHASES[p.phase] || p.phase || '');
+  if(p.phase === 'decode' && p.records_total > 0) {
+    const pct = Math.min(100, Math.floor(100 * p.records_done / p.records_total));
+    s += ` ${pct}% (файлы ${p.files_done}/${p.files_total}, ${(p.bytes_done / 1048576).toFixed(0)} МБ)`;
+    if(p.eta_s != null) s += `, осталось ~${Math.ceil(p.eta_s)} с`;
+  }
+  return s;
+}
+
+// Опрос /api/load_status до конца задачи; resolve(статус с state done|error|cancelled)
+function waitLoadJob(jobId) {
+  return new Promise((resolve, reject) => {
+    const poll = () => {
+      fetch("/api/load_status?job_id=" + encodeURIComponent(jobId))
+      .then(r=>r.json())
+      .then(j=>{
+        if(!j.ok) { resolve(j); return; }
+        if(j.state !== 'running') { resolve(j); return; }
+        setBusyText(loadProgressText(j.progress || {}));
+        setTimeout(poll, 300);
+      })
+      .catch(reject);
+    };
+    poll();
+  });
+}
+
 function getStep() {
   const cb = el('stepAuto');
   if(cb && cb.checked) return computeAutoStep();
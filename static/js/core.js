@@ -73,6 +73,7 @@ function plotXToMs(plotMs) {
 
 // LeMuRe Viewer UI (selection like <select multiple> + drag reorder + export by visible X range)
 let LOADED = false;
+let DATASET_ID = null;      // this tab's test on the server (?ds= on data requests)
 
 let CHANNELS_FILE = [];       // channels in the order they appear in file
 let CHANNELS_VIEW = [];       // currently shown order in list
@@ -85,6 +86,9 @@ let currentRange = null;      // [start_ms, end_ms]
 // При смене каналов внутри одного теста диапазон должен сохраняться.
 let _forceResetRangeOnNextPlot = false;
 
+// Слежение за записью: диапазон, на который сдвинуть окно графика при следующем построении
+let _followRange = null;
+
 let VIEWER_SETTINGS = null;  // server-side settings for template styling
 
 let redrawTimer = null;
@@ -122,6 +126,20 @@ function _setOverlayVisible(vis, text) {
   ov.setAttribute('aria-hidden', vis ? 'false' : 'true');
 }
 
+function setBusyText(text) {
+  const tx = el('busyText');
+  if(tx && text) tx.textContent = text;
+}
+
+// Кнопка «Отмена» на оверлее: fn = обработчик, null = скрыть
+function setBusyCancel(fn) {
+  const b = el('busyCancel');
+  if(!b) return;
+  b.onclick = fn ? () => { b.disabled = true; fn(); } : null;
+  b.disabled = false;
+  b.classList.toggle('hidden', !fn);
+}
+
 function beginBusy(text, opts) {
   BUSY_GUARD++;
   const my = BUSY_GUARD;
@@ -265,6 +283,7 @@ function _collectLastState() {
 
     return {
       v: 1,
+      plot_mode: getPlotMode(),
       saved_at: new Date().toISOString(),
       selected: Array.from(selected || []),
       step_auto: stepAuto,
@@ -306,6 +325,7 @@ function applyLastStateIfAny() {
     if(el('stepAuto') && typeof st.step_auto === 'boolean') el('stepAuto').checked = st.step_auto;
     if(el('stepTarget') && st.step_target) el('stepTarget').value = String(parseInt(st.step_target, 10));
     if(el('step') && st.step) el('step').value = String(parseInt(st.step, 10));
+    if(el('plotMode') && st.plot_mode) el('plotMode').value = String(st.plot_mode);
     if(el('showLegend') && typeof st.show_legend === 'boolean') el('showLegend').checked = st.show_legend;
 
     updateStepUI();
@@ -560,12 +580,19 @@ function requestRangeStatsDebounced() {
   _rangeStatsTimer = setTimeout(() => _fetchRangeStatsNow(r), 250);
 }
 
+// Каждая вкладка читает свой тест: сервер держит несколько загруженных тестов
+function withDataset(qs) {
+  if(DATASET_ID != null) qs.set('ds', String(DATASET_ID));
+  return qs;
+}
+
 function _fetchRangeStatsNow(r) {
   if(!LOADED || !SUMMARY) return;
   const token = ++_rangeStatsToken;
   const qs = new URLSearchParams();
   qs.set('start_ms', String(r[0]));
   qs.set('end_ms', String(r[1]));
+  withDataset(qs);
   fetch('/api/range_stats?' + qs.toString())
     .then(resp => resp.json())
     .then(j => {
@@ -631,6 +658,12 @@ function getStepTarget() {
   return (isFinite(v) && v > 0) ? v : 5000;
 }
 
+// Downsampling mode for /api/series: "stride" (every N-th point), "minmax" or "lttb"
+function getPlotMode() {
+  const sel = el('plotMode');
+  return (sel && sel.value) ? sel.value : 'stride';
+}
+
 function computeAutoStep() {
   if(!SUMMARY || !SUMMARY.points) return 1;
   const target = getStepTarget();
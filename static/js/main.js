@@ -4,6 +4,8 @@ function wire() {
 
   const bl = el("btnLoad");
   if(bl) bl.addEventListener("click", loadTest);
+  const fl = el("followLive");
+  if(fl) fl.addEventListener("change", () => setFollow(fl.checked));
 
   const bd = el("btnDraw");
   if(bd) bd.addEventListener("click", drawPlot);
@@ -116,6 +118,8 @@ function wire() {
   if(stTarget) stTarget.addEventListener('change', () => { updateStepUI(); scheduleRedraw(); });
   const stInp = el('step');
   if(stInp) stInp.addEventListener('change', () => { updateStepUI(); scheduleRedraw(); });
+  const pm = el('plotMode');
+  if(pm) pm.addEventListener('change', () => { scheduleSaveLastState(); scheduleRedraw(); });
 
   // Legend toggle
   const lg = el('showLegend');
@@ -1,3 +1,68 @@
+// Бинарный ответ /api/series (format=bin): uint32 длина заголовка, JSON-заголовок,
+// выравнивание до 8 байт, затем массивы little-endian. [offset, count] в заголовке —
+// от начала тела. Время: int32-дельты от t0 (t_enc "d32") или float64 мс ("f64").
+function _binTimes(buf, base, head) {
+  const [off, n] = head.t;
+  const out = new Float64Array(n);
+  if(head.t_enc === 'f64') {
+    out.set(new Float64Array(buf, base + off, n));
+    return out;
+  }
+  const dv = new DataView(buf, base + off, n * 4);
+  let t = head.t0;
+  for(let i = 0; i < n; i++) {
+    t += dv.getInt32(i * 4, true);
+    out[i] = t;
+  }
+  return out;
+}
+
+function parseSeriesBinary(buf) {
+  const hlen = new DataView(buf).getUint32(0, true);
+  const head = JSON.parse(new TextDecoder().decode(new Uint8Array(buf, 4, hlen)));
+  const base = (4 + hlen + 7) & ~7;
+  const Arr = head.dtype === 'f8' ? Float64Array : Float32Array;
+  const series = {};
+  const tSeries = head.t ? null : {};
+  Object.keys(head.series || {}).forEach(code => {
+    const sec = head.series[code];
+    // значения — типизированный массив без копирования, NaN = разрыв линии в Plotly
+    series[code] = new Arr(buf, base + sec.v[0], sec.v[1]);
+    if(tSeries) tSeries[code] = _binTimes(buf, base, sec);
+  });
+  const j = Object.assign({}, head, {series});
+  if(tSeries) j.t_series = tSeries;
+  else j.t_ms = _binTimes(buf, base, head);
+  return j;
+}
+
+// Каждый запрос серии — новое «поколение» графика этой вкладки: сервер бросает
+// недосчитанные старые запросы (409 superseded), а браузер прерывает их загрузку.
+const VIEW_ID = Math.random().toString(36).slice(2) + Date.now().toString(36);
+let _seriesGen = 0;
+let _seriesAbort = null;
+
+function fetchSeries(qs) {
+  qs.set('format', 'bin');
+  const gen = ++_seriesGen;
+  if(_seriesAbort) { try { _seriesAbort.abort(); } catch(_) {} }
+  const ctl = (typeof AbortController !== 'undefined') ? new AbortController() : null;
+  _seriesAbort = ctl;
+  return fetch(`/api/series?${qs.toString()}`, {
+    headers: {'X-View-Id': VIEW_ID, 'X-View-Gen': String(gen)},
+    signal: ctl ? ctl.signal : undefined,
+  }).then(r => {
+    const ct = r.headers.get('Content-Type') || '';
+    return ct.indexOf('application/octet-stream') >= 0 ? r.arrayBuffer().then(parseSeriesBinary) : r.json();
+  }).then(j => {
+    if(gen !== _seriesGen) return {ok: false, superseded: true};
+    return j;
+  }).catch(e => {
+    if(gen !== _seriesGen || (e && e.name === 'AbortError')) return {ok: false, superseded: true};
+    throw e;
+  });
+}
+
 function drawPlot() {
   if(!LOADED || !SUMMARY) return;
   const codes = getSelectedCodes();
@@ -18,6 +83,10 @@ function drawPlot() {
   if(_forceResetRangeOnNextPlot) {
     // Загружен новый тест: НЕ переносим zoom/диапазон со старого графика.
     desiredRange = [SUMMARY.start_ms, SUMMARY.end_ms];
+  } else if(_followRange) {
+    // Пришли новые данные, а окно было у правого края: оно едет за ними
+    desiredRange = _followRange;
+    _followRange = null;
   } else {
     const vrBefore = getVisibleRangeFromPlot();
     if(vrBefore && vrBefore.length === 2) {
@@ -43,10 +112,13 @@ function drawPlot() {
   } else {
     qs.set('step', String(step));
   }
+  // min/max: огибающая вместо каждой N-й точки (пики не пропадают)
+  qs.set('mode', getPlotMode());
+  withDataset(qs);
 
-  fetch(`/api/series?${qs.toString()}`)
-    .then(r=>r.json())
+  fetchSeries(qs)
     .then(j=>{
+      if(j.superseded) return;  // уже запрошен более новый график
       if(!j.ok) {
         toast('Ошибка данных', j.error || 'Не удалось получить серию', 'err', 6000);
         log("series error: " + j.error);
@@ -54,20 +126,24 @@ function drawPlot() {
       }
       // IMPORTANT: use local strings instead of Date objects to avoid a fixed timezone offset
       // on some machines/browsers when Plotly formats dates.
-      const t = (j.t_ms || []).map((ms) => new Date(msToPlotX(ms)));
+      const t = Array.from(j.t_ms || [], (ms) => new Date(msToPlotX(ms)));
       const series = j.series || {};
+      // LTTB: у каждого канала свои моменты времени
+      const tSeries = j.t_series || null;
       const traces = [];
 
       // Производительность: при большом числе точек лучше использовать WebGL (scattergl)
-      const useGL = (t.length > 8000) || (codes.length * t.length > 300000);
+      const nPts = tSeries ? (j.points || 0) : t.length;
+      const useGL = (nPts > 8000) || (codes.length * nPts > 300000);
 
       codes.forEach(code => {
         const y = series[code] || [];
+        const x = tSeries ? Array.from(tSeries[code] || [], (ms) => new Date(msToPlotX(ms))) : t;
         traces.push({
           type: useGL ? "scattergl" : "scatter",
           mode: "lines",
           name: labelFor(code),
-          x: t,
+          x: x,
           y: y,
           hovertemplate: "%{x|%Y-%m-%d %H:%M:%S}<br>%{y:.2f}<extra></extra>",
         });
@@ -174,6 +250,9 @@ function drawPlot() {
         updateRangeText();
       });
 
+      // Слежение за записью: новые точки пойдут в конец этих линий
+      followPlotDrawn(codes, (typeof j.step === 'number') ? j.step : step, end_ms);
+
       // Текст диапазона обновим сразу (для экспорта)
       if(desiredRange && desiredRange.length === 2) currentRange = desiredRange.slice();
       if(!currentRange) currentRange = [SUMMARY.start_ms, SUMMARY.end_ms];
@@ -236,20 +315,46 @@ function exportData(fmt) {
   qs.set("end_ms", String(end_ms));
   qs.set("channels", codes.join(","));
   qs.set("step", String(step));
+  withDataset(qs);
+
+  const url = "/api/export?" + qs.toString();
+  const failed = (e) => {
+    const msg = (e && e.message) ? e.message : String(e);
+    if(st) st.textContent = "Ошибка: " + msg;
+    toast('Ошибка экспорта', msg, 'err', 6000);
+    log("Export " + fmt + " error: " + e);
+  };
+  const done = () => {
+    if(bc) bc.disabled = false;
+    if(bx) bx.disabled = false;
+    endBusy();
+  };
+
+  // CSV сервер отдаёт потоком: обычная ссылка на скачивание — браузер пишет файл
+  // на диск по мере получения, а не собирает его целиком в памяти вкладки.
+  // Ссылка не видит ошибок сервера (JSON сохранился бы как export.csv), поэтому
+  // сначала HEAD того же запроса; при ошибке текст берём из ответа GET (короткий JSON).
+  if(fmt === "csv") {
+    fetch(url, {method: "HEAD"})
+      .then(async (r) => {
+        if(!r.ok) throw await exportError(await fetch(url));
+        const a = document.createElement("a");
+        a.href = url;
+        a.download = "export.csv";
+        document.body.appendChild(a);
+        a.click();
+        a.remove();
+        if(st) st.textContent = 'Файл скачивается…';
+        log(`Export CSV started: channels=${codes.length}, range=${new Date(start_ms).toLocaleString()} → ${new Date(end_ms).toLocaleString()}, step=${step}`);
+      })
+      .catch(failed)
+      .finally(done);
+    return;
+  }
 
-  fetch("/api/export?" + qs.toString())
+  fetch(url)
     .then(async (r) => {
-      if(!r.ok) {
-        let msg = "HTTP " + r.status;
-        try {
-          const ct = r.headers.get("content-type") || "";
-          if(ct.includes("application/json")) {
-            const j = await r.json();
-            if(j && j.error) msg = j.error;
-          }
-        } catch(e) {}
-        throw new Error(msg);
-      }
+      if(!r.ok) throw await exportError(r);
       try {
         _tplServerTotalS = r.headers.get('X-Export-Total-S');
         _tplServerTiming = r.headers.get('X-Export-Timing');
@@ -273,18 +378,25 @@ function exportData(fmt) {
       toast('Экспорт готов', `${fmt.toUpperCase()}: ${codes.length} каналов`, 'ok');
       log(`Export ${fmt.toUpperCase()} OK: channels=${codes.length}, range=${new Date(start_ms).toLocaleString()} → ${new Date(end_ms).toLocaleString()}, step=${step}`);
     })
-    .catch((e) => {
-      const msg = (e && e.message) ? e.message : String(e);
-      if(st) st.textContent = "Ошибка: " + msg;
-      toast('Ошибка экспорта', msg, 'err', 6000);
-      log("Export " + fmt + " error: " + e);
-    })
-    .finally(() => {
-      if(bc) bc.disabled = false;
-      if(bx) bx.disabled = false;
-      endBusy();
-    });
+    .catch(failed)
+    .finally(done);
 }
+
+// Ошибка ответа /api/export: текст из JSON {"ok": false, "error": ...}, иначе HTTP-код
+async function exportError(r) {
+  let msg = "HTTP " + r.status;
+  try {
+    const ct = r.headers.get("content-type") || "";
+    if(ct.includes("application/json")) {
+      const j = await r.json();
+      if(j && j.error) msg = j.error;
+    } else if(r.body) {
+      r.body.cancel();  // не ошибка (тест поменялся между запросами) — файл не нужен
+    }
+  } catch(e) {}
+  return new Error(msg);
+}
+
 function exportTemplate() {
   if(!LOADED || !SUMMARY) { toast('Нет данных', 'Сначала загрузите тест', 'warn'); return; }
 
@@ -326,6 +438,7 @@ function exportTemplate() {
   qs.set("step", String(step));
   qs.set('include_extra', String(includeExtra));
   qs.set('refrigerant', refrigerant);
+  withDataset(qs);
 
   let _tplServerTotalS = null;
   let _tplServerTiming = null;
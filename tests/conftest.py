@@ -0,0 +1,110 @@
+import math
+import os
+import random
+import struct
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+# the modules live in the project root (no package install)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TIME_FIELDS = [("Data", "D", 8, 0), ("Ore", "N", 2, 0), ("Minuti", "N", 2, 0),
+               ("Secondi", "N", 2, 0), ("mSecondi", "N", 3, 0)]
+
+
+def write_dbf(path, fields, records, deleted=()):
+    """dBASE III file: fields = [(name, type, length, decimals)], None = blank value."""
+    header_len = 32 + 32 * len(fields) + 1
+    record_len = 1 + sum(f[2] for f in fields)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<B3BIHH20x", 3, 124, 1, 1, len(records), header_len, record_len))
+        for name, ftype, length, dec in fields:
+            f.write(struct.pack("<11sc4xBB14x", name.encode(), ftype.encode(), length, dec))
+        f.write(b"\r")
+        for i, rec in enumerate(records):
+            f.write(b"*" if i in deleted else b" ")
+            for (_name, ftype, length, dec), v in zip(fields, rec):
+                if v is None:
+                    s = " " * length
+                elif ftype == "N" and not isinstance(v, str):
+                    s = f"{v:{length}.{dec}f}" if dec else f"{int(v):{length}d}"
+                else:
+                    s = str(v).ljust(length)
+                f.write(s.encode()[:length].rjust(length))
+        f.write(b"\x1a")
+
+
+def make_test_folder(root, files=3, per_file=3000, step=timedelta(milliseconds=250), seed=1):
+    """A ProvaN.dbf test: sine channels with blanks, a NaN stretch, spikes, a
+    text field and deleted records; the files overlap in time a little."""
+    rnd = random.Random(seed)
+    codes = ["A-T1", "A-T2", "A-T3", "A-Pc", "C-Pc"]
+    os.makedirs(os.path.join(root, "Set"), exist_ok=True)
+    with open(os.path.join(root, "Set", "Canali.def"), "w", encoding="cp1251") as f:
+        f.write(f"{len(codes)}\n")
+        for code in codes:
+            f.write(f"{code};Канал {code};°C\n")
+    fields = TIME_FIELDS + [(code, "N", 10, 3) for code in codes] + [("Txt", "C", 6, 0)]
+    t = datetime(2024, 5, 14, 9, 0, 0)
+    for k in range(files):
+        recs = []
+        for i in range(per_file):
+            row = [t.strftime("%Y%m%d"), t.hour, t.minute, t.second, t.microsecond // 1000]
+            for j, code in enumerate(codes):
+                if rnd.random() < 0.03 or (code == "A-T2" and 1000 <= i < 1400):
+                    row.append(None)
+                elif code == "C-Pc" and k == 1:
+                    row.append(None)  # a channel empty in one file
+                else:
+                    row.append(20 + 10 * math.sin(i / 40.0 + j) + (50 if rnd.random() < 0.002 else 0))
+            row.append("1,5" if i % 3 else "abc")
+            recs.append(row)
+            t += step
+        write_dbf(os.path.join(root, f"Prova{k + 1}.dbf"), fields, recs, deleted={5, 17})
+        t -= step * 40  # the next file starts a bit before this one ended
+    return root
+
+
+@pytest.fixture(scope="session")
+def synthetic_test(tmp_path_factory):
+    return make_test_folder(str(tmp_path_factory.mktemp("prova")))
+
+
+@pytest.fixture(scope="session")
+def client():
+    from lemure_server.app_factory import create_app
+
+    return create_app().test_client()
+
+
+@pytest.fixture(scope="session")
+def loaded_test(client, synthetic_test):
+    """/api/load result of the synthetic test (the load runs as a job)."""
+    job = client.post("/api/load", json={"folder": synthetic_test}).get_json()
+    while True:
+        st = client.get("/api/load_status?job_id=" + job["job_id"]).get_json()
+        if st["state"] != "running":
+            return st["result"]
+        time.sleep(0.02)
+
+
+@pytest.fixture(params=["python", "numpy"])
+def backend(request):
+    """Run a test with each compute backend (numpy skipped when not installed)."""
+    import lemure_compute
+
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    prev = os.environ.get(lemure_compute.BACKEND_ENV)
+    lemure_compute.set_backend(request.param)
+    try:
+        yield request.param
+    finally:
+        if prev is None:
+            os.environ.pop(lemure_compute.BACKEND_ENV, None)
+        else:
+            os.environ[lemure_compute.BACKEND_ENV] = prev
+        lemure_compute._BACKEND = None
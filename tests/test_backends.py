@@ -0,0 +1,104 @@
+"""The numpy backend gives the python (reference) backend's results."""
+
+import math
+import os
+
+import pytest
+
+import lemure_compute
+from lemure_compute import RESAMPLE_METHODS, time_grid
+from lemure_reader import load_test
+
+# (i0, i1) windows: whole test, a middle part, the NaN stretch, one sample, empty
+WINDOWS = [(0, None), (1234, 7000), (1000, 1400), (500, 501), (800, 800)]
+POINTS = [1, 7, 300]
+
+
+def _nan_eq(a, b):
+    return a == b or (a != a and b != b)
+
+
+def _close(a, b):
+    if a is None or b is None:
+        return a is b
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+
+
+def _outputs(name, folder):
+    """Everything the endpoints compute, for one backend."""
+    prev = os.environ.get(lemure_compute.BACKEND_ENV)
+    backend = lemure_compute.set_backend(name)
+    try:
+        assert backend.name == name
+        data = load_test(folder, workers=1)
+        ds = data["dataset"]
+        n = len(ds)
+        out = {"t_ms": list(ds.t_ms), "cols": list(ds.cols), "columns": {}, "stride": {}, "minmax": {},
+               "lttb": {}, "stats": {}, "resample": {}}
+        grid = time_grid(ds.t_ms[0] - 5000, ds.t_ms[-1] + 5000, 3300)
+        plans = {(m, gap): ds.resample_plan(grid, m, gap, 7000) for m in RESAMPLE_METHODS for gap in (0, 1000)}
+        for code in ds.cols + ["missing"]:
+            out["columns"][code] = list(ds.column(code) or [])
+            for i0, i1 in WINDOWS:
+                i1 = n if i1 is None else i1
+                out["stats"][code, i0, i1] = ds.stats(code, i0, i1)
+                for k in POINTS:
+                    out["stride"][code, i0, i1, k] = ds.values(code, i0, i1, k)
+                    out["minmax"][code, i0, i1, k] = ds.minmax_values(code, ds.minmax_plan(i0, i1, k))
+                    out["lttb"][code, i0, i1, k] = ds.lttb(code, i0, i1, k * 10)
+            for key, plan in plans.items():
+                out["resample"][(code,) + key] = ds.resample(code, plan)
+        return out
+    finally:
+        if prev is None:
+            os.environ.pop(lemure_compute.BACKEND_ENV, None)
+        else:
+            os.environ[lemure_compute.BACKEND_ENV] = prev
+        lemure_compute._BACKEND = None
+
+
+@pytest.fixture(scope="module")
+def both(synthetic_test):
+    pytest.importorskip("numpy")
+    return _outputs("python", synthetic_test), _outputs("numpy", synthetic_test)
+
+
+def test_columns(both):
+    py, np_ = both
+    assert py["t_ms"] == np_["t_ms"]
+    assert py["cols"] == np_["cols"]
+    for code, col in py["columns"].items():
+        other = np_["columns"][code]
+        assert len(col) == len(other)
+        assert all(map(_nan_eq, col, other)), code
+
+
+@pytest.mark.parametrize("kind", ["stride", "minmax", "lttb"])
+def test_series(both, kind):
+    py, np_ = both
+    assert py[kind] == np_[kind]
+
+
+def test_stats(both):
+    py, np_ = both
+    for key, a in py["stats"].items():
+        b = np_["stats"][key]
+        for field in ("count", "min", "max", "first", "last"):
+            assert a[field] == b[field], (key, field)
+        for field in ("mean", "std"):
+            assert _close(a[field], b[field]), (key, field)
+
+
+def test_resample(both):
+    py, np_ = both
+    for key, a in py["resample"].items():
+        b = np_["resample"][key]
+        assert len(a) == len(b), key
+        assert all(map(_close, a, b)), key
+
+
+def test_python_backend_loads(synthetic_test):
+    # the reference path works without numpy too
+    out = _outputs("python", synthetic_test)
+    assert len(out["t_ms"]) == 3 * (3000 - 2)
+    assert out["cols"] == ["A-Pc", "A-T1", "A-T2", "A-T3", "C-Pc", "Txt"]
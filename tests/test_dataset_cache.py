@@ -0,0 +1,43 @@
+"""On-disk cache entries stay readable while a lazy dataset uses them."""
+
+import gc
+import os
+
+from conftest import make_test_folder
+from lemure_reader import find_test_files, load_test
+from lemure_server import dataset_cache
+from lemure_server.dataset_cache import fingerprint, load_cached, save_cached
+
+
+def _nan_eq(a, b):
+    return a == b or (a != a and b != b)
+
+
+def _save(folder):
+    files = find_test_files(folder)
+    data = load_test(folder, workers=1)
+    assert save_cached(data, files, fingerprint(files))
+    return data
+
+
+def test_rewrite_keeps_the_entry_of_a_loaded_lazy_dataset(tmp_path):
+    folder = make_test_folder(str(tmp_path / "prova"), files=2, per_file=500)
+    eager = _save(folder)["dataset"]
+    lazy = load_cached(folder, lazy=True)["dataset"]
+    cdir = dataset_cache.cache_dir_for(find_test_files(folder).root)
+    assert len(os.listdir(cdir)) == 1
+
+    # the sources change: a new entry is written next to the one in use
+    dbf = find_test_files(folder).dbfs[-1]
+    st = os.stat(dbf)
+    os.utime(dbf, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    _save(folder)
+    assert len(os.listdir(cdir)) == 2
+    for code in lazy.cols:
+        assert all(map(_nan_eq, lazy.column(code), eager.column(code))), code
+
+    # unused now: dropped by the next write or cache hit
+    del lazy
+    gc.collect()
+    assert load_cached(folder, lazy=True) is not None
+    assert os.listdir(cdir) == [fingerprint(find_test_files(folder))[:16]]
@@ -0,0 +1,46 @@
+"""/api/export answers HEAD like GET (the UI checks a CSV download with HEAD first)
+and gzips the CSV stream for clients that accept it."""
+
+import gzip
+
+
+def _url(ds, channels="A-T1,C-Pc", fmt="csv"):
+    return f"/api/export?ds={ds}&format={fmt}&channels={channels}&step=1"
+
+
+def test_head_of_a_csv_export(client, loaded_test):
+    r = client.head(_url(loaded_test["dataset_id"]))
+    assert r.status_code == 200
+    assert r.mimetype == "text/csv"
+    assert r.data == b""
+
+
+def test_head_and_get_report_errors(client, loaded_test):
+    for url in (_url(999999999), _url(loaded_test["dataset_id"], channels="")):
+        assert client.head(url).status_code == 400
+        r = client.get(url)
+        assert r.status_code == 400
+        assert r.get_json()["ok"] is False and r.get_json()["error"]
+
+
+def test_get_streams_the_csv(client, loaded_test):
+    r = client.get(_url(loaded_test["dataset_id"]))
+    assert r.status_code == 200
+    lines = r.data.decode("utf-8-sig").splitlines()
+    assert len(lines) == 1 + 3 * (3000 - 2)
+
+
+def test_csv_stream_is_gzipped_when_accepted(client, loaded_test):
+    url = _url(loaded_test["dataset_id"])
+    plain = client.get(url)
+    assert "Content-Encoding" not in plain.headers
+    r = client.get(url, headers={"Accept-Encoding": "gzip, deflate"})
+    assert r.status_code == 200 and r.is_streamed
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in r.headers["Vary"]
+    assert r.headers["ETag"] == plain.headers["ETag"][:-1] + '-gz"'
+    assert len(r.data) < len(plain.data) and gzip.decompress(r.data) == plain.data
+    # the gzip ETag revalidates as well
+    assert client.get(url, headers={"If-None-Match": r.headers["ETag"]}).status_code == 304
+    head = client.head(url, headers={"Accept-Encoding": "gzip"})
+    assert head.status_code == 200 and head.headers["Content-Encoding"] == "gzip" and head.data == b""
@@ -0,0 +1,61 @@
+"""LazyColumnarDataset: channels decoded on first use while the test grows."""
+
+import threading
+import time
+from array import array
+
+from lemure_reader import LazyColumnarDataset
+
+
+def _dataset(n, started, release):
+    def loader(code):
+        started.set()
+        release.wait(5)
+        return array("d", range(n))
+
+    return LazyColumnarDataset(array("q", range(n)), ["A-T1", "A-T2"], loader, 1 << 30)
+
+
+class _SlowLock:
+    """The dataset's lock, taken late by one thread once its decode is done:
+    an append() that can slip in between runs then."""
+
+    def __init__(self, lock, thread, decoded):
+        self.lock, self.thread, self.decoded = lock, thread, decoded
+
+    def __enter__(self):
+        if threading.current_thread() is self.thread and self.decoded.is_set():
+            time.sleep(0.2)
+        self.lock.acquire()
+
+    def __exit__(self, *exc):
+        self.lock.release()
+
+
+def test_append_during_decode_reaches_the_new_column():
+    started, release = threading.Event(), threading.Event()
+    ds = _dataset(100, started, release)
+    got = []
+    reader = threading.Thread(target=lambda: got.append(ds.column("A-T1")))
+    ds._lock = _SlowLock(ds._lock, reader, release)  # release: the loader returns
+    reader.start()
+    started.wait(5)
+    writer = threading.Thread(target=ds.append, args=(array("q", [100, 101]), {"A-T1": array("d", [7.0, 8.0])}))
+    writer.start()
+    release.set()
+    reader.join()
+    writer.join()
+    assert len(ds.t_ms) == 102
+    assert len(got[0]) == 102 and list(got[0][-2:]) == [7.0, 8.0]
+    assert len(ds.column("A-T1")) == len(ds.column("A-T2")) == 102
+
+
+def test_appended_samples_of_undecoded_channels():
+    started, release = threading.Event(), threading.Event()
+    release.set()
+    ds = _dataset(10, started, release)
+    ds.append(array("q", [10, 11, 12]), {"A-T2": array("d", [1.0, 2.0, 3.0]), "B-X": array("d", [4.0, 5.0, 6.0])})
+    assert list(ds.column("A-T2")[-3:]) == [1.0, 2.0, 3.0]
+    assert list(ds.column("A-T1")[-3:]) != list(ds.column("A-T1")[-3:])  # NaN tail
+    col = ds.column("B-X")
+    assert len(col) == 13 and list(col[-3:]) == [4.0, 5.0, 6.0]
@@ -0,0 +1,24 @@
+"""Saved presets keep the plot settings the UI sends."""
+
+import pytest
+
+from lemure_server import persistence
+
+
+@pytest.fixture
+def presets_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(persistence, "PRESETS_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.parametrize("sent, saved", [("minmax", "minmax"), ("lttb", "lttb"), ("LTTB", "lttb"),
+                                         ("stride", "stride"), ("bogus", "stride"), (None, "stride")])
+def test_plot_mode_round_trip(client, presets_dir, sent, saved):
+    preset = {"channels": ["A-T1"], "step_auto": True, "step_target": 4000}
+    if sent is not None:
+        preset["plot_mode"] = sent
+    r = client.post("/api/presets_save", json={"name": "p1", "preset": preset})
+    assert r.get_json()["ok"]
+    j = client.get("/api/presets_load?key=" + r.get_json()["key"]).get_json()
+    assert j["ok"] and j["preset"]["plot_mode"] == saved
+    assert j["preset"]["channels"] == ["A-T1"] and j["preset"]["step_target"] == 4000
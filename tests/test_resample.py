@@ -0,0 +1,112 @@
+"""ResamplePlan results of each backend against per-point reference code:
+state.nearest_index (the nearest lookup used before the plans) and
+brute-force interpolation / window aggregates."""
+
+import math
+from bisect import bisect_left
+
+import pytest
+
+from lemure_compute import time_grid
+from lemure_reader import load_test
+from lemure_server.state import nearest_index
+
+CODES = ["A-T1", "A-T2", "C-Pc"]  # plain, NaN stretch, empty in one file
+GAPS = [250, 400, 1000, 10000]    # one step, deleted records, more
+WINDOWS = [250, 1000, 7000]
+
+
+@pytest.fixture(scope="module")
+def dataset(synthetic_test):
+    return load_test(synthetic_test, workers=1)["dataset"]
+
+
+def _grid(t):
+    """A sparse grid over the whole test and dense ones (off the sample times)
+    before the first sample, over the deleted records and after the last one."""
+    t0, t1 = t[0], t[-1]
+    return (time_grid(t0 - 12000, t0 + 6000, 97) + time_grid(t0 + 6100, t1 - 6100, 7003)
+            + time_grid(t1 - 6000, t1 + 12000, 97))
+
+
+def _value(v):
+    return None if v != v else v
+
+
+def _close(a, b):
+    if a is None or b is None:
+        return a is b
+    # mean comes from prefix sums: allow their rounding
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+
+
+def _nearest(t, col, g, gap):
+    i = nearest_index(t, g)
+    return _value(col[i]) if abs(t[i] - g) <= gap else None
+
+
+def _linear(t, col, g, gap):
+    j = bisect_left(t, g)
+    if j < len(t) and t[j] == g:
+        return _value(col[j])
+    if j == 0 or j == len(t) or t[j] - t[j - 1] > gap:
+        return None
+    v0, v1 = col[j - 1], col[j]
+    return _value(v0 + (v1 - v0) * (g - t[j - 1]) / (t[j] - t[j - 1]))
+
+
+def _window(t, col, g, window, method):
+    lo = g - window // 2
+    vals = [v for k, v in enumerate(col) if lo <= t[k] < lo + window and v == v]
+    if not vals:
+        return None
+    return {"mean": lambda: math.fsum(vals) / len(vals), "min": lambda: min(vals), "max": lambda: max(vals)}[method]()
+
+
+def _near(t, g, span):
+    """Samples that can matter for grid time g (keeps the brute force cheap)."""
+    return bisect_left(t, g - span), bisect_left(t, g + span + 1)
+
+
+@pytest.mark.parametrize("gap", GAPS)
+@pytest.mark.parametrize("method", ["nearest", "linear"])
+def test_point_methods(backend, dataset, method, gap):
+    t = list(dataset.t_ms)
+    grid = _grid(t)
+    plan = dataset.resample_plan(grid, method, gap, 0)
+    ref = _nearest if method == "nearest" else _linear
+    for code in CODES:
+        col = dataset.column(code)
+        got = dataset.resample(code, plan)
+        want = [ref(t, col, g, gap) for g in grid]
+        assert all(_close(a, b) for a, b in zip(got, want)), (code, method, gap)
+        assert len(got) == len(grid)
+    # before the first / after the last sample
+    assert got[0] is None and got[-1] is None
+    if method == "nearest":
+        assert [i for g, i in zip(grid, plan.index) if g < t[0]] == [0 if t[0] - g <= gap else -1
+                                                                     for g in grid if g < t[0]]
+
+
+@pytest.mark.parametrize("window", WINDOWS)
+@pytest.mark.parametrize("method", ["mean", "min", "max"])
+def test_window_methods(backend, dataset, method, window):
+    t = list(dataset.t_ms)
+    grid = _grid(t)
+    plan = dataset.resample_plan(grid, method, 0, window)
+    for code in CODES:
+        col = dataset.column(code)
+        got = dataset.resample(code, plan)
+        want = []
+        for g in grid:
+            i0, i1 = _near(t, g, window)
+            want.append(_window(t[i0:i1], col[i0:i1], g, window, method))
+        assert all(_close(a, b) for a, b in zip(got, want)), (code, method, window)
+        assert any(v is not None for v in got) and any(v is None for v in got)
+
+
+def test_missing_channel(backend, dataset):
+    grid = _grid(list(dataset.t_ms))
+    for method in ("nearest", "linear", "mean", "min", "max"):
+        plan = dataset.resample_plan(grid, method, 1000, 1000)
+        assert dataset.resample("missing", plan) == [None] * len(grid)
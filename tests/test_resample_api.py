@@ -0,0 +1,20 @@
+"""/api/resample argument checks."""
+
+import pytest
+
+
+@pytest.mark.parametrize("args, error", [
+    ("step_ms=inf", "шаг"), ("step_ms=1e400", "шаг"), ("step_ms=-inf", "шаг"), ("step_ms=nan", "шаг"),
+    ("step_ms=abc", "шаг"), ("step_ms=0", "шаг"), ("step_ms=1000&max_gap_ms=1e400", "шаг"),
+    ("step_ms=1000&max_gap_ms=0", "max_gap_ms"), ("step_ms=1000&max_gap_ms=-5", "max_gap_ms"),
+    ("step_ms=1000&window_ms=-1", "window_ms"), ("step_ms=1000&window_ms=0&method=mean", "window_ms"),
+])
+def test_bad_arguments_are_rejected(client, loaded_test, args, error):
+    r = client.get(f"/api/resample?ds={loaded_test['dataset_id']}&channels=A-T1&{args}")
+    assert r.status_code == 400
+    assert error in r.get_json()["error"]
+
+
+def test_defaults(client, loaded_test):
+    j = client.get(f"/api/resample?ds={loaded_test['dataset_id']}&channels=A-T1&step_ms=1000").get_json()
+    assert j["ok"] and j["points"] == len(j["t_ms"]) == len(j["series"]["A-T1"]) > 0
@@ -0,0 +1,40 @@
+"""/api/series in every downsampling mode."""
+
+import json
+
+import pytest
+
+MODES = ["stride", "minmax", "lttb"]
+
+
+def _series(client, ds, channels, mode, **args):
+    qs = "&".join(f"{k}={v}" for k, v in dict(args, ds=ds, channels=channels, mode=mode).items())
+    return client.get("/api/series?" + qs)
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("fmt", ["json", "bin"])
+def test_unknown_channel_gets_an_empty_trace(client, loaded_test, mode, fmt):
+    r = _series(client, loaded_test["dataset_id"], "A-T1,NOPE", mode, max_points=500, format=fmt)
+    assert r.status_code == 200
+    if fmt == "bin":
+        head = r.data[4:4 + int.from_bytes(r.data[:4], "little")]
+        j = json.loads(head)
+        assert set(j["series"]) == {"A-T1", "NOPE"} and j["unknown_channels"] == ["NOPE"]
+        return
+    j = r.get_json()
+    assert j["ok"] and j["unknown_channels"] == ["NOPE"]
+    assert all(v is None for v in j["series"]["NOPE"])
+    if mode == "lttb":
+        assert j["series"]["NOPE"] == [] and j["t_series"]["NOPE"] == []
+    else:
+        assert len(j["series"]["NOPE"]) == len(j["t_ms"]) > 0
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_known_channels(client, loaded_test, mode):
+    r = _series(client, loaded_test["dataset_id"], "A-T1,C-Pc", mode, max_points=500)
+    assert r.status_code == 200
+    j = r.get_json()
+    assert j["ok"] and set(j["series"]) == {"A-T1", "C-Pc"}
+    assert j["unknown_channels"] == []
@@ -0,0 +1,85 @@
+"""Range stats from the prefix-sum index against a scan of ds.column()."""
+
+import math
+import random
+
+import pytest
+
+import lemure_compute
+from lemure_reader import load_test
+from lemure_server.state import slice_by_time
+
+FIELDS = ("count", "min", "max", "first", "last")
+
+
+def _brute(ds, code, start_ms, end_ms):
+    col = ds.column(code)
+    vals = [col[i] for i, t in enumerate(ds.t_ms) if start_ms <= t <= end_ms and col[i] == col[i]]
+    if not vals:
+        return {"count": 0, "min": None, "max": None, "mean": None, "std": None, "first": None, "last": None}
+    mean = math.fsum(vals) / len(vals)
+    std = math.sqrt(math.fsum((v - mean) ** 2 for v in vals) / len(vals))
+    return {"count": len(vals), "min": min(vals), "max": max(vals), "mean": mean, "std": std,
+            "first": vals[0], "last": vals[-1]}
+
+
+def _close(a, b):
+    if a is None or b is None:
+        return a is b
+    return math.isclose(a, b, rel_tol=1e-7, abs_tol=1e-7)
+
+
+def _close_std(a, b):
+    # the index gets the variance as a difference of prefix sums of squares:
+    # over the whole synthetic test that costs ~1e-5 absolute on a tiny std
+    if a is None or b is None:
+        return a is b
+    return math.isclose(a, b, rel_tol=1e-7, abs_tol=1e-4)
+
+
+def _windows(ds, count=120, seed=3):
+    """Random [start_ms, end_ms] windows, mostly with ends between samples,
+    plus ones inside a NaN stretch, between two samples and past the ends."""
+    t = ds.t_ms
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(count):
+        a = rnd.uniform(t[0] - 2000, t[-1])
+        out.append((int(a), int(a + rnd.choice([10, 700, 60000, 1500000, 3000000]))))
+    gap = t[1000]  # A-T2 has no values for samples 1000..1399 of the first file
+    out += [(gap + 1, gap + 50000), (t[10] + 1, t[11] - 1), (t[0] - 10 ** 6, t[0] - 1),
+            (t[-1] + 1, t[-1] + 10 ** 6), (t[0] - 5, t[-1] + 5)]
+    return out
+
+
+@pytest.mark.parametrize("scan_max", [lemure_compute.STATS_SCAN_MAX, 0])
+def test_stats_match_a_scan(synthetic_test, backend, monkeypatch, scan_max):
+    # scan_max 0: every window goes through the index, not just the long ones
+    monkeypatch.setattr(lemure_compute, "STATS_SCAN_MAX", scan_max)
+    ds = load_test(synthetic_test, workers=1)["dataset"]
+    for start_ms, end_ms in _windows(ds):
+        i0, i1 = slice_by_time(ds.t_ms, start_ms, end_ms)
+        for code in ("A-T1", "A-T2", "C-Pc"):
+            got, want = ds.stats(code, i0, i1), _brute(ds, code, start_ms, end_ms)
+            for field in FIELDS:
+                assert got[field] == want[field], (code, start_ms, end_ms, field)
+            assert _close(got["mean"], want["mean"]), (code, start_ms, end_ms, "mean")
+            assert _close_std(got["std"], want["std"]), (code, start_ms, end_ms, "std")
+
+
+def test_stats_endpoint(client, loaded_test):
+    from lemure_server.state import REGISTRY
+
+    ds = REGISTRY.get(loaded_test["dataset_id"]).dataset
+    for start_ms, end_ms in _windows(ds, count=20, seed=5):
+        # the endpoint orders the ends itself
+        j = client.get(f"/api/stats?ds={loaded_test['dataset_id']}&channels=A-T2,A-Pc"
+                       f"&start_ms={end_ms}&end_ms={start_ms}").get_json()
+        assert j["ok"]
+        assert j["points"] == sum(start_ms <= t <= end_ms for t in ds.t_ms)
+        for code in ("A-T2", "A-Pc"):
+            want = _brute(ds, code, start_ms, end_ms)
+            for field in FIELDS:
+                assert j["stats"][code][field] == want[field]
+            assert _close(j["stats"][code]["mean"], want["mean"])
+            assert _close_std(j["stats"][code]["std"], want["std"])
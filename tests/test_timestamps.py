@@ -0,0 +1,81 @@
+"""_timestamps_ms() against the per-record datetime formula it replaced."""
+
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from lemure_reader import _timestamps_ms
+
+# (zone, days with a DST switch): Lord Howe Island moves by 30 minutes
+ZONES = {
+    "Europe/Berlin": [date(2024, 3, 31), date(2024, 10, 27)],
+    "Australia/Lord_Howe": [date(2024, 4, 7), date(2024, 10, 6)],
+}
+
+
+@pytest.fixture(params=sorted(ZONES))
+def zone(request, monkeypatch):
+    if not hasattr(time, "tzset"):
+        pytest.skip("time.tzset() is not available on this platform")
+    monkeypatch.setenv("TZ", request.param)
+    time.tzset()
+    try:
+        d = ZONES[request.param][0]
+        before = datetime(d.year, d.month, d.day, 0).astimezone().utcoffset()
+        after = datetime(d.year, d.month, d.day, 5).astimezone().utcoffset()
+        if before == after:
+            pytest.skip(f"no tz data for {request.param}")
+        yield request.param
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def _old_formula(dates, hh, mi, ss, mss):
+    return [int(datetime(d.year, d.month, d.day, h, m, s, ms * 1000).timestamp() * 1000)
+            for d, h, m, s, ms in zip(dates, hh, mi, ss, mss)]
+
+
+def _records(days, step=timedelta(seconds=7, milliseconds=313)):
+    """Wall-clock records over the switch hours, as a logger writes them
+    (the skipped and the repeated hour included)."""
+    dates, hh, mi, ss, mss = [], [], [], [], []
+    for d in days:
+        t = datetime(d.year, d.month, d.day, 0)
+        while t < datetime(d.year, d.month, d.day, 5):
+            dates.append(t.date())
+            hh.append(t.hour)
+            mi.append(t.minute)
+            ss.append(t.second)
+            mss.append(t.microsecond // 1000)
+            t += step
+    return dates, hh, mi, ss, mss
+
+
+def test_dst_switches_match_datetime(zone):
+    dates, hh, mi, ss, mss = _records(ZONES[zone])
+    got = _timestamps_ms(dates, hh, mi, ss, mss, list(range(len(dates))))
+    assert list(got) == _old_formula(dates, hh, mi, ss, mss)
+
+
+def test_every_millisecond_matches_datetime(zone):
+    # float rounding of mSecondi: all 1000 values, inside and outside the switch hour
+    d = ZONES[zone][1]
+    dates = [d] * 2000
+    hh = [1] * 1000 + [2] * 1000
+    mi, ss = [17] * 2000, [59] * 2000
+    mss = list(range(1000)) * 2
+    got = _timestamps_ms(dates, hh, mi, ss, mss, list(range(2000)))
+    assert list(got) == _old_formula(dates, hh, mi, ss, mss)
+
+
+def test_only_kept_records(zone):
+    # keep drops the records without a valid date
+    d = ZONES[zone][0]
+    dates = [d] * 6
+    hh, mi, ss, mss = [0, 2, 3, 1, 4, 2], [0, 30, 59, 59, 1, 45], [0, 1, 59, 0, 2, 3], [0, 999, 5, 0, 7, 1]
+    keep = [0, 1, 2, 3, 5]
+    got = _timestamps_ms(dates, hh, mi, ss, mss, keep)
+    pick = lambda col: [col[i] for i in keep]  # noqa: E731
+    assert list(got) == _old_formula(pick(dates), pick(hh), pick(mi), pick(ss), pick(mss))